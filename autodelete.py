@@ -0,0 +1,113 @@
+import time
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from bson import ObjectId
+from pyrogram.errors import FloodWait
+from database.users_db import mydb
+
+logger = logging.getLogger(__name__)
+
+
+# -------------------- AUTO DELETE SCHEDULER --------------------
+# Pending deletes live in Mongo ({chat_id, message_ids, due_at}) and in a
+# timer wheel of one-second slots: {second: {chat_id: [(doc_id, ids)]}}.
+# A single worker pops due slots and issues one delete_messages per chat,
+# so nothing holds Message objects or sleeps per delivery.
+class AutoDeleteScheduler:
+    MAX_IDS = 100  # delete_messages limit per call
+
+    def __init__(self, collection, delay=600, flush_interval=1):
+        self.collection = collection
+        self.delay = delay
+        self.flush_interval = flush_interval
+        self._wheel = {}
+        self._cursor = int(time.time())
+        self._pending = []  # docs not yet persisted
+        self._task = None
+
+    def _place(self, doc_id, chat_id, message_ids, due_at):
+        # Overdue entries land on the next tick
+        slot = max(int(due_at.timestamp()), self._cursor)
+        self._wheel.setdefault(slot, {}).setdefault(chat_id, []).append((doc_id, message_ids))
+
+    def schedule(self, chat_id, message_ids, delay=None):
+        """Delete message_ids in chat_id after delay seconds (default 10 min)."""
+        message_ids = [message_id for message_id in message_ids if message_id]
+        if not message_ids:
+            return
+        due_at = datetime.now(timezone.utc) + timedelta(seconds=delay or self.delay)
+        doc = {"_id": ObjectId(), "chat_id": chat_id, "message_ids": message_ids, "due_at": due_at}
+        self._pending.append(doc)
+        self._place(doc["_id"], chat_id, message_ids, due_at)
+
+    async def load(self):
+        """Re-arm everything a previous process left pending."""
+        loaded = 0
+        async for doc in self.collection.find({}).sort("due_at", 1):
+            due_at = doc["due_at"]
+            if due_at.tzinfo is None:
+                due_at = due_at.replace(tzinfo=timezone.utc)
+            self._place(doc["_id"], doc["chat_id"], doc["message_ids"], due_at)
+            loaded += 1
+        if loaded:
+            logger.info(f"Re-armed {loaded} pending auto deletes")
+        return loaded
+
+    async def start(self, client):
+        await self.load()
+        self._task = asyncio.get_event_loop().create_task(self.run(client))
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+        await self.persist()
+
+    async def persist(self):
+        if not self._pending:
+            return
+        docs, self._pending = self._pending, []
+        try:
+            await self.collection.insert_many(docs, ordered=False)
+        except Exception as e:
+            logger.error(f"Auto delete persist failed: {e}")
+
+    def _pop_due(self, now):
+        due = {}
+        while self._cursor <= now:
+            for chat_id, entries in self._wheel.pop(self._cursor, {}).items():
+                due.setdefault(chat_id, []).extend(entries)
+            self._cursor += 1
+        return due
+
+    async def _delete_chat(self, client, chat_id, message_ids):
+        for i in range(0, len(message_ids), self.MAX_IDS):
+            batch = message_ids[i:i + self.MAX_IDS]
+            while True:
+                try:
+                    await client.delete_messages(chat_id, batch)
+                    break
+                except FloodWait as e:
+                    await asyncio.sleep(e.value)
+                except Exception:
+                    break  # already gone / chat unavailable
+
+    async def run(self, client):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.persist()
+                due = self._pop_due(int(time.time()))
+                done = []
+                for chat_id, entries in due.items():
+                    message_ids = [message_id for _, ids in entries for message_id in ids]
+                    await self._delete_chat(client, chat_id, message_ids)
+                    done.extend(doc_id for doc_id, _ in entries)
+                if done:
+                    await self.collection.delete_many({"_id": {"$in": done}})
+            except Exception as e:
+                logger.error(f"Auto delete worker error: {e}")
+
+
+# 🔹 Initialize
+auto_delete = AutoDeleteScheduler(mydb.auto_delete)
@@ -2,10 +2,17 @@ import os
 from pyrogram import Client
 from info import API_ID, API_HASH, BOT_TOKEN, LOG_CHANNEL, PORT, ADMINS
 from aiohttp import web
-from route import web_server, ping_server, check_expired_premium, start_scheduler 
+from route import web_server, ping_server, premium_scheduler, start_scheduler 
 import pytz
 from datetime import date, datetime
 from utils import temp 
+from database.users_db import db
+from database.indexes import index_manager
+from database.stats import stats_service
+from broadcaster import broadcast_engine
+from autodelete import auto_delete
+from httpclient import http_client
+from publisher import post_publisher
 
 class Bot(Client):
     def __init__(self):
@@ -49,8 +56,55 @@ class Bot(Client):
         now = datetime.now(tz)
         time = now.strftime("%H:%M:%S %p")
         
+        # --- CATALOG ORDINALS + HISTORY BITMAPS ---
+        for kind in db.catalogs:
+            try:
+                await db.ensure_ordinals(kind)
+                await db.migrate_history(kind)
+            except Exception as e:
+                print(f"Catalog migration failed for {kind}: {e}")
+
+        # Pooled outbound HTTP (shorteners, pinger)
+        await http_client.open()
+
+        # --- CROSS-REPLICA CACHE INVALIDATION ---
+        try:
+            await db.feed.start()
+        except Exception as e:
+            print(f"Invalidation feed failed to start: {e}")
+
+        # Tail first so adds from other replicas during the load aren't missed
+        try:
+            await db.load_catalogs()
+        except Exception as e:
+            print(f"Catalog load failed: {e}")
+
+        # Ban gate runs from memory after this
+        try:
+            await db.load_bans()
+        except Exception as e:
+            print(f"Ban registry load failed: {e}")
+
         # --- BACKGROUND TASKS ---
-        self.loop.create_task(check_expired_premium(self))
+        self.loop.create_task(db.reconcile_bans())
+        self.loop.create_task(index_manager.bootstrap())
+        self.loop.create_task(premium_scheduler.run(self))
+        self.loop.create_task(stats_service.run())
+
+        # Deletes scheduled before the restart are re-armed from Mongo
+        try:
+            await auto_delete.start(self)
+        except Exception as e:
+            print(f"Auto delete scheduler failed to start: {e}")
+
+        # POST_CHANNEL queue picks up where the last run stopped
+        await post_publisher.start(self)
+
+        # Broadcasts interrupted by the last restart carry on from their checkpoint
+        try:
+            await broadcast_engine.resume(self)
+        except Exception as e:
+            print(f"Broadcast resume failed: {e}")
         self.loop.create_task(start_scheduler(self))
         
         # ✅ FIX: Removed 'self' from ping_server()
@@ -92,6 +146,10 @@ class Bot(Client):
             pass
 
     async def stop(self, *args):
+        await auto_delete.stop()
+        await post_publisher.stop()
+        await db.feed.stop()
+        await http_client.close()
         await super().stop()
         print("Bot Stopped")
 
@@ -0,0 +1,219 @@
+import time
+import asyncio
+import logging
+from pyrogram.errors import FloodWait, InputUserDeactivated, UserIsBlocked, PeerIdInvalid
+from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+from database.users_db import db
+from database.broadcasts import broadcast_store, SENT, FAILED, BLOCKED, DELETED, DEAD
+from info import BROADCAST_RATE, BROADCAST_WORKERS
+from utils import get_readable_time
+
+logger = logging.getLogger(__name__)
+
+
+# -------------------- TOKEN BUCKET --------------------
+# Shared by every worker of every job, so the bot as a whole stays under
+# Telegram's global send rate. A FloodWait pauses the whole bucket.
+class TokenBucket:
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def pause(self, seconds):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            if now < self.paused_until:
+                await asyncio.sleep(self.paused_until - now)
+                continue
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class BroadcastJob:
+    def __init__(self, doc, counts):
+        self.id = doc["_id"]
+        self.doc = doc
+        self.counts = {SENT: 0, FAILED: 0, BLOCKED: 0, DELETED: 0, **counts}
+        self.results = []
+        self.cancelled = asyncio.Event()
+        self.started = time.time()
+
+    @property
+    def done(self):
+        return sum(self.counts.values())
+
+
+# -------------------- BROADCAST ENGINE --------------------
+# A job's pending deliveries are streamed into a bounded queue and drained
+# by a worker pool. Results are checkpointed to broadcast_deliveries every
+# flush, so a restarted bot resumes with only the users still pending.
+class BroadcastEngine:
+    def __init__(self, rate=BROADCAST_RATE, workers=BROADCAST_WORKERS, flush_interval=5):
+        self.bucket = TokenBucket(rate)
+        self.workers = workers
+        self.flush_interval = flush_interval
+        self.jobs = {}
+
+    @property
+    def busy(self):
+        return bool(self.jobs)
+
+    async def start(self, client, source, is_pin, status_message, audience):
+        doc = await broadcast_store.create_job(
+            source.chat.id, source.id, is_pin,
+            status_message.chat.id, status_message.id, audience
+        )
+        return await self._launch(client, doc)
+
+    async def resume(self, client):
+        """Pick up jobs left running by a previous process."""
+        async for doc in broadcast_store.running_jobs():
+            if doc["_id"] not in self.jobs:
+                logger.info(f"Resuming broadcast {doc['_id']}")
+                await self._launch(client, doc)
+
+    async def cancel(self, job_id):
+        job = self.jobs.get(job_id)
+        if job:
+            job.cancelled.set()
+        return await broadcast_store.cancel(job_id) or job is not None
+
+    async def _launch(self, client, doc):
+        job = BroadcastJob(doc, await broadcast_store.count_states(doc["_id"]))
+        self.jobs[job.id] = job
+        asyncio.get_event_loop().create_task(self._run(client, job))
+        return job
+
+    async def _run(self, client, job):
+        queue = asyncio.Queue(maxsize=self.workers * 4)
+        workers = [
+            asyncio.create_task(self._worker(client, job, queue))
+            for _ in range(self.workers)
+        ]
+        flusher = asyncio.create_task(self._flush_loop(client, job))
+        try:
+            async for user_id in broadcast_store.pending(job.id):
+                if job.cancelled.is_set():
+                    break
+                await queue.put(user_id)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+
+            flusher.cancel()
+            await self._flush(job)
+            status = "cancelled" if job.cancelled.is_set() else "done"
+            await broadcast_store.finish(job.id, status, job.counts)
+            await self._edit_status(client, job, status)
+        except Exception as e:
+            # Left "running" in Mongo, so the next start resumes it
+            logger.error(f"Broadcast {job.id} stopped: {e}")
+        finally:
+            # On failure the flusher would keep editing the status with a live
+            # CANCEL button and the workers would wait on the queue forever
+            tasks = [flusher, *workers]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.jobs.pop(job.id, None)
+
+    async def _worker(self, client, job, queue):
+        while True:
+            user_id = await queue.get()
+            if user_id is None:
+                return
+            if job.cancelled.is_set():
+                continue
+            state = await self._deliver(client, job, user_id)
+            job.counts[state] += 1
+            job.results.append((user_id, state))
+
+    async def _deliver(self, client, job, user_id):
+        while True:
+            await self.bucket.acquire()
+            try:
+                m = await client.copy_message(user_id, job.doc["chat_id"], job.doc["message_id"])
+                if job.doc.get("is_pin"):
+                    await self.bucket.acquire()
+                    try:
+                        await m.pin(both_sides=True)
+                    except Exception:
+                        pass
+                return SENT
+            except FloodWait as e:
+                logger.warning(f"Broadcast FloodWait {e.value}s")
+                self.bucket.pause(e.value)
+            except InputUserDeactivated:
+                return DELETED
+            except UserIsBlocked:
+                return BLOCKED
+            except PeerIdInvalid:
+                return DELETED
+            except Exception as e:
+                logger.error(f"Error broadcasting to {user_id}: {e}")
+                return FAILED
+
+    async def _flush(self, job):
+        results, job.results = job.results, []
+        if not results:
+            return
+        await broadcast_store.record(job.id, results)
+        dead = [user_id for user_id, state in results if state in DEAD]
+        if dead:
+            removed = await db.delete_users(dead)
+            logger.info(f"Broadcast {job.id}: removed {removed} blocked/deleted users")
+
+    async def _flush_loop(self, client, job):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self._flush(job)
+                # A cancel from another replica only reaches us through Mongo
+                if await broadcast_store.is_cancelled(job.id):
+                    job.cancelled.set()
+                await self._edit_status(client, job, "running")
+            except Exception as e:
+                logger.error(f"Broadcast {job.id} checkpoint failed: {e}")
+
+    async def _edit_status(self, client, job, status):
+        time_taken = get_readable_time(time.time() - job.started)
+        body = (
+            f"Audience: <code>{job.doc.get('audience', 'all users')}</code>\n"
+            f"Total Users: <code>{job.doc['total']}</code>\n"
+            f"Completed: <code>{job.done}</code>\n"
+            f"Success: <code>{job.counts[SENT]}</code>\n"
+            f"Failed: <code>{job.counts[FAILED]}</code>\n"
+            f"Blocked/Deleted: <code>{job.counts[BLOCKED] + job.counts[DELETED]}</code>"
+        )
+        reply_markup = None
+        if status == "running":
+            text = f"📢 Users broadcast in progress...\n\n{body}"
+            reply_markup = InlineKeyboardMarkup(
+                [[InlineKeyboardButton('CANCEL', callback_data=f'broadcast_cancel#{job.id}')]]
+            )
+        elif status == "cancelled":
+            text = f"❌ Users broadcast cancelled!\nCompleted in {time_taken}\n\n{body}"
+        else:
+            text = f"✅ Users broadcast completed!\nCompleted in {time_taken}\n\n{body}"
+        try:
+            await client.edit_message_text(
+                job.doc["status_chat_id"], job.doc["status_message_id"], text,
+                reply_markup=reply_markup
+            )
+        except Exception:
+            pass  # MessageNotModified between quiet flushes
+
+
+# 🔹 Initialize
+broadcast_engine = BroadcastEngine()
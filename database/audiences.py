@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta, timezone
+
+# get_notcopy_user() seeds misc with this date until the first verification
+NEVER_VERIFIED = datetime(2020, 5, 17, 0, 0, 0, tzinfo=timezone.utc)
+
+AUDIENCE_HELP = (
+    "<b>Audiences:</b>\n"
+    "<code>/broadcast</code> - all users\n"
+    "<code>/broadcast premium</code> - active premium\n"
+    "<code>/broadcast free</code> - no active premium\n"
+    "<code>/broadcast active 7</code> - used the bot in the last 7 days\n"
+    "<code>/broadcast expiring 3</code> - premium ending within 3 days\n"
+    "<code>/broadcast unverified</code> - never completed verification"
+)
+
+
+# -------------------- BROADCAST AUDIENCES --------------------
+# Each selector compiles to aggregation stages over `users`. All but
+# "unverified" start with an indexed $match (expiry_time / last_date), so
+# only the selected users are read. "unverified" is a full users scan:
+# users with no misc doc at all count as unverified and can only be found
+# from the users side. It carries just the id through an indexed $lookup
+# into misc (user_id).
+class Audience:
+    def __init__(self, label, stages):
+        self.label = label
+        self.stages = stages
+
+    async def count(self, users):
+        cursor = users.aggregate(self.stages + [{"$count": "n"}])
+        result = await cursor.to_list(length=1)
+        return result[0]["n"] if result else 0
+
+
+def _days(args):
+    if len(args) != 1 or not args[0].isdigit() or int(args[0]) <= 0:
+        raise ValueError("expected a number of days")
+    return int(args[0])
+
+
+def compile_audience(args, now=None):
+    """['active', '7'] -> Audience. Raises ValueError on anything unknown."""
+    now = now or datetime.now(timezone.utc)
+    if not args:
+        return Audience("all users", [])
+    name, rest = args[0].lower(), args[1:]
+
+    if name == "premium" and not rest:
+        return Audience("premium", [{"$match": {"expiry_time": {"$gt": now}}}])
+    if name == "free" and not rest:
+        return Audience("free", [{"$match": {"$or": [
+            {"expiry_time": None},
+            {"expiry_time": {"$lte": now}}
+        ]}}])
+    if name == "active":
+        days = _days(rest)
+        return Audience(f"active in last {days}d", [
+            {"$match": {"last_date": {"$gte": now - timedelta(days=days)}}}
+        ])
+    if name == "expiring":
+        days = _days(rest)
+        return Audience(f"premium expiring within {days}d", [
+            {"$match": {"expiry_time": {"$gt": now, "$lte": now + timedelta(days=days)}}}
+        ])
+    if name == "unverified" and not rest:
+        return Audience("never verified", [
+            {"$project": {"_id": 0, "id": 1}},
+            {"$lookup": {
+                "from": "misc",
+                "localField": "id",
+                "foreignField": "user_id",
+                "as": "verify"
+            }},
+            {"$match": {"verify.last_verified": {"$not": {"$gt": NEVER_VERIFIED}}}},
+            {"$project": {"verify": 0}}
+        ])
+    raise ValueError(f"unknown audience: {' '.join(args)}")
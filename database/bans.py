@@ -0,0 +1,98 @@
+import time
+import heapq
+import asyncio
+from datetime import datetime, timezone
+
+
+# -------------------- BAN REGISTRY --------------------
+# Process-local view of blocked_users and of active temp bans, loaded at
+# startup and kept current by block/unblock/add_temp_ban and the "ban"
+# feed. The ban gate reads only this; reconcile() re-syncs from Mongo.
+class BanRegistry:
+    def __init__(self):
+        self.loaded = False
+        self.blocked = set()
+        self.temp_bans = {}     # user_id -> expiry (epoch seconds)
+        self._expiries = []     # heap of (expiry, user_id), pruned on read
+        self._changes = None    # changes made while a reconcile is reading
+        self._lock = asyncio.Lock()
+
+    def is_blocked(self, user_id):
+        return user_id in self.blocked
+
+    def temp_ban_remaining(self, user_id, now=None):
+        now = now or time.time()
+        self._prune(now)
+        expiry = self.temp_bans.get(user_id)
+        if expiry is None:
+            return 0
+        remaining = int(expiry - now)
+        return remaining if remaining > 0 else 0
+
+    def _prune(self, now):
+        """Drop run-out bans; the heap top is the next one to run out."""
+        expiries = self._expiries
+        while expiries and expiries[0][0] <= now:
+            expiry, user_id = heapq.heappop(expiries)
+            # A later ban for the same user leaves a stale entry behind
+            if self.temp_bans.get(user_id) == expiry:
+                del self.temp_bans[user_id]
+
+    def block(self, user_id):
+        self.blocked.add(user_id)
+        self._record(self.block, user_id)
+
+    def unblock(self, user_id):
+        self.blocked.discard(user_id)
+        self._record(self.unblock, user_id)
+
+    def add_temp_ban(self, user_id, expiry):
+        self.temp_bans[user_id] = expiry
+        heapq.heappush(self._expiries, (expiry, user_id))
+        self._record(self.add_temp_ban, user_id, expiry)
+
+    def _record(self, change, *args):
+        if self._changes is not None:
+            self._changes.append((change, args))
+
+    async def reconcile(self, blocked_users, users):
+        """
+        Rebuild from Mongo (blocked_users + temp_ban_expiry index). Changes
+        made while the reads are in flight are replayed on the snapshot, so
+        a ban issued mid-reconcile isn't lost.
+        """
+        async with self._lock:
+            self._changes = []
+            try:
+                blocked, temp_bans = await self._snapshot(blocked_users, users)
+            finally:
+                changes, self._changes = self._changes, None
+            self._replace(blocked, temp_bans)
+            for change, args in changes:
+                change(*args)
+        return len(self.blocked), len(self.temp_bans)
+
+    async def _snapshot(self, blocked_users, users):
+        now = datetime.now(timezone.utc)
+        blocked = {
+            doc["user_id"]
+            async for doc in blocked_users.find({}, {"_id": 0, "user_id": 1})
+        }
+        temp_bans = {}
+        cursor = users.find(
+            {"temp_ban_expiry": {"$gt": now}},
+            {"_id": 0, "id": 1, "temp_ban_expiry": 1}
+        )
+        async for doc in cursor:
+            expiry = doc["temp_ban_expiry"]
+            if expiry.tzinfo is None:
+                expiry = expiry.replace(tzinfo=timezone.utc)
+            temp_bans[doc["id"]] = expiry.timestamp()
+        return blocked, temp_bans
+
+    def _replace(self, blocked, temp_bans):
+        self.blocked = blocked
+        self.temp_bans = temp_bans
+        self._expiries = [(expiry, user_id) for user_id, expiry in temp_bans.items()]
+        heapq.heapify(self._expiries)
+        self.loaded = True
@@ -0,0 +1,42 @@
+import zlib
+
+# -------------------- WATCH HISTORY BITMAP --------------------
+# Bit N is set when the user has seen the catalog entry with ordinal N.
+# Stored zlib-compressed in a BSON binary field, which keeps even
+# long-time users at a few KB instead of thousands of file_id strings.
+
+
+def decode(blob):
+    if not blob:
+        return bytearray()
+    return bytearray(zlib.decompress(bytes(blob)))
+
+
+def encode(bits):
+    # Trailing zero bytes carry no information
+    end = len(bits)
+    while end and not bits[end - 1]:
+        end -= 1
+    return zlib.compress(bytes(bits[:end]), 6)
+
+
+def contains(bits, ordinal):
+    byte = ordinal >> 3
+    return byte < len(bits) and bool(bits[byte] & (1 << (ordinal & 7)))
+
+
+def add(bits, ordinal):
+    """Set the bit for ordinal. Returns False if it was already set."""
+    byte = ordinal >> 3
+    if byte >= len(bits):
+        bits.extend(bytes(byte + 1 - len(bits)))
+    mask = 1 << (ordinal & 7)
+    if bits[byte] & mask:
+        return False
+    bits[byte] |= mask
+    return True
+
+
+def popcount(bits):
+    return int.from_bytes(bits, "little").bit_count()
+
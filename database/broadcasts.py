@@ -0,0 +1,111 @@
+import uuid
+from datetime import datetime, timezone
+from pymongo import ASCENDING, UpdateOne
+from database.users_db import mydb
+
+# Delivery states
+PENDING = "pending"
+SENT = "sent"
+FAILED = "failed"
+BLOCKED = "blocked"
+DELETED = "deleted"
+
+# States whose users are removed from the users collection
+DEAD = (BLOCKED, DELETED)
+
+
+# -------------------- BROADCAST JOBS --------------------
+# broadcast_jobs: one doc per broadcast (source message, status, totals).
+# broadcast_deliveries: {job_id, user_id, state}, seeded server-side from
+# users when the job is created and updated in batches as workers deliver.
+class BroadcastStore:
+    def __init__(self, database):
+        self.users = database.users
+        self.jobs = database.broadcast_jobs
+        self.deliveries = database.broadcast_deliveries
+
+    async def create_job(self, chat_id, message_id, is_pin, status_chat_id, status_message_id, audience):
+        job_id = uuid.uuid4().hex[:12]
+        # $merge needs the unique (job_id, user_id) index to exist
+        await self.deliveries.create_index(
+            [("job_id", ASCENDING), ("user_id", ASCENDING)],
+            name="job_id_1_user_id_1", unique=True
+        )
+        cursor = self.users.aggregate(audience.stages + [
+            {"$match": {"id": {"$type": "number"}}},
+            {"$project": {
+                "_id": 0,
+                "job_id": {"$literal": job_id},
+                "user_id": "$id",
+                "state": {"$literal": PENDING}
+            }},
+            {"$merge": {
+                "into": self.deliveries.name,
+                "on": ["job_id", "user_id"],
+                "whenMatched": "keepExisting",
+                "whenNotMatched": "insert"
+            }}
+        ], allowDiskUse=True)
+        await cursor.to_list(length=None)
+
+        job = {
+            "_id": job_id,
+            "chat_id": chat_id,
+            "message_id": message_id,
+            "is_pin": is_pin,
+            "audience": audience.label,
+            "status_chat_id": status_chat_id,
+            "status_message_id": status_message_id,
+            "total": await self.deliveries.count_documents({"job_id": job_id}),
+            "status": "running",
+            "created_at": datetime.now(timezone.utc)
+        }
+        await self.jobs.insert_one(job)
+        return job
+
+    def running_jobs(self):
+        return self.jobs.find({"status": "running"})
+
+    async def pending(self, job_id):
+        cursor = self.deliveries.find(
+            {"job_id": job_id, "state": PENDING}, {"_id": 0, "user_id": 1}
+        ).batch_size(1000)
+        async for delivery in cursor:
+            yield delivery["user_id"]
+
+    async def count_states(self, job_id):
+        cursor = self.deliveries.aggregate([
+            {"$match": {"job_id": job_id, "state": {"$ne": PENDING}}},
+            {"$group": {"_id": "$state", "count": {"$sum": 1}}}
+        ])
+        return {row["_id"]: row["count"] async for row in cursor}
+
+    async def record(self, job_id, results):
+        """results: [(user_id, state)] -> one unordered bulk write."""
+        if not results:
+            return
+        await self.deliveries.bulk_write([
+            UpdateOne({"job_id": job_id, "user_id": user_id}, {"$set": {"state": state}})
+            for user_id, state in results
+        ], ordered=False)
+
+    async def cancel(self, job_id):
+        result = await self.jobs.update_one(
+            {"_id": job_id, "status": "running"}, {"$set": {"status": "cancelled"}}
+        )
+        return result.modified_count == 1
+
+    async def is_cancelled(self, job_id):
+        job = await self.jobs.find_one({"_id": job_id}, {"_id": 0, "status": 1})
+        return not job or job.get("status") == "cancelled"
+
+    async def finish(self, job_id, status, counts):
+        await self.jobs.update_one(
+            {"_id": job_id},
+            {"$set": {"status": status, "counts": counts, "finished_at": datetime.now(timezone.utc)}}
+        )
+        await self.deliveries.delete_many({"job_id": job_id})
+
+
+# 🔹 Initialize
+broadcast_store = BroadcastStore(mydb)
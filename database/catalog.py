@@ -0,0 +1,150 @@
+import base64
+import random
+import hashlib
+from array import array
+from bisect import bisect_left
+
+# -------------------- IN-MEMORY VIDEO CATALOG --------------------
+# Process-local copy of videoz / brazzers, indexed by ordinal.
+# Each entry is one record in a shared bytearray: [uid length][packed
+# file_unique_id][packed file_id], base64-decoded. Per-ordinal offsets/
+# lengths sit in flat arrays, so there is no per-video object.
+# file_unique_id lookups go through a sorted array of 64-bit hashes; a
+# hit is confirmed against the uid stored in the record.
+
+_B64 = b"\x00"   # blob holds base64url-decoded bytes
+_RAW = b"\x01"   # blob holds the utf-8 string as-is (non-canonical id)
+
+
+def _pack(file_id):
+    try:
+        raw = base64.urlsafe_b64decode(file_id + "=" * (-len(file_id) % 4))
+        if base64.urlsafe_b64encode(raw).decode().rstrip("=") == file_id:
+            return _B64 + raw
+    except ValueError:
+        pass
+    return _RAW + file_id.encode()
+
+
+def _unpack(packed):
+    if packed[:1] == _B64:
+        return base64.urlsafe_b64encode(packed[1:]).decode().rstrip("=")
+    return packed[1:].decode()
+
+
+def _hash(file_unique_id):
+    return int.from_bytes(hashlib.blake2b(file_unique_id.encode(), digest_size=8).digest(), "little")
+
+
+class Catalog:
+    # Unsorted additions are merged into the sorted hash index in batches
+    MERGE_AT = 4096
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.loaded = False
+        self.clear()
+
+    def clear(self):
+        self._blob = bytearray()
+        self._start = array("I")    # ordinal -> offset of its record in _blob
+        self._length = array("H")   # ordinal -> record length, 0 = empty
+        self._live = array("I")     # dense list of live ordinals
+        self._hashes = array("Q")   # sorted hash(file_unique_id)
+        self._ordinals = array("I") # ordinal for each entry of _hashes
+        self._recent = {}           # hash -> [ordinals], not merged yet
+
+    def __len__(self):
+        return len(self._live)
+
+    @property
+    def end(self):
+        """One past the highest ordinal held."""
+        return len(self._start)
+
+    def _unique_at(self, ordinal):
+        start = self._start[ordinal]
+        size = self._blob[start]
+        return _unpack(bytes(self._blob[start + 1:start + 1 + size]))
+
+    def _find(self, h, file_unique_id):
+        # Different uids can share a 64-bit hash: confirm against the record
+        for ordinal in self._recent.get(h, ()):
+            if self._unique_at(ordinal) == file_unique_id:
+                return ordinal
+        i = bisect_left(self._hashes, h)
+        while i < len(self._hashes) and self._hashes[i] == h:
+            ordinal = self._ordinals[i]
+            if self._unique_at(ordinal) == file_unique_id:
+                return ordinal
+            i += 1
+        return None
+
+    def _merge(self):
+        pairs = sorted(
+            [*zip(self._hashes, self._ordinals),
+             *((h, ordinal) for h, ordinals in self._recent.items() for ordinal in ordinals)]
+        )
+        self._hashes = array("Q", (h for h, _ in pairs))
+        self._ordinals = array("I", (ordinal for _, ordinal in pairs))
+        self._recent = {}
+
+    def add(self, ordinal, file_unique_id, file_id):
+        h = _hash(file_unique_id)
+        if self._find(h, file_unique_id) is not None:
+            return False
+        if ordinal == len(self._start):
+            # Common case while loading in ordinal order
+            self._start.append(0)
+            self._length.append(0)
+        elif ordinal > len(self._start):
+            grow = ordinal + 1 - len(self._start)
+            self._start.extend(array("I", [0]) * grow)
+            self._length.extend(array("H", [0]) * grow)
+        elif self._length[ordinal]:
+            return False
+
+        unique = _pack(file_unique_id)
+        record = bytes([len(unique)]) + unique + _pack(file_id)
+        self._start[ordinal] = len(self._blob)
+        self._length[ordinal] = len(record)
+        self._blob += record
+        self._live.append(ordinal)
+        self._recent.setdefault(h, []).append(ordinal)
+        # load() merges once at the end instead
+        if self.loaded and len(self._recent) >= self.MERGE_AT:
+            self._merge()
+        return True
+
+    def get(self, ordinal):
+        if ordinal >= len(self._length) or not self._length[ordinal]:
+            return None
+        start = self._start[ordinal]
+        end = start + self._length[ordinal]
+        return _unpack(bytes(self._blob[start + 1 + self._blob[start]:end]))
+
+    def ordinal_of(self, file_unique_id):
+        return self._find(_hash(file_unique_id), file_unique_id)
+
+    def get_by_unique(self, file_unique_id):
+        ordinal = self.ordinal_of(file_unique_id)
+        return None if ordinal is None else self.get(ordinal)
+
+    def random_file_id(self):
+        if not self._live:
+            return None
+        return self.get(self._live[random.randrange(len(self._live))])
+
+    async def load(self, collection):
+        """Stream a projected cursor over the whole collection."""
+        self.loaded = False
+        self.clear()
+        cursor = collection.find(
+            {"ordinal": {"$exists": True}},
+            {"_id": 0, "ordinal": 1, "file_unique_id": 1, "file_id": 1}
+        ).batch_size(5000)
+        async for doc in cursor:
+            self.add(doc["ordinal"], doc["file_unique_id"], doc["file_id"])
+        self._merge()
+        self.loaded = True
+        return len(self)
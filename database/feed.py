@@ -0,0 +1,179 @@
+import time
+import uuid
+import asyncio
+import logging
+from datetime import datetime, timezone
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid
+
+logger = logging.getLogger(__name__)
+
+# Unique per process, so a replica can ignore its own events
+REPLICA_ID = uuid.uuid4().hex
+
+
+# -------------------- CACHE INVALIDATION FEED --------------------
+# Every replica publishes what it changed and applies what the others
+# changed: {"kind", "key", "data", "origin", "ts"}.
+# kinds: "user" (id), "ban" (user_id), "catalog_add" (kind), "catalog_reset" (kind)
+class Feed:
+    def __init__(self):
+        self.origin = REPLICA_ID
+        self._handlers = {}
+        self._resync_handlers = []
+
+    def subscribe(self, kind, handler):
+        """handler(key, data) runs for events from *other* replicas."""
+        self._handlers.setdefault(kind, []).append(handler)
+
+    def on_resync(self, handler):
+        """async handler() runs when events may have been missed."""
+        self._resync_handlers.append(handler)
+
+    def _dispatch(self, event):
+        if event.get("origin") == self.origin:
+            return
+        for handler in self._handlers.get(event.get("kind"), []):
+            try:
+                handler(event.get("key"), event.get("data") or {})
+            except Exception as e:
+                logger.error(f"Feed handler error ({event.get('kind')}): {e}")
+
+    async def _resync(self):
+        for handler in self._resync_handlers:
+            try:
+                await handler()
+            except Exception as e:
+                logger.error(f"Feed resync failed: {e}")
+
+    def publish(self, kind, key=None, data=None):
+        raise NotImplementedError
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+
+class LocalFeed(Feed):
+    """
+    In-process stand-in for tests. Feeds sharing one hub behave like
+    replicas: a publish on one is delivered to all the others.
+    """
+    def __init__(self, hub=None):
+        super().__init__()
+        self.hub = hub if hub is not None else []
+        self.hub.append(self)
+        self.origin = uuid.uuid4().hex
+
+    def publish(self, kind, key=None, data=None):
+        event = {"kind": kind, "key": key, "data": data, "origin": self.origin}
+        for feed in self.hub:
+            feed._dispatch(event)
+
+
+class MongoFeed(Feed):
+    """
+    Append-only capped collection tailed by every replica. Publishes are
+    buffered and flushed in one insert_many so hot writes don't pay for it.
+
+    The tail runs in natural (insertion) order with no _id predicate:
+    ObjectIds minted by different replicas, or held back by the flush
+    buffer, aren't ordered, so "$gt last_id" would drop events. After a
+    reconnect the cursor starts from the oldest event and skips up to the
+    last one applied. Only if that event has already been overwritten were
+    events lost, and only then do caches get reloaded, at most once per
+    resync_interval.
+    """
+    def __init__(self, collection, size_bytes=16 * 1024 * 1024, flush_interval=0.5, resync_interval=60):
+        super().__init__()
+        self.collection = collection
+        self.size_bytes = size_bytes
+        self.flush_interval = flush_interval
+        self.resync_interval = resync_interval
+        self._buffer = {}
+        self._seq = 0
+        self._tasks = []
+        self._running = False
+        self._last_resync = None
+
+    def publish(self, kind, key=None, data=None):
+        # A bare invalidation for the same (kind, key) only needs to go out once
+        if data is None:
+            slot = (kind, key)
+        else:
+            self._seq += 1
+            slot = (kind, key, self._seq)
+        self._buffer[slot] = {
+            "kind": kind, "key": key, "data": data,
+            "origin": self.origin, "ts": datetime.now(timezone.utc)
+        }
+
+    async def start(self):
+        database = self.collection.database
+        try:
+            await database.create_collection(self.collection.name, capped=True, size=self.size_bytes)
+        except CollectionInvalid:
+            pass
+        self._running = True
+        loop = asyncio.get_event_loop()
+        self._tasks = [loop.create_task(self._flush_loop()), loop.create_task(self._tail_loop())]
+
+    async def stop(self):
+        self._running = False
+        for task in self._tasks:
+            task.cancel()
+        await self.flush()
+
+    async def flush(self):
+        if not self._buffer:
+            return
+        events, self._buffer = list(self._buffer.values()), {}
+        try:
+            await self.collection.insert_many(events, ordered=False)
+        except Exception as e:
+            logger.error(f"Feed flush failed: {e}")
+
+    async def _flush_loop(self):
+        while self._running:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def _resync(self):
+        # A flapping connection shouldn't reload every catalog each time
+        if self._last_resync is not None:
+            wait = self._last_resync + self.resync_interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+        self._last_resync = time.monotonic()
+        await super()._resync()
+
+    async def _newest_id(self):
+        last = await self.collection.find_one({}, {"_id": 1}, sort=[("$natural", -1)])
+        return last["_id"] if last else None
+
+    async def _tail_loop(self):
+        last_id = await self._newest_id()
+        while self._running:
+            if last_id is not None and not await self.collection.find_one({"_id": last_id}, {"_id": 1}):
+                # Rolled out of the capped collection while we were away.
+                # Take the new position first so nothing published during
+                # the reload is skipped; replaying an event is harmless.
+                last_id = await self._newest_id()
+                await self._resync()
+            skipping = last_id is not None
+            # Never filtered: natural order is the only order events share
+            cursor = self.collection.find({}, cursor_type=CursorType.TAILABLE_AWAIT)
+            try:
+                while self._running and cursor.alive:
+                    async for event in cursor:
+                        if skipping:
+                            skipping = event["_id"] != last_id
+                            continue
+                        last_id = event["_id"]
+                        self._dispatch(event)
+            except Exception as e:
+                logger.warning(f"Feed tail interrupted: {e}")
+            # An empty collection gives a dead cursor straight away
+            await asyncio.sleep(1)
@@ -0,0 +1,139 @@
+import logging
+from pymongo import ASCENDING
+from pymongo.errors import OperationFailure
+from database.users_db import mydb
+
+logger = logging.getLogger(__name__)
+
+# -------------------- REQUIRED INDEXES --------------------
+# (collection, keys, options). unique=True wherever the code used to
+# prevent duplicates with find-then-insert.
+INDEXES = [
+    ("users", [("id", ASCENDING)], {"unique": True}),
+    ("users", [("expiry_time", ASCENDING)], {}),
+    ("users", [("last_date", ASCENDING)], {}),
+    ("users", [("temp_ban_expiry", ASCENDING)], {"sparse": True}),
+    ("videoz", [("file_unique_id", ASCENDING)], {"unique": True}),
+    ("videoz", [("ordinal", ASCENDING)], {"unique": True, "sparse": True}),
+    ("videoz", [("file_id", ASCENDING)], {}),
+    ("brazzers", [("file_unique_id", ASCENDING)], {"unique": True}),
+    ("brazzers", [("ordinal", ASCENDING)], {"unique": True, "sparse": True}),
+    ("brazzers", [("file_id", ASCENDING)], {}),
+    ("historyz", [("user_id", ASCENDING)], {"unique": True}),
+    ("braz_history", [("user_id", ASCENDING)], {"unique": True}),
+    ("blocked_users", [("user_id", ASCENDING)], {"unique": True}),
+    ("verify_id", [("user_id", ASCENDING), ("hash", ASCENDING)], {}),
+    ("codes", [("code_hash", ASCENDING)], {"unique": True}),
+    ("misc", [("user_id", ASCENDING)], {"unique": True}),
+    ("misc", [("last_verified", ASCENDING)], {}),
+    ("referrals", [("user_id", ASCENDING)], {"unique": True}),
+    ("auto_delete", [("due_at", ASCENDING)], {}),
+    ("post_queue", [("status", ASCENDING), ("created_at", ASCENDING)], {}),
+    ("post_queue", [("file_unique_id", ASCENDING)], {"unique": True}),
+    ("broadcast_deliveries", [("job_id", ASCENDING), ("user_id", ASCENDING)], {"unique": True}),
+]
+
+# Representative hot lookups: (collection, filter, projection)
+HOT_QUERIES = [
+    ("users", {"id": 0}, {"_id": 0, "id": 1}),
+    ("users", {"expiry_time": {"$gt": 0}}, {"_id": 0, "expiry_time": 1}),
+    ("videoz", {"file_unique_id": ""}, {"_id": 0, "file_unique_id": 1}),
+    ("videoz", {"ordinal": {"$in": [0]}}, {"_id": 0, "ordinal": 1, "file_id": 1}),
+    ("brazzers", {"file_unique_id": ""}, {"_id": 0, "file_unique_id": 1}),
+    ("historyz", {"user_id": 0}, {"_id": 0, "cursor": 1, "bitmap": 1}),
+    ("blocked_users", {"user_id": 0}, {"_id": 0, "user_id": 1}),
+    ("verify_id", {"user_id": 0, "hash": ""}, None),
+    ("codes", {"code_hash": ""}, None),
+]
+
+
+def _index_name(keys):
+    return "_".join(f"{field}_{direction}" for field, direction in keys)
+
+
+def _stages(plan):
+    """Yield every stage name in an explain() plan tree."""
+    if not isinstance(plan, dict):
+        return
+    if "stage" in plan:
+        yield plan["stage"]
+    for key in ("inputStage", "queryPlan"):
+        yield from _stages(plan.get(key))
+    for child in plan.get("inputStages", []):
+        yield from _stages(child)
+
+
+class IndexManager:
+    def __init__(self, database):
+        self.database = database
+
+    async def ensure_indexes(self):
+        """Create whatever is missing. Safe to run on every start."""
+        created = 0
+        for name, keys, options in INDEXES:
+            collection = self.database[name]
+            index_name = _index_name(keys)
+            try:
+                existing = await collection.index_information()
+            except OperationFailure:
+                existing = {}
+            if index_name in existing:
+                continue
+            try:
+                await collection.create_index(keys, name=index_name, background=True, **options)
+                created += 1
+            except OperationFailure as e:
+                if not options.get("unique"):
+                    logger.error(f"Index {name}.{index_name} failed: {e}")
+                    continue
+                # Old duplicates block a unique build; keep the lookup fast anyway
+                logger.warning(f"Unique index {name}.{index_name} failed ({e}), building non-unique")
+                try:
+                    await collection.create_index(keys, name=index_name, background=True)
+                    created += 1
+                except OperationFailure as e:
+                    logger.error(f"Index {name}.{index_name} failed: {e}")
+        if created:
+            logger.info(f"Built {created} missing indexes")
+        return created
+
+    async def check_query_plans(self):
+        """Explain every hot query; warn on COLLSCAN. Returns {query: stages}."""
+        plans = {}
+        for name, query, projection in HOT_QUERIES:
+            label = f"{name} {list(query)}"
+            try:
+                explain = await self.database[name].find(query, projection).limit(1).explain()
+            except Exception as e:
+                logger.warning(f"Explain failed for {label}: {e}")
+                continue
+            stages = list(_stages(explain.get("queryPlanner", {}).get("winningPlan", {})))
+            plans[label] = stages
+            if "COLLSCAN" in stages:
+                logger.warning(f"Hot query falls back to COLLSCAN: {label}")
+        return plans
+
+    async def index_usage(self):
+        """{collection: {index_name: ops since server start}} from $indexStats."""
+        usage = {}
+        for name in sorted({name for name, _, _ in INDEXES}):
+            try:
+                cursor = self.database[name].aggregate([{"$indexStats": {}}])
+                usage[name] = {
+                    stat["name"]: stat.get("accesses", {}).get("ops", 0)
+                    async for stat in cursor
+                }
+            except OperationFailure as e:
+                logger.warning(f"$indexStats unavailable for {name}: {e}")
+        return usage
+
+    async def bootstrap(self):
+        try:
+            await self.ensure_indexes()
+            await self.check_query_plans()
+        except Exception as e:
+            logger.error(f"Index bootstrap failed: {e}")
+
+
+# 🔹 Initialize
+index_manager = IndexManager(mydb)
@@ -0,0 +1,45 @@
+import os
+
+# -------------------- DAILY USAGE REPORT --------------------
+# Shared by /all_users_stats and the 23:59 auto report. Streams the
+# db.usage_report() aggregation straight into a text file and keeps only
+# the first few entries in memory for the short (chat message) form.
+class UsageReport:
+    def __init__(self, file_path, title, format_entry, preview=10):
+        self.file_path = file_path
+        self.title = title
+        self.format_entry = format_entry
+        self.preview = preview
+        self.entries = []
+        self.active_users = 0
+        self.total_files = 0
+
+    @property
+    def is_long(self):
+        return self.active_users > self.preview
+
+    async def build(self, cursor):
+        with open(self.file_path, "w", encoding="utf-8") as f:
+            f.write(f"{self.title}\n")
+            f.write("=================================\n\n")
+            first = True
+            async for row in cursor:
+                if row.get("_id") == "totals":
+                    self.active_users = row.get("active_users", 0)
+                    self.total_files = row.get("total_files", 0)
+                    continue
+                entry = self.format_entry(row)
+                if not first:
+                    f.write("\n\n---------------------------------\n\n")
+                f.write(entry)
+                first = False
+                if len(self.entries) <= self.preview:
+                    self.entries.append(entry)
+            f.write("\n\n=================================\n")
+            f.write(f"Total Active Users: {self.active_users}\n")
+            f.write(f"Total Files Used: {self.total_files}")
+        return self
+
+    def cleanup(self):
+        if os.path.exists(self.file_path):
+            os.remove(self.file_path)
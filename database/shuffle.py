@@ -0,0 +1,45 @@
+import random
+
+# -------------------- SEEDED PERMUTATION --------------------
+# Small Feistel network + cycle walking.
+# permute(i, size, seed) maps every i in [0, size) to a unique slot in
+# [0, size), so a user can walk a shuffled catalog with only (seed, pos).
+
+ROUNDS = 4
+
+
+def new_seed():
+    return random.getrandbits(32)
+
+
+def _round(value, seed, rnd):
+    h = (value * 0x9E3779B1 + seed * 0x85EBCA6B + rnd * 0xC2B2AE35) & 0xFFFFFFFF
+    h ^= h >> 16
+    h = (h * 0x45D9F3B) & 0xFFFFFFFF
+    h ^= h >> 16
+    return h
+
+
+def _feistel(x, half, mask, seed):
+    left, right = x >> half, x & mask
+    for rnd in range(ROUNDS):
+        left, right = right, left ^ (_round(right, seed, rnd) & mask)
+    return (left << half) | right
+
+
+def permute(index, size, seed):
+    if size <= 1:
+        return 0
+
+    bits = max((size - 1).bit_length(), 2)
+    if bits % 2:
+        bits += 1
+    half = bits // 2
+    mask = (1 << half) - 1
+
+    # Walk until we land back inside [0, size)
+    x = index
+    while True:
+        x = _feistel(x, half, mask, seed)
+        if x < size:
+            return x
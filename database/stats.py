@@ -0,0 +1,75 @@
+import time
+import asyncio
+import logging
+from info import DB_STORAGE_QUOTA, STATS_MAX_AGE, STATS_REFRESH_INTERVAL
+from database.users_db import db
+
+logger = logging.getLogger(__name__)
+
+
+# -------------------- STATS SNAPSHOT --------------------
+# /stats reads a snapshot refreshed in the background. Whole-collection
+# totals use collection metadata (estimated_document_count); only the
+# premium count needs a filtered, indexed count.
+class StatsService:
+    def __init__(self, database, max_age=STATS_MAX_AGE, refresh_interval=STATS_REFRESH_INTERVAL):
+        self.db = database
+        self.max_age = max_age
+        self.refresh_interval = refresh_interval
+        self.snapshot = None
+        self.taken_at = 0.0
+        self._lock = asyncio.Lock()
+
+    @property
+    def age(self):
+        return time.monotonic() - self.taken_at
+
+    async def _collect(self):
+        (total_users, premium_users, mixfiles, brazzers,
+         blocked, redeem, dbsize) = await asyncio.gather(
+            self.db.users.estimated_document_count(),
+            self.db.premium_users_count(),
+            self.db.videos.estimated_document_count(),
+            self.db.brazzers.estimated_document_count(),
+            self.db.blocked_users.estimated_document_count(),
+            self.db.codes.estimated_document_count(),
+            self.db.get_db_size()
+        )
+        return {
+            "total_users": total_users,
+            "premium_users": premium_users,
+            "mixfiles": mixfiles,
+            "brazzers": brazzers,
+            "blocked": blocked,
+            "redeem": redeem,
+            "dbsize": dbsize,
+            "freespace": max(DB_STORAGE_QUOTA - dbsize, 0)
+        }
+
+    async def refresh(self):
+        # Concurrent callers share one refresh instead of each hitting the DB
+        taken_at = self.taken_at
+        async with self._lock:
+            if self.taken_at != taken_at and self.snapshot is not None:
+                return self.snapshot
+            self.snapshot = await self._collect()
+            self.taken_at = time.monotonic()
+            return self.snapshot
+
+    async def get(self):
+        """Latest snapshot, refreshed inline only if older than max_age."""
+        if self.snapshot is None or self.age > self.max_age:
+            return await self.refresh()
+        return self.snapshot
+
+    async def run(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Stats refresh failed: {e}")
+            await asyncio.sleep(self.refresh_interval)
+
+
+# 🔹 Initialize
+stats_service = StatsService(db)
@@ -0,0 +1,87 @@
+import time
+import pytz
+from collections import OrderedDict
+from datetime import datetime, timezone
+from info import TIMEZONE
+
+# Only the fields the hot request path needs
+HOT_FIELDS = {
+    "_id": 0, "id": 1, "expiry_time": 1, "video_count": 1,
+    "last_date": 1, "temp_ban_expiry": 1
+}
+
+
+def _as_utc(value):
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+# -------------------- USER SNAPSHOT --------------------
+class UserState:
+    """Raw hot fields of one user doc; derived values are computed on access."""
+    __slots__ = ("user_id", "exists", "expiry_time", "video_count", "last_date", "temp_ban_expiry")
+
+    def __init__(self, user_id, doc=None):
+        doc = doc or {}
+        self.user_id = user_id
+        self.exists = bool(doc)
+        self.expiry_time = doc.get("expiry_time")
+        self.video_count = doc.get("video_count", 0)
+        self.last_date = doc.get("last_date")
+        self.temp_ban_expiry = doc.get("temp_ban_expiry")
+
+    @property
+    def is_premium(self):
+        if not isinstance(self.expiry_time, datetime):
+            return False
+        return datetime.now(timezone.utc) <= _as_utc(self.expiry_time)
+
+    @property
+    def used_today(self):
+        if not isinstance(self.last_date, datetime):
+            return 0
+        if self.last_date.tzinfo is not None:
+            check_date = self.last_date.astimezone(pytz.timezone(TIMEZONE)).date()
+        else:
+            check_date = self.last_date.date()
+        today = datetime.now(pytz.timezone(TIMEZONE)).date()
+        return (self.video_count or 0) if check_date == today else 0
+
+    @property
+    def temp_ban_remaining(self):
+        if not isinstance(self.temp_ban_expiry, datetime):
+            return 0
+        remaining = (_as_utc(self.temp_ban_expiry) - datetime.now(timezone.utc)).total_seconds()
+        return max(int(remaining), 0)
+
+
+# -------------------- TTL + LRU CACHE --------------------
+class UserStateCache:
+    def __init__(self, max_size=5000, ttl=30):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._items = OrderedDict()
+
+    def get(self, user_id):
+        item = self._items.get(user_id)
+        if not item:
+            return None
+        state, stored_at = item
+        if time.monotonic() - stored_at > self.ttl:
+            del self._items[user_id]
+            return None
+        self._items.move_to_end(user_id)
+        return state
+
+    def put(self, state):
+        self._items[state.user_id] = (state, time.monotonic())
+        self._items.move_to_end(state.user_id)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    def invalidate(self, user_id):
+        self._items.pop(user_id, None)
+
+    def clear(self):
+        self._items.clear()
@@ -1,9 +1,18 @@
 import pytz
-import random
+import asyncio
 import logging
 from datetime import datetime, timezone, timedelta
 from motor.motor_asyncio import AsyncIOMotorClient
-from info import DB_URL, DB_NAME, TIMEZONE, VERIFY_EXPIRE
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from bson import ObjectId
+from info import DB_URL, DB_NAME, TIMEZONE, VERIFY_EXPIRE, DAILY_LIMIT, PREMIUM_DAILY_LIMIT
+from database.shuffle import permute, new_seed
+from database import bitmap
+from database.user_state import UserState, UserStateCache, HOT_FIELDS
+from database.catalog import Catalog
+from database.feed import MongoFeed
+from database.bans import BanRegistry
 
 # Logger Setup
 logger = logging.getLogger(__name__)
@@ -12,6 +21,20 @@ logger = logging.getLogger(__name__)
 client = AsyncIOMotorClient(DB_URL)
 mydb = client[DB_NAME]
 
+# Premium reminders: (label, time before expiry). Flag "reminder_<label>_sent"
+REMINDER_TIMES = [
+    ("1d", timedelta(days=1)),
+    ("5h30m", timedelta(hours=5, minutes=30)),
+    ("10m", timedelta(minutes=10))
+]
+REMINDER_FLAGS = {f"reminder_{label}_sent": "" for label, _ in REMINDER_TIMES}
+
+def skipped_reminders(expiry, now):
+    """Labels already due when premium is granted with this expiry."""
+    if expiry.tzinfo is None:
+        expiry = expiry.replace(tzinfo=timezone.utc)
+    return [label for label, delta in REMINDER_TIMES if expiry - delta <= now]
+
 # ⏰ IST Timezone Helper (Using pytz for accuracy)
 def get_ist_now():
     return datetime.now(pytz.timezone(TIMEZONE))
@@ -21,7 +44,12 @@ def get_ist_today():
 
 # -------------------- DATABASE CLASS --------------------
 class Database:
-    def __init__(self):
+    # Positions probed per round trip when walking a user's shuffle
+    CURSOR_BATCH = 32
+    # Compare-and-set attempts on a user's history doc before giving up
+    HISTORY_RETRIES = 5
+
+    def __init__(self, feed=None):
         self.users = mydb.users
         self.codes = mydb.codes
         self.misc = mydb.misc
@@ -32,32 +60,106 @@ class Database:
         self.refer_collection = mydb.referrals
         self.braz_history = mydb.braz_history        
         self.blocked_users = mydb.blocked_users
+        self.counters = mydb.counters
+        self.index_checkpoints = mydb.index_checkpoints
+
+        # kind -> catalog collection / per-user history (bitmap + cursor)
+        self.catalogs = {"videoz": self.videos, "brazzers": self.brazzers}
+        self.histories = {"videoz": self.historys, "brazzers": self.braz_history}
+
+        # Process-local copy of each catalog, filled by load_catalogs()
+        self.memory = {kind: Catalog(kind) for kind in self.catalogs}
+
+        # Keeps every replica's caches in step (see database/feed.py)
+        self.feed = feed if feed is not None else MongoFeed(mydb.invalidations)
+        self.feed.subscribe("user", lambda key, data: self.user_cache.invalidate(key))
+        self.feed.subscribe("catalog_add", self._on_catalog_add)
+        self.feed.subscribe("catalog_reset", lambda key, data: self.memory[key].clear())
+        self.feed.on_resync(self._resync_caches)
+
+        # Recently active users' hot fields, dropped on every write
+        self.user_cache = UserStateCache()
+
+        # Blocked users + active temp bans in memory (see database/bans.py)
+        self.bans = BanRegistry()
+        self.feed.subscribe("ban", self._on_ban_event)
+
+    # ---------- USER SNAPSHOT (HOT PATH) ----------
+    async def get_user_state(self, user_id):
+        """One projected read per request; repeat calls hit the cache."""
+        state = self.user_cache.get(user_id)
+        if state is None:
+            doc = await self.users.find_one({"id": user_id}, HOT_FIELDS)
+            state = UserState(user_id, doc)
+            self.user_cache.put(state)
+        return state
+
+    def invalidate_user(self, user_id):
+        self.user_cache.invalidate(user_id)
+        self.feed.publish("user", user_id)
+
+    def _on_ban_event(self, user_id, data):
+        if "blocked" in data:
+            if data["blocked"]:
+                self.bans.block(user_id)
+            else:
+                self.bans.unblock(user_id)
+        if "temp_ban_expiry" in data:
+            self.bans.add_temp_ban(user_id, data["temp_ban_expiry"])
+
+    async def _resync_caches(self):
+        """The feed may have dropped events: rebuild everything it keeps in step."""
+        logger.info("Invalidation feed reconnected, reloading caches")
+        self.user_cache.clear()
+        await self.load_catalogs()
+        await self.load_bans()
+
+    def _on_catalog_add(self, kind, data):
+        memory = self.memory[kind]
+        for ordinal, file_unique_id, file_id in data.get("entries", []):
+            memory.add(ordinal, file_unique_id, file_id)
 
     # ---------- USERS ----------
     async def add_user(self, id, name):
-        if not await self.users.find_one({"id": id}):
-            await self.users.insert_one({
-                "id": id,
+        # Upsert, so two /start in a row can't trip the unique id index
+        result = await self.users.update_one(
+            {"id": id},
+            {"$setOnInsert": {
                 "name": name,
                 "video_count": 0,
                 "last_date": None,
                 "expiry_time": None
-            })
+            }},
+            upsert=True
+        )
+        if result.upserted_id is not None:
+            self.invalidate_user(id)
 
     async def is_user_exist(self, id):
-        return bool(await self.users.find_one({'id': int(id)}))
+        return bool(await self.users.find_one({'id': int(id)}, {"_id": 0, "id": 1}))
 
     async def total_users_count(self):
         return await self.users.count_documents({})
 
     async def delete_user(self, user_id):
         await self.users.delete_many({'id': int(user_id)})
+        self.invalidate_user(int(user_id))
+
+    async def delete_users(self, user_ids):
+        """One delete_many for a batch of dead chats (broadcast cleanup)."""
+        if not user_ids:
+            return 0
+        result = await self.users.delete_many({"id": {"$in": list(user_ids)}})
+        for user_id in user_ids:
+            self.invalidate_user(user_id)
+        return result.deleted_count
 
     async def get_user(self, user_id):
         return await self.users.find_one({"id": user_id})
 
     async def update_user(self, user_data):
         await self.users.update_one({"id": user_data["id"]}, {"$set": user_data}, upsert=True)
+        self.invalidate_user(user_data["id"])
 
     async def get_all_users(self):
         return self.users.find({})
@@ -78,11 +180,11 @@ class Database:
     # ---------- REFERRAL SYSTEM ----------
     
     async def is_user_in_list(self, user_id):
-        user = await self.refer_collection.find_one({"user_id": int(user_id)})
+        user = await self.refer_collection.find_one({"user_id": int(user_id)}, {"_id": 0, "user_id": 1})
         return True if user else False
 
     async def get_refer_points(self, user_id: int):
-        user = await self.refer_collection.find_one({"user_id": int(user_id)})
+        user = await self.refer_collection.find_one({"user_id": int(user_id)}, {"_id": 0, "points": 1})
         return user.get("points", 0) if user else 0
 
     async def add_refer_points(self, user_id: int, points: int):
@@ -110,7 +212,7 @@ class Database:
     # ---------- MANUAL PAYMENT (ADD PREMIUM) ----------
     async def add_premium_access(self, user_id, days):
         # Current expiry check karo
-        user = await self.get_user(user_id)
+        user = await self.users.find_one({"id": user_id}, {"_id": 0, "expiry_time": 1}) or {}
         now = datetime.now(timezone.utc)
         
         current_expiry = user.get("expiry_time")
@@ -129,10 +231,7 @@ class Database:
             # Agar premium nahi hai, to abhi se start karo
             new_expiry = now + timedelta(days=days)
 
-        await self.users.update_one(
-            {"id": user_id},
-            {"$set": {"expiry_time": new_expiry}}
-        )
+        await self.set_premium_expiry(user_id, new_expiry)
         return new_expiry
         
     # ---------- BLOCK SYSTEM ----------
@@ -140,14 +239,31 @@ class Database:
     async def unblock_user(self, user_id: int):
         """Unblock a user."""
         await self.blocked_users.delete_one({"user_id": user_id})
+        self.bans.unblock(user_id)
+        self.feed.publish("ban", user_id, {"blocked": False})
 
     async def get_all_blocked_users(self):
         """Fetch all blocked users."""
         return self.blocked_users.find({})
 
     # ---------- ADVANCED BAN SYSTEM DB ----------
+    async def load_bans(self):
+        blocked, temp = await self.bans.reconcile(self.blocked_users, self.users)
+        logger.info(f"Loaded {blocked} blocked users and {temp} temp bans into memory")
+
+    async def reconcile_bans(self, interval=300):
+        """Periodic re-sync, catching writes made outside this code."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.bans.reconcile(self.blocked_users, self.users)
+            except Exception as e:
+                logger.error(f"Ban reconcile failed: {e}")
+
     async def is_user_blocked(self, user_id):
-        user = await self.blocked_users.find_one({"user_id": user_id})
+        if self.bans.loaded:
+            return self.bans.is_blocked(user_id)
+        user = await self.blocked_users.find_one({"user_id": user_id}, {"_id": 0, "user_id": 1})
         return bool(user)
 
     async def block_user(self, user_id, reason="Spam"):
@@ -156,6 +272,8 @@ class Database:
             {"$set": {"blocked_at": datetime.now(timezone.utc), "reason": reason}},
             upsert=True
         )
+        self.bans.block(user_id)
+        self.feed.publish("ban", user_id, {"blocked": True})
 
     async def add_temp_ban(self, user_id, duration_seconds):
         expiry = datetime.now(timezone.utc) + timedelta(seconds=duration_seconds)
@@ -163,81 +281,105 @@ class Database:
             {"id": user_id},
             {"$set": {"temp_ban_expiry": expiry}}
         )
+        self.bans.add_temp_ban(user_id, expiry.timestamp())
+        self.invalidate_user(user_id)
+        self.feed.publish("ban", user_id, {"temp_ban_expiry": expiry.timestamp()})
 
     async def is_temp_banned(self, user_id):
-        user = await self.users.find_one({"id": user_id})
-        if not user or "temp_ban_expiry" not in user:
-            return False, 0
-            
-        expiry = user["temp_ban_expiry"]
-        if expiry.tzinfo is None:
-            expiry = expiry.replace(tzinfo=timezone.utc)
-            
-        now = datetime.now(timezone.utc)
-        if now < expiry:
-            remaining = int((expiry - now).total_seconds())
-            return True, remaining
-        else:
-            # Ban expire ho gaya, remove field
-            await self.users.update_one({"id": user_id}, {"$unset": {"temp_ban_expiry": ""}})
-            return False, 0
+        # Expired bans just read as 0 remaining, no cleanup write needed
+        if self.bans.loaded:
+            remaining = self.bans.temp_ban_remaining(user_id)
+            return remaining > 0, remaining
+        remaining = (await self.get_user_state(user_id)).temp_ban_remaining
+        return remaining > 0, remaining
             
     # ---------- PREMIUM / EXPIRY ----------
     async def has_premium_access(self, user_id):
-        user_data = await self.get_user(user_id)
-        if not user_data:
-            return False
-
-        expiry_time = user_data.get("expiry_time")
-        if not expiry_time:
-            return False
-
-        # Use UTC for comparison
-        now = datetime.now(timezone.utc)
-        
-        if isinstance(expiry_time, datetime):
-            # If stored time is naive (no timezone), treat it as UTC
-            if expiry_time.tzinfo is None:
-                expiry_time = expiry_time.replace(tzinfo=timezone.utc)
-            return now <= expiry_time
-        else:
-            await self.users.update_one({"id": user_id}, {"$set": {"expiry_time": None}})
-            return False
+        return (await self.get_user_state(user_id)).is_premium
 
     async def update_one(self, filter_query, update_data):
         try:
             result = await self.users.update_one(filter_query, update_data)
+            if "id" in filter_query:
+                self.invalidate_user(filter_query["id"])
             return result.matched_count == 1
         except Exception as e:
             print(f"Error updating document: {e}")
             return False
 
-    async def get_expired(self, current_time):
-        expired_users = []
-        # Ensure current_time is consistent with DB storage (UTC usually)
-        cursor = self.users.find({"expiry_time": {"$lt": current_time}})
-        async for user in cursor:
-            expired_users.append(user)
-        return expired_users
+    async def set_premium_expiry(self, user_id, expiry, name=None):
+        """
+        Grant/extend premium; a new expiry re-arms every reminder. Reminders
+        already due at grant time (e.g. "1d" on a 1h grant) are marked sent,
+        so a restart can't mistake them for missed ones.
+        """
+        fields = {"expiry_time": expiry}
+        if name:
+            fields["name"] = name
+        skipped = skipped_reminders(expiry, datetime.now(timezone.utc))
+        fields.update({f"reminder_{label}_sent": True for label in skipped})
+        unset = {key: "" for key in REMINDER_FLAGS if key not in fields}
+        unset["expired_claim"] = ""
+        await self.users.update_one(
+            {"id": user_id},
+            {"$set": fields, "$unset": unset},
+            upsert=True
+        )
+        self.invalidate_user(user_id)
+
+    async def get_premium_schedule(self):
+        """Everyone with an expiry date set (expiry_time index)."""
+        projection = {"_id": 0, "id": 1, "expiry_time": 1, **{key: 1 for key in REMINDER_FLAGS}}
+        return self.users.find({"expiry_time": {"$type": "date"}}, projection)
+
+    async def get_active_premium_users(self, now=None):
+        """Paid users only, soonest expiry first (expiry_time index)."""
+        now = now or datetime.now(timezone.utc)
+        return self.users.find(
+            {"expiry_time": {"$gt": now}},
+            {"_id": 0, "id": 1, "expiry_time": 1}
+        ).sort("expiry_time", 1).batch_size(200)
+
+    async def expire_premium_users(self, user_ids, now):
+        """
+        Clear expiry for users whose time is really up. The batch is claimed
+        with one conditional update_many stamped with a fresh token, so of
+        several replicas each user lands with exactly one; the token is then
+        read back to see which ones this call got. Returns those ids.
+        """
+        token = ObjectId()
+        await self.users.update_many(
+            {"id": {"$in": user_ids}, "expiry_time": {"$lte": now}},
+            {"$set": {"expiry_time": None, "expired_claim": token}, "$unset": REMINDER_FLAGS}
+        )
+        expired = await self._claimed_by(user_ids, "expired_claim", token)
+        for user_id in expired:
+            self.invalidate_user(user_id)
+        return expired
+
+    async def claim_reminders(self, user_ids, label, now):
+        """
+        Set reminder_<label>_sent where it isn't yet; returns the ids this
+        call claimed. The flag holds the claim token until it's released.
+        """
+        flag = f"reminder_{label}_sent"
+        token = ObjectId()
+        await self.users.update_many(
+            {"id": {"$in": user_ids}, "expiry_time": {"$gt": now}, flag: {"$in": [None, False]}},
+            {"$set": {flag: token}}
+        )
+        return await self._claimed_by(user_ids, flag, token)
 
-    async def get_expiring_soon(self, label, delta):
-        reminder_key = f"reminder_{label}_sent"
-        now = datetime.now(timezone.utc)
-        target_time = now + delta
-        window = timedelta(seconds=30)
-        start_range = target_time - window
-        end_range = target_time + window
-        reminder_users = []
-        cursor = self.users.find({
-            "expiry_time": {"$gte": start_range, "$lte": end_range},
-            reminder_key: {"$ne": True}
-        })
-        async for user in cursor:
-            reminder_users.append(user)
-            await self.users.update_one(
-                {"id": user["id"]}, {"$set": {reminder_key: True}}
-            )
-        return reminder_users
+    async def _claimed_by(self, user_ids, field, token):
+        cursor = self.users.find({"id": {"$in": user_ids}, field: token}, {"_id": 0, "id": 1})
+        return [user["id"] async for user in cursor]
+
+    async def release_reminders(self, user_ids, label):
+        """Give back claims whose notice could not be delivered."""
+        await self.users.update_many(
+            {"id": {"$in": user_ids}},
+            {"$unset": {f"reminder_{label}_sent": ""}}
+        )
 
     async def remove_premium_access(self, user_id):
         return await self.update_one(
@@ -253,18 +395,107 @@ class Database:
         stats = await mydb.command("dbstats")
         return stats.get("dataSize", 0)
 
+    # ---------- CHANNEL INDEX CHECKPOINTS ----------
+    async def get_index_checkpoint(self, chat_id, kind):
+        """Last message id fully written for (channel, target), or None."""
+        doc = await self.index_checkpoints.find_one({"_id": f"{chat_id}:{kind}"}, {"_id": 0, "last_id": 1})
+        return doc["last_id"] if doc else None
+
+    async def set_index_checkpoint(self, chat_id, kind, last_id):
+        await self.index_checkpoints.update_one(
+            {"_id": f"{chat_id}:{kind}"},
+            {"$set": {"chat_id": chat_id, "kind": kind, "last_id": last_id, "updated_at": datetime.now(timezone.utc)}},
+            upsert=True
+        )
+
     # ---------- VIDEOS SYSTEM ----------
+    async def get_thumb_file_id(self, file_unique_id, kind="videoz"):
+        """Telegram photo file_id of a thumbnail already uploaded for this video."""
+        doc = await self.catalogs[kind].find_one(
+            {"file_unique_id": file_unique_id}, {"_id": 0, "thumb_file_id": 1}
+        )
+        return doc.get("thumb_file_id") if doc else None
+
+    async def set_thumb_file_id(self, file_unique_id, thumb_file_id, kind="videoz"):
+        await self.catalogs[kind].update_one(
+            {"file_unique_id": file_unique_id}, {"$set": {"thumb_file_id": thumb_file_id}}
+        )
+
      # ✅ Ye Line Jaruri Hai (Duplicate)
     async def add_video(self, file_unique_id, file_id):
-        exists = await self.videos.find_one({"file_unique_id": file_unique_id})
-        if not exists:
-            await self.videos.insert_one({
-                "file_unique_id": file_unique_id,
-                "file_id": file_id,
-                "added_at": datetime.now(timezone.utc)
-            })
-            return True
-        return False
+        result = await self.add_videos_bulk("videoz", [(file_unique_id, file_id, None)])
+        return result["new"] == 1
+
+    async def add_videos_bulk(self, kind, entries):
+        """
+        entries: [(file_unique_id, file_id, metadata or None), ...]
+        One unordered insert_many against the unique file_unique_id index.
+        Returns {"new": n, "duplicate": n, "failed": n}; "failed" counts
+        write errors other than duplicate keys.
+        """
+        collection = self.catalogs[kind]
+        batch = {}
+        for file_unique_id, file_id, metadata in entries:
+            batch.setdefault(file_unique_id, (file_id, metadata))
+        duplicate = len(entries) - len(batch)
+        if not batch:
+            return {"new": 0, "duplicate": duplicate, "failed": 0}
+
+        # Drop known duplicates first so they don't burn ordinals
+        known = collection.find(
+            {"file_unique_id": {"$in": list(batch)}}, {"_id": 0, "file_unique_id": 1}
+        )
+        async for doc in known:
+            batch.pop(doc["file_unique_id"], None)
+            duplicate += 1
+        if not batch:
+            return {"new": 0, "duplicate": duplicate, "failed": 0}
+
+        first = await self.next_ordinals(kind, len(batch))
+        now = datetime.now(timezone.utc)
+        docs = []
+        for ordinal, (file_unique_id, (file_id, metadata)) in enumerate(batch.items(), first):
+            doc = {"added_at": now, **(metadata or {})}
+            doc.update(file_unique_id=file_unique_id, file_id=file_id, ordinal=ordinal)
+            docs.append(doc)
+
+        failed = set()
+        write_errors = 0
+        try:
+            result = await collection.insert_many(docs, ordered=False)
+            new = len(result.inserted_ids)
+        except BulkWriteError as e:
+            # Someone else inserted the same file in between
+            new = e.details.get("nInserted", 0)
+            errors = e.details.get("writeErrors", [])
+            failed = {err["index"] for err in errors}
+            duplicates = sum(1 for err in errors if err.get("code") == 11000)
+            duplicate += duplicates
+            write_errors = len(errors) - duplicates
+
+        memory = self.memory[kind]
+        added = []
+        for i, doc in enumerate(docs):
+            if i not in failed:
+                memory.add(doc["ordinal"], doc["file_unique_id"], doc["file_id"])
+                added.append([doc["ordinal"], doc["file_unique_id"], doc["file_id"]])
+        if added:
+            self.feed.publish("catalog_add", kind, {"entries": added})
+        return {"new": new, "duplicate": duplicate, "failed": write_errors}
+
+    async def load_catalogs(self):
+        for kind, collection in self.catalogs.items():
+            count = await self.memory[kind].load(collection)
+            logger.info(f"Loaded {count} {kind} entries into memory")
+
+    async def get_catalog_file(self, kind, file_unique_id):
+        memory = self.memory[kind]
+        if memory.loaded:
+            return memory.get_by_unique(file_unique_id)
+        doc = await self.catalogs[kind].find_one(
+            {"file_unique_id": file_unique_id}, {"_id": 0, "file_id": 1}
+        )
+        return doc["file_id"] if doc else None
         
 
     async def total_videos(self):
@@ -274,94 +505,110 @@ class Database:
     async def delete_main_data(self):
         await self.videos.delete_many({})
         await self.historys.delete_many({})
+        await self.reset_catalog_ordinals("videoz")
+        self.memory["videoz"].clear()
+        self.feed.publish("catalog_reset", "videoz")
         return True
 
     # 2. Brazzers aur Braz History delete karne ke liye
     async def delete_brazzers_data(self):
         await self.brazzers.delete_many({})
         await self.braz_history.delete_many({})
+        await self.reset_catalog_ordinals("brazzers")
+        self.memory["brazzers"].clear()
+        self.feed.publish("catalog_reset", "brazzers")
         return True
         
-    async def increase_video_count(self, user_id, username):
-        today = get_ist_today()
-        # Convert today date to datetime object for storage (Midnight)
-        today_dt = datetime.combine(today, datetime.min.time())
+    # ---------- DAILY QUOTA ----------
+    @staticmethod
+    def _today_dt():
+        # Stored as naive IST midnight, same as before
+        return datetime.combine(get_ist_today(), datetime.min.time())
 
-        user = await self.users.find_one({"id": user_id})
+    async def reserve_quota(self, user_id, limit=None, username=None):
+        """
+        Day rollover, limit check and increment in one atomic round trip.
+        Returns the new daily count, or None when the limit is already used up.
+        limit=None reserves without a cap.
+        """
+        today_dt = self._today_dt()
+        used = {"$cond": [
+            {"$gte": ["$last_date", today_dt]},
+            {"$ifNull": ["$video_count", 0]},
+            0
+        ]}
+        query = {"id": user_id}
+        if limit is not None:
+            query["$expr"] = {"$lt": [used, limit]}
+
+        fields = {"video_count": {"$add": [used, 1]}, "last_date": today_dt}
+        if username:
+            fields["username"] = username
+
+        for _ in range(2):
+            doc = await self.users.find_one_and_update(
+                query,
+                [{"$set": fields}],
+                projection={"_id": 0, "video_count": 1},
+                return_document=ReturnDocument.AFTER
+            )
+            self.invalidate_user(user_id)
+            if doc:
+                return doc["video_count"]
+            if (await self.get_user_state(user_id)).exists:
+                return None
+            await self.add_user(user_id, username or "Unknown")
+        return None
 
-        if user:
-            last_date = user.get("last_date")
-            
-            # Safe conversion of stored date
-            if isinstance(last_date, datetime):
-                if last_date.tzinfo is not None:
-                    # Convert to IST if aware
-                    check_date = last_date.astimezone(pytz.timezone(TIMEZONE)).date()
-                else:
-                    # Treat naive as is
-                    check_date = last_date.date()
-            else:
-                check_date = None
-
-            if check_date != today:
-                await self.users.update_one(
-                    {"id": user_id},
-                    {"$set": {
-                        "video_count": 1,
-                        "last_date": today_dt,
-                        "username": username
-                    }}
-                )
-            else:
-                await self.users.update_one(
-                    {"id": user_id},
-                    {"$inc": {"video_count": 1},
-                     "$set": {"username": username}}
-                )
-        else:
-            await self.users.insert_one({
-                "id": user_id,
-                "name": username,
-                "video_count": 1,
-                "last_date": today_dt,
-                "expiry_time": None
-            })
+    def usage_report(self):
+        """
+        One aggregation over today's active users (last_date index): per-user
+        rows with plan/limit/remaining, then a final {"_id": "totals"} row.
+        """
+        now = datetime.now(timezone.utc)
+        match = {"$match": {"last_date": {"$gte": self._today_dt()}, "video_count": {"$gt": 0}}}
+        is_premium = {"$and": [
+            {"$eq": [{"$type": "$expiry_time"}, "date"]},
+            {"$gte": ["$expiry_time", now]}
+        ]}
+        return self.users.aggregate([
+            match,
+            {"$project": {
+                "_id": 0, "id": 1, "username": 1, "expiry_time": 1,
+                "used": "$video_count", "is_premium": is_premium,
+                "daily_limit": {"$cond": [is_premium, PREMIUM_DAILY_LIMIT, DAILY_LIMIT]}
+            }},
+            {"$set": {"remaining": {"$max": [{"$subtract": ["$daily_limit", "$used"]}, 0]}}},
+            {"$unionWith": {"coll": self.users.name, "pipeline": [
+                match,
+                {"$group": {"_id": "totals", "active_users": {"$sum": 1}, "total_files": {"$sum": "$video_count"}}}
+            ]}}
+        ], allowDiskUse=True)
+
+    async def release_quota(self, user_id):
+        """Give back a reservation when the video could not be delivered."""
+        await self.users.update_one(
+            {"id": user_id, "last_date": {"$gte": self._today_dt()}, "video_count": {"$gt": 0}},
+            {"$inc": {"video_count": -1}}
+        )
+        self.invalidate_user(user_id)
+
+    async def increase_video_count(self, user_id, username):
+        await self.reserve_quota(user_id, None, username)
             
     async def get_video_count(self, user_id: int):
-        today = get_ist_today()
-        user = await self.users.find_one({"id": user_id})
-        if user:
-            last_date = user.get("last_date")
-            if isinstance(last_date, datetime):
-                if last_date.tzinfo is not None:
-                    check_date = last_date.astimezone(pytz.timezone(TIMEZONE)).date()
-                else:
-                    check_date = last_date.date()
-                    
-                if check_date == today:
-                    return user.get("video_count", 0)
-        return 0
+        return (await self.get_user_state(user_id)).used_today
         
     async def get_unseen_video(self, user_id):
-        seen = await self.historys.find_one({"user_id": user_id})
-        seen_ids = seen.get("seen", []) if seen else []
-
-        # Optimization: Only fetch file_id field, limit 500
-        cursor = self.videos.find({"file_id": {"$nin": seen_ids}}, {"file_id": 1}).limit(500)
-        unseen_videos = await cursor.to_list(length=500)
-
-        if not unseen_videos:
-            return None
-
-        video = random.choice(unseen_videos)
-        await self.mark_seen(user_id, video["file_id"])
-        return video["file_id"]
+        return await self.next_from_cursor(user_id, "videoz")
 
     async def get_random_video(self):
         """
         Gets a random video when user has seen everything.
-        Uses MongoDB $sample for efficiency.
+        O(1) from the in-memory catalog, $sample only before it is loaded.
         """
+        if self.memory["videoz"].loaded:
+            return self.memory["videoz"].random_file_id()
         try:
             pipeline = [{"$sample": {"size": 1}}]
             cursor = self.videos.aggregate(pipeline)
@@ -374,57 +621,230 @@ class Database:
         return None
 
     async def mark_seen(self, user_id, file_id):
-        await self.historys.update_one(
-            {"user_id": user_id},
-            {"$addToSet": {"seen": file_id}},
-            upsert=True
-        )
+        await self.mark_seen_file("videoz", user_id, file_id)
 
     async def reset_seen_videos(self, user_id: int):
-        await self.historys.update_one(
-            {"user_id": user_id},
-            {"$set": {"seen": []}},
-            upsert=True
-        )
+        await self.reset_history("videoz", user_id)
         
     async def add_brazzers_video(self, file_unique_id, file_id):
-        exists = await self.brazzers.find_one({"file_unique_id": file_unique_id})
-        if not exists:
-            await self.brazzers.insert_one({
-                "file_unique_id": file_unique_id,
-                "file_id": file_id
-            })
-            return True  # ✅ Ye Line Jaruri Hai (New File)
-        return False
+        result = await self.add_videos_bulk("brazzers", [(file_unique_id, file_id, None)])
+        return result["new"] == 1  # ✅ Ye Line Jaruri Hai (New File)
 
     # ✅ See Unseen Brazzers
     async def get_unseen_brazzers(self, user_id):
-        seen = await self.braz_history.find_one({"user_id": user_id})
-        seen_ids = seen.get("seen", []) if seen else []
-        cursor = self.brazzers.find({"file_id": {"$nin": seen_ids}})
-        unseen_videos = await cursor.to_list(length=1000)
-
-        if not unseen_videos:
-            return None
-
-        video = random.choice(unseen_videos)
-        await self.mark_brazzers_seen(user_id, video["file_id"])
-        return video["file_id"]
+        return await self.next_from_cursor(user_id, "brazzers")
 
     # ✅ Mark Brazzers Seen
     async def mark_brazzers_seen(self, user_id, file_id):
-        await self.braz_history.update_one(
-            {"user_id": user_id},
-            {"$addToSet": {"seen": file_id}},
-            upsert=True
-        )
+        await self.mark_seen_file("brazzers", user_id, file_id)
         
     async def reset_seen_brazzers(self, user_id: int):
-        await self.braz_history.update_one(
+        await self.reset_history("brazzers", user_id)
+
+    # ---------- CATALOG ORDINALS & SHUFFLE CURSORS ----------
+    # Every catalog entry gets a stable integer "ordinal" from a counter.
+    # Ordinals are never reused, so deleted videos just leave holes.
+    async def next_ordinals(self, kind, count):
+        """Reserve count consecutive ordinals, returns the first one."""
+        doc = await self.counters.find_one_and_update(
+            {"_id": kind},
+            {"$inc": {"seq": count}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return doc["seq"] - count
+
+    async def catalog_end(self, kind):
+        # One past the highest ordinal ever handed out
+        doc = await self.counters.find_one({"_id": kind})
+        return doc["seq"] if doc else 0
+
+    async def ensure_ordinals(self, kind):
+        """Backfill ordinals for entries indexed before ordinals existed."""
+        collection = self.catalogs[kind]
+        last = await collection.find_one(
+            {"ordinal": {"$exists": True}}, {"ordinal": 1}, sort=[("ordinal", -1)]
+        )
+        floor = last["ordinal"] + 1 if last else 0
+        if await self.catalog_end(kind) < floor:
+            await self.counters.update_one(
+                {"_id": kind}, {"$max": {"seq": floor}}, upsert=True
+            )
+
+        # One counter reservation and one bulk_write per chunk of legacy docs
+        assigned = 0
+        cursor = collection.find({"ordinal": {"$exists": False}}, {"_id": 1}).sort("_id", 1)
+        while True:
+            docs = await cursor.to_list(1000)
+            if not docs:
+                break
+            first = await self.next_ordinals(kind, len(docs))
+            await collection.bulk_write([
+                UpdateOne({"_id": doc["_id"], "ordinal": {"$exists": False}}, {"$set": {"ordinal": ordinal}})
+                for ordinal, doc in enumerate(docs, first)
+            ], ordered=False)
+            assigned += len(docs)
+        if assigned:
+            logger.info(f"Assigned ordinals to {assigned} {kind} entries")
+        return assigned
+
+    async def reset_catalog_ordinals(self, kind):
+        # Only safe together with wiping the catalog and its history
+        await self.counters.delete_one({"_id": kind})
+
+    @staticmethod
+    def _next_segment(cur, end):
+        """
+        A cycle is walked in segments. Videos added mid-cycle get their own
+        segment after the current one; only when nothing new is left does a
+        fresh cycle (with a fresh seed) start over the whole catalog.
+        """
+        if cur and cur["base"] + cur["size"] < end:
+            base = cur["base"] + cur["size"]
+            return {"seed": new_seed(), "cycle": cur["cycle"], "base": base,
+                    "size": end - base, "pos": 0}
+        cycle = cur["cycle"] + 1 if cur else 1
+        return {"seed": new_seed(), "cycle": cycle, "base": 0, "size": end, "pos": 0}
+
+    async def next_from_cursor(self, user_id, kind):
+        """Next video in the user's shuffled walk of the catalog (no $nin)."""
+        memory = self.memory[kind]
+        end = memory.end if memory.loaded else await self.catalog_end(kind)
+        if end == 0:
+            return None
+
+        # Walk from a snapshot, then compare-and-set on rev: a concurrent
+        # request for the same user makes us re-read instead of losing bits
+        for _ in range(self.HISTORY_RETRIES):
+            history = await self.histories[kind].find_one(
+                {"user_id": user_id}, {"_id": 0, "cursor": 1, "bitmap": 1, "rev": 1}
+            ) or {}
+            file_id, cur, bits = await self._walk_cursor(kind, history, end)
+            if await self._save_history(kind, user_id, history.get("rev"), cur, bits):
+                return file_id
+        logger.warning(f"{kind} history for {user_id} kept changing underneath, serving unsaved pick")
+        return file_id
+
+    async def _walk_cursor(self, kind, history, end):
+        """Returns (file_id or None, advanced cursor, updated bitmap)."""
+        cur = history.get("cursor")
+        bits = bitmap.decode(history.get("bitmap"))
+        scanned = 0
+
+        # A full cycle plus the tail of the current one is the most we ever need
+        while scanned <= 2 * end:
+            if not cur or cur["pos"] >= cur["size"]:
+                old_cycle = cur["cycle"] if cur else None
+                cur = self._next_segment(cur, end)
+                # A first cursor keeps the bits migrate_history carried over
+                if old_cycle is not None and cur["cycle"] != old_cycle:
+                    bits = bytearray()
+
+            # Skip already-seen ordinals locally, only probe the rest
+            pos, candidates = cur["pos"], []
+            while pos < cur["size"] and len(candidates) < self.CURSOR_BATCH:
+                ordinal = cur["base"] + permute(pos, cur["size"], cur["seed"])
+                pos += 1
+                if not bitmap.contains(bits, ordinal):
+                    candidates.append((pos, ordinal))
+            scanned += pos - cur["pos"]
+
+            found = await self.resolve_ordinals(kind, [o for _, o in candidates]) if candidates else {}
+            for next_pos, ordinal in candidates:
+                if ordinal in found:
+                    cur["pos"] = next_pos
+                    bitmap.add(bits, ordinal)
+                    return found[ordinal], cur, bits
+
+            # Everything probed was deleted, keep walking
+            cur["pos"] = pos
+
+        return None, cur, bits
+
+    async def resolve_ordinals(self, kind, ordinals):
+        memory = self.memory[kind]
+        if memory.loaded:
+            found = {}
+            for ordinal in ordinals:
+                file_id = memory.get(ordinal)
+                if file_id:
+                    found[ordinal] = file_id
+            return found
+        cursor = self.catalogs[kind].find(
+            {"ordinal": {"$in": ordinals}}, {"_id": 0, "ordinal": 1, "file_id": 1}
+        )
+        return {doc["ordinal"]: doc["file_id"] async for doc in cursor}
+
+    # ---------- WATCH HISTORY (BITMAP) ----------
+    # One doc per user: {"user_id", "bitmap", "seen_count", "cursor", "rev"}.
+    # The bitmap holds ordinals seen in the current shuffle cycle. Every
+    # write bumps rev and only lands if rev is still what we read.
+    async def _write_history(self, kind, user_id, rev, fields):
+        """Compare-and-set on rev. False when another request wrote first."""
+        history = self.histories[kind]
+        update = {"$set": fields, "$inc": {"rev": 1}}
+        if rev is not None:
+            result = await history.update_one({"user_id": user_id, "rev": rev}, update)
+            return result.matched_count == 1
+        try:
+            # No rev yet: a legacy doc or no doc at all
+            await history.update_one({"user_id": user_id, "rev": {"$exists": False}}, update, upsert=True)
+        except DuplicateKeyError:
+            return False  # lost the race to create it
+        return True
+
+    async def _save_history(self, kind, user_id, rev, cur, bits):
+        return await self._write_history(kind, user_id, rev, {
+            "cursor": {k: cur[k] for k in ("seed", "cycle", "base", "size", "pos")},
+            "bitmap": bitmap.encode(bits),
+            "seen_count": bitmap.popcount(bits)
+        })
+
+    async def mark_seen_file(self, kind, user_id, file_id):
+        entry = await self.catalogs[kind].find_one({"file_id": file_id}, {"_id": 0, "ordinal": 1})
+        if not entry or "ordinal" not in entry:
+            return False
+        for _ in range(self.HISTORY_RETRIES):
+            doc = await self.histories[kind].find_one({"user_id": user_id}, {"_id": 0, "bitmap": 1, "rev": 1}) or {}
+            bits = bitmap.decode(doc.get("bitmap"))
+            if not bitmap.add(bits, entry["ordinal"]):
+                return False
+            fields = {"bitmap": bitmap.encode(bits), "seen_count": bitmap.popcount(bits)}
+            if await self._write_history(kind, user_id, doc.get("rev"), fields):
+                return True
+        logger.warning(f"Could not mark {kind} ordinal {entry['ordinal']} seen for {user_id}")
+        return False
+
+    async def reset_history(self, kind, user_id):
+        await self.histories[kind].update_one(
             {"user_id": user_id},
-            {"$set": {"seen": []}},
-            upsert=True
+            {"$unset": {"bitmap": "", "seen_count": "", "cursor": "", "seen": ""}, "$inc": {"rev": 1}}
         )
+
+    async def migrate_history(self, kind):
+        """Convert legacy {"seen": [file_id, ...]} arrays into bitmaps."""
+        history = self.histories[kind]
+        catalog = self.catalogs[kind]
+        migrated = 0
+        cursor = history.find({"seen": {"$exists": True}}, {"user_id": 1, "seen": 1, "bitmap": 1, "rev": 1})
+        async for doc in cursor:
+            bits = bitmap.decode(doc.get("bitmap"))
+            seen = doc.get("seen") or []
+            for i in range(0, len(seen), 1000):
+                entries = catalog.find({"file_id": {"$in": seen[i:i + 1000]}}, {"_id": 0, "ordinal": 1})
+                async for entry in entries:
+                    if "ordinal" in entry:
+                        bitmap.add(bits, entry["ordinal"])
+            # Lost to a concurrent write: "seen" stays, so the next start retries it
+            result = await history.update_one(
+                {"_id": doc["_id"], "rev": doc.get("rev", {"$exists": False})},
+                {"$set": {"bitmap": bitmap.encode(bits), "seen_count": bitmap.popcount(bits)},
+                 "$unset": {"seen": ""}, "$inc": {"rev": 1}}
+            )
+            migrated += result.modified_count
+        if migrated:
+            logger.info(f"Migrated {migrated} {kind} histories to bitmaps")
+        return migrated
             
     # ---------- VERIFICATION SYSTEM ----------
     async def get_notcopy_user(self, user_id):
@@ -435,13 +855,13 @@ class Database:
         default_date = datetime(2020, 5, 17, 0, 0, 0, tzinfo=timezone.utc)
 
         if not user:
-            res = {
-                "user_id": user_id,
-                "last_verified": default_date,
-            }
-            # Insert and then return (safest method)
-            await self.misc.insert_one(res)
-            return res
+            # Upsert: a concurrent request may have created it in between
+            user = await self.misc.find_one_and_update(
+                {"user_id": user_id},
+                {"$setOnInsert": {"last_verified": default_date}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
         return user
 
     async def update_notcopy_user(self, user_id, value: dict):
@@ -0,0 +1,43 @@
+import logging
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+
+# -------------------- SHARED HTTP CLIENT --------------------
+# One pooled aiohttp session for every outbound call (shorteners, pinger),
+# opened in Bot.start and closed in Bot.stop, so connections, DNS lookups
+# and TLS sessions are reused instead of rebuilt per request.
+class HttpClient:
+    def __init__(self, limit=100, limit_per_host=10, dns_ttl=300, keepalive=30, timeout=10, connect_timeout=5):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_ttl = dns_ttl
+        self.keepalive = keepalive
+        self.timeout = aiohttp.ClientTimeout(total=timeout, connect=connect_timeout)
+        self._session = None
+
+    async def open(self):
+        return self.session
+
+    @property
+    def session(self):
+        """The shared session; opened on first use if Bot.start hasn't yet."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=self.dns_ttl,
+                keepalive_timeout=self.keepalive
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self._session
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+# 🔹 Initialize
+http_client = HttpClient()
@@ -49,6 +49,9 @@ FSUB = str_to_bool(environ.get("FSUB"), True)
 IS_VERIFY = str_to_bool(environ.get("IS_VERIFY"), False)
 POST_SHORTLINK = str_to_bool(environ.get("POST_SHORTLINK"), False)
 SEND_POST = str_to_bool(environ.get("SEND_POST"), False)
+POSTS_PER_MINUTE = int(environ.get("POSTS_PER_MINUTE", "20"))  # POST_CHANNEL publish rate
+FSUB_MEMBER_TTL = int(environ.get("FSUB_MEMBER_TTL", "21600"))  # seconds a confirmed member is trusted
+FSUB_NON_MEMBER_TTL = int(environ.get("FSUB_NON_MEMBER_TTL", "60"))
 
 # =========================================================
 # 🔢 LIMITS
@@ -65,6 +68,8 @@ SHORTLINK_API = environ.get("SHORTLINK_API", "")
 POST_SHORTLINK_URL = environ.get("POST_SHORTLINK_URL", "")
 POST_SHORTLINK_API = environ.get("POST_SHORTLINK_API", "")
 VERIFY_EXPIRE = int(environ.get("VERIFY_EXPIRE", "3600"))
+SHORTLINK_TIMEOUT = float(environ.get("SHORTLINK_TIMEOUT", "5"))  # seconds per shortener call
+SHORTLINK_CACHE_TTL = int(environ.get("SHORTLINK_CACHE_TTL", "604800"))  # 7 days
 TUTORIAL_LINK = environ.get("TUTORIAL_LINK", "")
 
 # =========================================================
@@ -81,6 +86,25 @@ AUTH_PICS = environ.get("AUTH_PICS", "")
 VERIFY_IMG = environ.get("VERIFY_IMG", "")
 NO_IMG = environ.get("NO_IMG", "")
 
+# =========================================================
+# 📊 STATS
+# =========================================================
+DB_STORAGE_QUOTA = int(environ.get("DB_STORAGE_QUOTA", "536870912"))  # bytes, 512MB free tier
+STATS_MAX_AGE = int(environ.get("STATS_MAX_AGE", "300"))  # seconds a /stats snapshot may be old
+STATS_REFRESH_INTERVAL = int(environ.get("STATS_REFRESH_INTERVAL", "120"))
+
+# =========================================================
+# 📢 BROADCAST
+# =========================================================
+BROADCAST_RATE = float(environ.get("BROADCAST_RATE", "25"))  # messages/sec, under Telegram's ~30/s bot limit
+BROADCAST_WORKERS = int(environ.get("BROADCAST_WORKERS", "20"))
+
+# =========================================================
+# 🖼️ THUMBNAILS
+# =========================================================
+THUMB_WORKERS = int(environ.get("THUMB_WORKERS", "2"))  # parallel ffmpeg jobs
+THUMB_PREFIX_MB = int(environ.get("THUMB_PREFIX_MB", "4"))  # how much of a video to fetch
+
 # =========================================================
 # 🌐 WEB APP
 # =========================================================
@@ -25,7 +25,6 @@ async def ban_user_handler(client, message: Message):
         return await message.reply("❌ **You cannot ban an Admin!**", quote=True)
     try:
         await db.block_user(user_id, reason)
-        ban_manager.blocked_cache[user_id] = True
         await message.reply(
             f"✅ **User Banned!**\n\n🆔 `{user_id}`\n📝 `{reason}`",
             quote=True
@@ -54,9 +53,7 @@ async def unban_user_handler(client, message: Message):
         return await message.reply("❌ **Invalid User ID.**", quote=True)
     try:
         await db.unblock_user(user_id)
-        ban_manager.blocked_cache[user_id] = False
-        ban_manager.user_flood_history.pop(user_id, None)
-        ban_manager.user_warnings.pop(user_id, None)
+        ban_manager.flood.discard(user_id)
         await message.reply(
             f"✅ **User Unbanned!**\n\n🆔 `{user_id}`",
             quote=True
@@ -1,16 +1,105 @@
 import time
+from array import array
+from collections import OrderedDict
 from pyrogram.types import Message
 from database.users_db import db
 from info import LOG_CHANNEL, ADMINS
 
+class FloodState:
+    """Last FLOOD_LIMIT message times of one user in a fixed ring."""
+    __slots__ = ("times", "pos", "last_seen")
+
+    def __init__(self, size):
+        self.times = array("d", [float("-inf")]) * size
+        self.pos = 0
+        self.last_seen = 0.0
+
+    def hit(self, now, window):
+        """Record one message; True if the whole ring falls inside window."""
+        times = self.times
+        times[self.pos] = now
+        self.pos = (self.pos + 1) % len(times)
+        # times[pos] is now the oldest of the last len(times) messages
+        return now - times[self.pos] < window
+
+    def reset(self):
+        times = self.times
+        for i in range(len(times)):
+            times[i] = float("-inf")
+
+
+class FloodTracker:
+    """
+    user_id -> FloodState in LRU order. Every hit moves the user to the end,
+    so idle users collect at the front and are evicted from there whenever a
+    new user is inserted; the hard cap drops the least recently seen.
+
+    Warning counts live in their own map with a much longer TTL: a user
+    sitting out a temp ban sends nothing that reaches get(), so their ring
+    goes idle, but the next flood must still escalate from where they were.
+    """
+    def __init__(self, size, window, idle_ttl=3600, warn_ttl=86400, max_users=50000):
+        self.size = size
+        self.window = window
+        self.idle_ttl = idle_ttl
+        self.warn_ttl = warn_ttl
+        self.max_users = max_users
+        self._states = OrderedDict()
+        # user_id -> (warnings, last warned at), oldest warning first
+        self._warnings = OrderedDict()
+
+    def __len__(self):
+        return len(self._states)
+
+    def get(self, user_id, now):
+        state = self._states.get(user_id)
+        if state is None:
+            state = self._states[user_id] = FloodState(self.size)
+            state.last_seen = now
+            self._evict(self._states, now - self.idle_ttl, lambda state: state.last_seen)
+        else:
+            self._states.move_to_end(user_id)
+            state.last_seen = now
+        return state
+
+    def warn(self, user_id, now):
+        """Count one more warning for user_id; returns their new total."""
+        count = self.warnings(user_id, now)
+        self._warnings.pop(user_id, None)
+        self._warnings[user_id] = (count + 1, now)
+        self._evict(self._warnings, now - self.warn_ttl, lambda entry: entry[1])
+        return count + 1
+
+    def warnings(self, user_id, now):
+        count, warned_at = self._warnings.get(user_id, (0, 0.0))
+        return count if warned_at >= now - self.warn_ttl else 0
+
+    def discard(self, user_id):
+        self._states.pop(user_id, None)
+        self._warnings.pop(user_id, None)
+
+    def _evict(self, entries, cutoff, stamp):
+        while len(entries) > self.max_users:
+            entries.popitem(last=False)
+        while entries:
+            user_id = next(iter(entries))
+            if stamp(entries[user_id]) >= cutoff:
+                break
+            del entries[user_id]
+
+
 class BanManager:
     def __init__(self):
         self.FLOOD_LIMIT = 5
         self.TIME_WINDOW = 7
         self.WARNING_LIMIT = 3
-        self.user_flood_history = {}
-        self.user_warnings = {}
-        self.blocked_cache = {}   
+        self.flood = FloodTracker(self.FLOOD_LIMIT, self.TIME_WINDOW)
+        db.feed.subscribe("ban", self._on_ban_event)
+
+    def _on_ban_event(self, user_id, data):
+        # /unban handled by another replica
+        if data.get("blocked") is False:
+            self.flood.discard(user_id)
         
     async def check_ban(self, client, m: Message):
         user_id = m.from_user.id
@@ -22,32 +111,31 @@ class BanManager:
                 return False
         except:
             pass
-        if self.blocked_cache.get(user_id):
-            await self._send_block_msg(m)
-            return True
-        is_blocked = await db.is_user_blocked(user_id)
+        # Pure in-memory once db.load_bans() has run
+        if db.bans.loaded:
+            is_blocked = db.bans.is_blocked(user_id)
+            remaining = db.bans.temp_ban_remaining(user_id, current_time)
+            is_temp_banned = remaining > 0
+        else:
+            is_blocked = await db.is_user_blocked(user_id)
+            is_temp_banned, remaining = (False, 0) if is_blocked else await db.is_temp_banned(user_id)
         if is_blocked:
-            self.blocked_cache[user_id] = True
             await self._send_block_msg(m)
             return True
-        is_temp_banned, remaining = await db.is_temp_banned(user_id)
         if is_temp_banned:
             await m.reply(
                 f"🚫 <b>You are temporarily banned!</b>\n\n⏳ Wait: <code>{remaining}s</code>"
             )
             return True
-        history = self.user_flood_history.setdefault(user_id, [])
-        history.append(current_time)
-        history[:] = [t for t in history if current_time - t < self.TIME_WINDOW]
-        if len(history) >= self.FLOOD_LIMIT:
+        state = self.flood.get(user_id, current_time)
+        if state.hit(current_time, self.TIME_WINDOW):
+            state.reset()
             await self.punish_user(client, m, user_id)
-            self.user_flood_history[user_id] = []
             return True
         return False
 
     async def punish_user(self, client, m: Message, user_id: int):
-        self.user_warnings[user_id] = self.user_warnings.get(user_id, 0) + 1
-        warn_count = self.user_warnings[user_id]
+        warn_count = self.flood.warn(user_id, time.time())
         user_link = m.from_user.mention
 
         try:
@@ -73,7 +161,6 @@ class BanManager:
 
         elif warn_count >= 5:
             await db.block_user(user_id, reason="Auto-Ban: Excessive Spam")
-            self.blocked_cache[user_id] = True
             await m.reply("🛑 <b>Permanent Ban!</b>\n\nGoodbye.")
             await client.send_message(LOG_CHANNEL, f"🛑 #Perm_Ban\n👤 {user_link}\n🆔 {user_id}")
 
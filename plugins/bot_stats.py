@@ -2,8 +2,11 @@ import os
 import pytz
 from datetime import datetime
 from pyrogram import Client, filters
-from pyrogram.types import *
+from pyrogram.types import Message, CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup
 from database.users_db import db
+from database.indexes import index_manager
+from database.reports import UsageReport
+from database.stats import stats_service
 from info import ADMINS, PREMIUM_DAILY_LIMIT, DAILY_LIMIT
 from utils import get_size
 from Script import script
@@ -14,28 +17,21 @@ from Script import script
 @Client.on_message(filters.command('stats') & filters.user(ADMINS) & filters.incoming)
 async def get_stats(bot, message: Message):
     aVBOTz = await message.reply("🔄 **Fetching stats...**")
-    total_users = await db.total_users_count()
-    premium_users = await db.premium_users_count()
-    mixfiles = await db.total_files_count()
-    brazzers = await db.total_brazzers_videos()
-    blocked = await db.total_blocked_count()
-    redeem = await db.total_redeem_count()
-    dbsize = await db.get_db_size()
-    freespace = 536870912 - dbsize 
+    stats = await stats_service.get()
     try:
-        db_size_human = get_size(dbsize)
-        free_space_human = get_size(freespace)
+        db_size_human = get_size(stats["dbsize"])
+        free_space_human = get_size(stats["freespace"])
     except:
-        db_size_human = await get_size(dbsize)
-        free_space_human = await get_size(freespace)
+        db_size_human = await get_size(stats["dbsize"])
+        free_space_human = await get_size(stats["freespace"])
     try:
         await aVBOTz.edit(script.STATS_TXT.format(
-            total_users=total_users,
-            premium_users=premium_users,
-            redeem=redeem,
-            blocked=blocked,
-            mixfiles=mixfiles,
-            brazzers=brazzers,
+            total_users=stats["total_users"],
+            premium_users=stats["premium_users"],
+            redeem=stats["redeem"],
+            blocked=stats["blocked"],
+            mixfiles=stats["mixfiles"],
+            brazzers=stats["brazzers"],
             db_size_human=db_size_human,
             free_space_human=free_space_human
         ))
@@ -117,56 +113,44 @@ async def delete_callback_handler(client, callback: CallbackQuery):
 # ---------------------------------------------------------------------------------
 # 📈 ACTIVE USERS REPORT COMMAND
 # ---------------------------------------------------------------------------------
+def format_stats_entry(row):
+    user_id = row.get("id", "N/A")
+    username = row.get("username")
+    username_display = f"@{username}" if username else "N/A"
+    subscription_type = "Paid" if row["is_premium"] else "Free"
+    user_entry = (
+        f"👤 User: {username_display} ({user_id})\n"
+        f"╰ 💠 Plan: {subscription_type}\n"
+        f"╰ 📁 Daily Limit: {row['daily_limit']} | Used: {row['used']} | Remaining: {row['remaining']}"
+    )
+    expiry_time = row.get("expiry_time")
+    if row["is_premium"] and isinstance(expiry_time, datetime):
+        try:
+            expiry_dt = expiry_time.astimezone(pytz.timezone("Asia/Kolkata"))
+            expiry_date = expiry_dt.strftime('%d-%m-%Y')
+            expiry_clock = expiry_dt.strftime('%I:%M:%S %p')
+            user_entry += f"\n╰ 🗓 Expiry: {expiry_date} at {expiry_clock}"
+        except Exception as e:
+            print(f"Expiry date parse error for user {user_id}: {e}")
+    return user_entry
+
 @Client.on_message(filters.command("all_users_stats") & filters.user(ADMINS) & filters.incoming)
 async def all_users_stats(client, message: Message):
     status_msg = await message.reply("🔄 **Fetching active users stats... Please wait.**")
-    users_cursor = db.users.find({}) 
-    report_list = [] 
-    total_files_used = 0
-    active_users_count = 0 
-    async for user in users_cursor:
-        user_id = user.get("id", "N/A")
-        username = user.get("username")
-        username_display = f"@{username}" if username else "N/A"
-        used = await db.get_video_count(user_id)
-        if used == 0:
-            continue
-        is_premium = await db.has_premium_access(user_id)
-        daily_limit = PREMIUM_DAILY_LIMIT if is_premium else DAILY_LIMIT
-        remaining = max(daily_limit - used, 0)
-        total_files_used += used
-        subscription_type = "Paid" if is_premium else "Free"
-        user_entry = (
-            f"👤 User: {username_display} ({user_id})\n"
-            f"╰ 💠 Plan: {subscription_type}\n"
-            f"╰ 📁 Daily Limit: {daily_limit} | Used: {used} | Remaining: {remaining}"
-        )
-        expiry_time = user.get("expiry_time")
-        if is_premium and expiry_time:
-            try:
-                if isinstance(expiry_time, datetime):
-                    expiry_dt = expiry_time.astimezone(pytz.timezone("Asia/Kolkata"))
-                    expiry_date = expiry_dt.strftime('%d-%m-%Y')
-                    expiry_clock = expiry_dt.strftime('%I:%M:%S %p')
-                    user_entry += f"\n╰ 🗓 Expiry: {expiry_date} at {expiry_clock}"
-            except Exception as e:
-                print(f"Expiry date parse error for user {user_id}: {e}")
-        report_list.append(user_entry)
-        active_users_count += 1
+    report = await UsageReport(
+        "Active_Users_Stats.txt",
+        "📊 ACTIVE USERS PLAN STATS REPORT",
+        format_stats_entry
+    ).build(db.usage_report())
+    active_users_count = report.active_users
+    total_files_used = report.total_files
     summary_text = (
         f"🧾 Active Users (>=1 download): {active_users_count}\n"
         f"📊 Total Files Used: {total_files_used}"
     )
-    if active_users_count > 10:
-        file_path = f"Active_Users_Stats.txt"
-        with open(file_path, "w", encoding="utf-8") as f:
-            f.write("📊 ACTIVE USERS PLAN STATS REPORT\n")
-            f.write("=================================\n\n")
-            f.write("\n\n---------------------------------\n\n".join(report_list))
-            f.write("\n\n=================================\n")
-            f.write(summary_text)
+    if report.is_long:
         await message.reply_document(
-            document=file_path,
+            document=report.file_path,
             caption=(
                 f"📊 **Active Users Report Generated**\n\n"
                 f"🧾 **Active Users:** `{active_users_count}`\n"
@@ -174,15 +158,13 @@ async def all_users_stats(client, message: Message):
                 f"ℹ️ _List is sent as a file because there are more than 10 active users._"
             )
         )
-        if os.path.exists(file_path):
-            os.remove(file_path)
 
     else:
         if active_users_count == 0:
             final_msg = "❌ No active users found (Usage = 0)."
         else:
             formatted_entries = []
-            for entry in report_list:
+            for entry in report.entries:
                 entry = entry.replace("User:", "**User:**").replace("Plan:", "`Plan:`")
                 formatted_entries.append(entry)
             final_msg = "**📊 Active Users Plan Stats:**\n\n" + "\n\n".join(formatted_entries) + "\n\n" + f"**{summary_text}**"
@@ -195,6 +177,7 @@ async def all_users_stats(client, message: Message):
                  os.remove("Stats.txt")
         else:
             await message.reply(final_msg)
+    report.cleanup()
     await status_msg.delete()
 
 # ---------------------------------------------------------------------------------
@@ -256,4 +239,21 @@ async def check_user_handler(client, message: Message):
 """
 
     await message.reply(text)
-                    
+
+# ---------------------------------------------------------------------------------
+# 🗂 INDEX USAGE REPORT COMMAND
+# ---------------------------------------------------------------------------------
+@Client.on_message(filters.command("indexes") & filters.user(ADMINS) & filters.incoming)
+async def index_report_handler(client, message: Message):
+    status_msg = await message.reply("🔄 **Checking indexes...**")
+    created = await index_manager.ensure_indexes()
+    usage = await index_manager.index_usage()
+    plans = await index_manager.check_query_plans()
+    text = f"**🗂 Index Report**\n\n🆕 Built now: `{created}`\n\n"
+    for name, stats in usage.items():
+        text += f"**{name}**\n"
+        for index_name, ops in stats.items():
+            text += f"╰ `{index_name}`: {ops} ops\n"
+    scans = [label for label, stages in plans.items() if "COLLSCAN" in stages]
+    text += "\n**⚠️ COLLSCAN:**\n" + ("\n".join(f"╰ `{q}`" for q in scans) if scans else "╰ None ✅")
+    await status_msg.edit(text)
@@ -2,9 +2,9 @@ from pyrogram import Client, filters
 from pyrogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton
 from database.users_db import db
 from info import LOG_CHANNEL, PREMIUM_DAILY_LIMIT, FSUB
-from utils import temp, auto_delete_message, is_user_joined
+from utils import temp, is_user_joined
+from autodelete import auto_delete
 from plugins.ban_manager import ban_manager 
-import asyncio
 import string
 
 @Client.on_message(filters.command("brazzers") | filters.regex(r"(?i)brazzers"))
@@ -19,8 +19,8 @@ async def handle_brazzers_request(client, m: Message):
     if await ban_manager.check_ban(client, m):
         return
     try:
-        is_premium = await db.has_premium_access(user_id)
-        if not is_premium:
+        state = await db.get_user_state(user_id)
+        if not state.is_premium:
             return await m.reply(
                 "💎 𝖡𝗎𝗒 𝖲𝗎𝖻𝗌𝖼𝗋𝗂𝗉𝗍𝗂𝗈𝗇 𝖠𝗇𝖽 𝖦𝖾𝗍 900+ 𝖡𝖺𝗋𝗓𝗓𝖾𝗋𝗌 𝖵𝗂𝖽𝖾𝗈 𝖯𝖾𝗋 𝖬𝗈𝗇𝗍𝗁.", 
                 reply_markup=InlineKeyboardMarkup([[
@@ -28,17 +28,25 @@ async def handle_brazzers_request(client, m: Message):
                 ]])
             )
 
-        used_today = await db.get_video_count(user_id)
+        used_today = state.used_today
         if used_today >= PREMIUM_DAILY_LIMIT:
             return await m.reply(f"⚠️ 𝖸𝗈𝗎'𝗏𝖾 𝖱𝖾𝖺𝖼𝗁𝖾𝖽 𝖸𝗈𝗎𝗋 𝖣𝖺𝗂𝗅𝗒 𝖫𝗂𝗆𝗂𝗍 𝖮𝖿 {PREMIUM_DAILY_LIMIT} 𝖥𝗂𝗅𝖾𝗌. 𝖳𝗋𝗒 𝖠𝗀𝖺𝗂𝗇 𝖳𝗈𝗆𝗈𝗋𝗋𝗈𝗐")
+        if await db.reserve_quota(user_id, PREMIUM_DAILY_LIMIT, username) is None:
+            return await m.reply(f"⚠️ 𝖸𝗈𝗎'𝗏𝖾 𝖱𝖾𝖺𝖼𝗁𝖾𝖽 𝖸𝗈𝗎𝗋 𝖣𝖺𝗂𝗅𝗒 𝖫𝗂𝗆𝗂𝗍 𝖮𝖿 {PREMIUM_DAILY_LIMIT} 𝖥𝗂𝗅𝖾𝗌. 𝖳𝗋𝗒 𝖠𝗀𝖺𝗂𝗇 𝖳𝗈𝗆𝗈𝗋𝗋𝗈𝗐")
+
         video_id = await db.get_unseen_brazzers(user_id)
-        await db.increase_video_count(user_id, username)
-        
-        dlt = await m.reply_video(
-            video_id,
-            caption=f"𝘗𝘰𝘸𝘦𝘳𝘦𝘥 𝘉𝘺: {temp.B_LINK}\n\n<blockquote>ᴛʜɪꜱ ꜰɪʟᴇ ᴡɪʟʟ ʙᴇ ᴀᴜᴛᴏ ᴅᴇʟᴇᴛᴇ ᴀꜰᴛᴇʀ 10 ᴍɪɴᴜᴛᴇꜱ. ᴘʟᴇᴀꜱᴇ ꜰᴏʀᴡᴀʀᴅ ᴛʜɪꜱ ꜰɪʟᴇ ꜱᴏᴍᴇᴡʜᴇʀᴇ ᴇʟꜱᴇ ᴏʀ ꜱᴀᴠᴇ ɪɴ ꜱᴀᴠᴇᴅ ᴍᴇꜱꜱᴀɢᴇꜱ.</blockquote>"
-        )
-        asyncio.create_task(auto_delete_message(m, dlt))
+        if not video_id:
+            return await db.release_quota(user_id)
+
+        try:
+            dlt = await m.reply_video(
+                video_id,
+                caption=f"𝘗𝘰𝘸𝘦𝘳𝘦𝘥 𝘉𝘺: {temp.B_LINK}\n\n<blockquote>ᴛʜɪꜱ ꜰɪʟᴇ ᴡɪʟʟ ʙᴇ ᴀᴜᴛᴏ ᴅᴇʟᴇᴛᴇ ᴀꜰᴛᴇʀ 10 ᴍɪɴᴜᴛᴇꜱ. ᴘʟᴇᴀꜱᴇ ꜰᴏʀᴡᴀʀᴅ ᴛʜɪꜱ ꜰɪʟᴇ ꜱᴏᴍᴇᴡʜᴇʀᴇ ᴇʟꜱᴇ ᴏʀ ꜱᴀᴠᴇ ɪɴ ꜱᴀᴠᴇᴅ ᴍᴇꜱꜱᴀɢᴇꜱ.</blockquote>"
+            )
+        except Exception:
+            await db.release_quota(user_id)
+            raise
+        auto_delete.schedule(m.chat.id, [dlt.id, m.id])
 
     except Exception as e:
         print(f"Error: {e}")
@@ -1,24 +1,27 @@
 from pyrogram import Client, filters
-from pyrogram.types import (
-    InlineKeyboardButton, InlineKeyboardMarkup,
-    ReplyKeyboardMarkup, ReplyKeyboardRemove
-)
-from pyrogram.errors import FloodWait, InputUserDeactivated, UserIsBlocked, PeerIdInvalid
-import time
+from pyrogram.types import ReplyKeyboardMarkup, ReplyKeyboardRemove
 import asyncio
 import logging
 from database.users_db import db
+from database.audiences import compile_audience, AUDIENCE_HELP
 from info import ADMINS
-from utils import temp, get_readable_time, users_broadcast
-
-lock = asyncio.Lock()
+from broadcaster import broadcast_engine
 
 @Client.on_message(filters.command("broadcast") & filters.user(ADMINS) & filters.reply)
 async def broadcast_users(bot, message):
-    if lock.locked():
+    if broadcast_engine.busy:
         return await message.reply('Currently broadcast processing, Wait for complete.')
 
+    try:
+        audience = compile_audience(message.command[1:])
+    except ValueError as e:
+        return await message.reply(f"❌ {e}\n\n{AUDIENCE_HELP}")
+    audience_size = await audience.count(db.users)
+    if not audience_size:
+        return await message.reply(f"❌ No users match <b>{audience.label}</b>.")
+
     ask_pin = await message.reply(
+        f'<b>Audience: {audience.label} ({audience_size} users)</b>\n\n'
         '<b>Do you want to pin this message in users?</b>',
         reply_markup=ReplyKeyboardMarkup([['Yes', 'No']], one_time_keyboard=True, resize_keyboard=True)
     )
@@ -40,58 +43,13 @@ async def broadcast_users(bot, message):
     await ask_pin.delete()
     await bot.send_message(chat_id=message.chat.id, text="Broadcast started...", reply_markup=ReplyKeyboardRemove())
 
-    users = await db.get_all_users()
-    b_msg = message.reply_to_message
     b_sts = await message.reply_text(text='<b>ʙʀᴏᴀᴅᴄᴀsᴛɪɴɢ ʏᴏᴜʀ ᴍᴇssᴀɢᴇs ᴛᴏ ᴜsᴇʀs ⌛️</b>')
-
-    start_time = time.time()
-    total_users = await db.total_users_count()
-    done = 0
-    success = 0
-    failed = 0
-
-    async with lock:
-        async for user in users:
-            if temp.USERS_CANCEL:
-                temp.USERS_CANCEL = False
-                time_taken = get_readable_time(time.time() - start_time)
-                await b_sts.edit(
-                    f"❌ Users broadcast cancelled!\nCompleted in {time_taken}\n\n"
-                    f"Total Users: <code>{total_users}</code>\n"
-                    f"Completed: <code>{done}</code>\n"
-                    f"Success: <code>{success}</code>"
-                )
-                return
-
-            success_flag, sts = await users_broadcast(int(user['id']), b_msg, is_pin)
-            if sts == 'Success':
-                success += 1
-            elif sts == 'Error':
-                failed += 1
-            done += 1
-
-            if done % 20 == 0:
-                btn = [[InlineKeyboardButton('CANCEL', callback_data='broadcast_cancel#users')]]
-                await b_sts.edit(
-                    f"📢 Users broadcast in progress...\n\n"
-                    f"Total Users: <code>{total_users}</code>\n"
-                    f"Completed: <code>{done}</code>\n"
-                    f"Success: <code>{success}</code>",
-                    reply_markup=InlineKeyboardMarkup(btn)
-                )
-
-        time_taken = get_readable_time(time.time() - start_time)
-        await b_sts.edit(
-            f"✅ Users broadcast completed!\nCompleted in {time_taken}\n\n"
-            f"Total Users: <code>{total_users}</code>\n"
-            f"Completed: <code>{done}</code>\n"
-            f"Success: <code>{success}</code>\n"
-            f"Failed: <code>{failed}</code>"
-        )
+    job = await broadcast_engine.start(bot, message.reply_to_message, is_pin, b_sts, audience)
+    logging.info(f"Broadcast {job.id} started for {job.doc['total']} users")
 
 @Client.on_callback_query(filters.regex(r'^broadcast_cancel'))
 async def broadcast_cancel(bot, query):
-    _, ident = query.data.split("#")
-    if ident == 'users':
-        await query.message.edit("ᴛʀʏɪɴɢ ᴛᴏ ᴄᴀɴᴄᴇʟ ᴜsᴇʀs ʙʀᴏᴀᴅᴄᴀsᴛɪɴɢ...")
-        temp.USERS_CANCEL = True
+    _, job_id = query.data.split("#")
+    await query.message.edit("ᴛʀʏɪɴɢ ᴛᴏ ᴄᴀɴᴄᴇʟ ᴜsᴇʀs ʙʀᴏᴀᴅᴄᴀsᴛɪɴɢ...")
+    if not await broadcast_engine.cancel(job_id):
+        await query.answer("Broadcast already finished.", show_alert=True)
@@ -7,11 +7,13 @@ import re, os
 import pytz
 from datetime import datetime, timedelta, timezone
 from os import environ
+from pymongo.errors import DuplicateKeyError
 from pyrogram import Client, filters
 from pyrogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from info import ADMINS, PREMIUM_LOGS
 from database.users_db import db
 from utils import temp, get_seconds
+from route import premium_scheduler
 
 # ==================================================================
 # 🔑 CODE GENERATOR LOGIC
@@ -45,19 +47,22 @@ async def generate_code_cmd(client, message):
     if not premium_duration_seconds:
         return await message.reply_text("❌ Invalid duration like `1minute`, `2days`, `1month`.")
     codes = []
-    for _ in range(count):
+    while len(codes) < count:
         code = await generate_code(duration_str)
-        await db.codes.insert_one({
-            "code": code,
-            "code_hash": hash_code(code),
-            "original_code": code,
-            "duration": duration_str,
-            "expires_in": premium_duration_seconds,
-            "used": False,
-            "user_id": None,
-            "used_at": None,
-            "created_at": datetime.now(timezone.utc)
-        })
+        try:
+            await db.codes.insert_one({
+                "code": code,
+                "code_hash": hash_code(code),
+                "original_code": code,
+                "duration": duration_str,
+                "expires_in": premium_duration_seconds,
+                "used": False,
+                "user_id": None,
+                "used_at": None,
+                "created_at": datetime.now(timezone.utc)
+            })
+        except DuplicateKeyError:
+            continue  # code_hash is unique: collided with an existing code, draw again
         codes.append(f"🔹 `{code}`")
     codes_text = "\n".join(codes)
     
@@ -211,12 +216,8 @@ async def redeem_code_handler(client, message):
     )
 
     # Update User in DB
-    user_data = {
-        "id": user_id,
-        "name": user_name,
-        "expiry_time": new_expiry
-    }
-    await db.update_user(user_data)
+    await db.set_premium_expiry(user_id, new_expiry, name=user_name)
+    premium_scheduler.schedule(user_id, new_expiry)
 
     # Mark code as used
     await db.codes.update_one(
@@ -0,0 +1,20 @@
+from pyrogram import Client, filters
+from pyrogram.enums import ChatMemberStatus
+from pyrogram.types import ChatMemberUpdated
+from info import AUTH_CHANNEL
+from utils import membership_cache
+
+NOT_JOINED = (ChatMemberStatus.LEFT, ChatMemberStatus.BANNED)
+
+# ==================================================================
+# 📢 FORCE SUBSCRIBE MEMBERSHIP UPDATES
+# ==================================================================
+# Joins/leaves in the auth channels overwrite the cached membership,
+# so is_user_joined stays accurate without re-asking Telegram.
+@Client.on_chat_member_updated(filters.chat(AUTH_CHANNEL))
+async def fsub_member_updated(client, update: ChatMemberUpdated):
+    member = update.new_chat_member or update.old_chat_member
+    if not member or not member.user:
+        return
+    joined = bool(update.new_chat_member) and update.new_chat_member.status not in NOT_JOINED
+    membership_cache.put(update.chat.id, member.user.id, joined)
@@ -3,10 +3,10 @@ from pyrogram import Client, filters
 from pyrogram.types import InlineKeyboardMarkup, InlineKeyboardButton, Message
 from database.users_db import db
 from info import DAILY_LIMIT, PREMIUM_DAILY_LIMIT, VERIFICATION_DAILY_LIMIT, FSUB, IS_VERIFY
-import asyncio
 from plugins.verification import av_x_verification
 from plugins.ban_manager import ban_manager
-from utils import temp, auto_delete_message, is_user_joined
+from utils import temp, is_user_joined
+from autodelete import auto_delete
 
 
 @Client.on_message(filters.command("getvideo") | filters.regex(r"(?i)get video"))
@@ -27,63 +27,61 @@ async def handle_video_request(client, m: Message):
     if await ban_manager.check_ban(client, m):
         return
 
-    # Premium + limit info
-    is_premium = await db.has_premium_access(user_id)
-    # Define limits based on status
-    current_limit = PREMIUM_DAILY_LIMIT if is_premium else DAILY_LIMIT
-    
-    used = await db.get_video_count(user_id) or 0
+    # Premium + limit info (one cached snapshot, shared with check_ban)
+    state = await db.get_user_state(user_id)
 
     # ------------------------------------------------
     # LIMIT & VERIFICATION & PREMIUM SYSTEM
     # ------------------------------------------------
-    
+    # The snapshot only picks where to start. What the user gets is decided
+    # by reserve_quota (atomic, so fast double taps can't overshoot): a tap
+    # that loses the last free slot goes on to verification, not "limit reached".
+
     # Message for when any absolute max limit is reached
-    limit_reached_msg = (
-        f"𝖸𝗈𝗎'𝗏𝖾 𝖱𝖾𝖺𝖼𝗁𝖾𝖽 𝖸𝗈𝗎𝗋 𝖣𝖺𝗂𝗅𝗒 𝖫𝗂𝗆𝗂𝗍 𝖮𝖿 {used} 𝖥𝗂𝗅𝖾𝗌.\n\n"
-        "𝖳𝗋𝗒 𝖠𝗀𝖺𝗂𝗇 𝖳𝗈𝗆𝗈𝗋𝗋𝗈𝗐!\n"
-        "𝖮𝗋 𝖯𝗎𝗋𝖼𝗁𝖺𝗌𝖾 𝖲𝗎𝖻𝗌𝖼𝗋𝗂𝗉𝗍𝗂𝗈𝗇 𝖳𝗈 𝖡𝗈𝗈𝗌𝗍 𝖸𝗈𝗎𝗋 𝖣𝖺𝗂𝗅𝗒 𝖫𝗂𝗆𝗂𝗍"
-    )
+    def limit_reached_msg(limit):
+        return (
+            f"𝖸𝗈𝗎'𝗏𝖾 𝖱𝖾𝖺𝖼𝗁𝖾𝖽 𝖸𝗈𝗎𝗋 𝖣𝖺𝗂𝗅𝗒 𝖫𝗂𝗆𝗂𝗍 𝖮𝖿 {limit} 𝖥𝗂𝗅𝖾𝗌.\n\n"
+            "𝖳𝗋𝗒 𝖠𝗀𝖺𝗂𝗇 𝖳𝗈𝗆𝗈𝗋𝗋𝗈𝗐!\n"
+            "𝖮𝗋 𝖯𝗎𝗋𝖼𝗁𝖺𝗌𝖾 𝖲𝗎𝖻𝗌𝖼𝗋𝗂𝗉𝗍𝗂𝗈𝗇 𝖳𝗈 𝖡𝗈𝗈𝗌𝗍 𝖸𝗈𝗎𝗋 𝖣𝖺𝗂𝗅𝗒 𝖫𝗂𝗆𝗂𝗍"
+        )
     buy_button = InlineKeyboardMarkup([
         [InlineKeyboardButton("• 𝖯𝗎𝗋𝖼𝗁𝖺𝗌𝖾 𝖲𝗎𝖻𝗌𝖼𝗋𝗂𝗉𝗍𝗂𝗈𝗇 •", callback_data="get")]
     ])
 
-    if is_premium:
+    if state.is_premium:
         # Premium User Logic
-        if used >= PREMIUM_DAILY_LIMIT:
+        if await db.reserve_quota(user_id, PREMIUM_DAILY_LIMIT, username) is None:
             return await m.reply(
                 f"𝖸𝗈𝗎'𝗏𝖾 𝖱𝖾𝖺𝖼𝗁𝖾𝖽 𝖸𝗈𝗎𝗋 𝖯𝗋𝖾𝗆𝗂𝗎𝗆 𝖫𝗂𝗆𝗂𝗍 𝖮𝖿 {PREMIUM_DAILY_LIMIT} 𝖥𝗂𝗅𝖾𝗌.\n"
                 f"𝖳𝗋𝗒 𝖠𝗀𝖺𝗂𝗇 𝖳𝗈𝗆𝗈𝗋𝗋𝗈𝗐!"
             )
     else:
-        if used >= VERIFICATION_DAILY_LIMIT:
-            return await m.reply(limit_reached_msg, reply_markup=buy_button)
-        if used >= DAILY_LIMIT:
-            if IS_VERIFY:
-                verified = await av_x_verification(client, m)
-                if not verified:
-                    return 
-            else:
-                return await m.reply(limit_reached_msg, reply_markup=buy_button)
+        reserved = None
+        if state.used_today < DAILY_LIMIT:
+            reserved = await db.reserve_quota(user_id, DAILY_LIMIT, username)
+        if reserved is None:
+            # Free files used up: only verified users go on, up to VERIFICATION_DAILY_LIMIT
+            if not IS_VERIFY:
+                return await m.reply(limit_reached_msg(DAILY_LIMIT), reply_markup=buy_button)
+            # Re-read: a failed reservation has dropped the cached snapshot
+            if (await db.get_user_state(user_id)).used_today >= VERIFICATION_DAILY_LIMIT:
+                return await m.reply(limit_reached_msg(VERIFICATION_DAILY_LIMIT), reply_markup=buy_button)
+            verified = await av_x_verification(client, m)
+            if not verified:
+                return
+            if await db.reserve_quota(user_id, VERIFICATION_DAILY_LIMIT, username) is None:
+                return await m.reply(limit_reached_msg(VERIFICATION_DAILY_LIMIT), reply_markup=buy_button)
 
     # ------------------------------------------------
     # GET VIDEO
     # ------------------------------------------------
+    # Shuffled cursor starts a new cycle by itself once everything is seen
     video_id = await db.get_unseen_video(user_id)
 
     if not video_id:
-        try:
-            video_id = await db.get_random_video()
-        except Exception as e:
-            print(f"[Random Video Error] {e}")
-            return
-
-    if not video_id:
+        await db.release_quota(user_id)
         return
 
-    # Increase daily count
-    await db.increase_video_count(user_id, username)
-
     # ------------------------------------------------
     # SEND VIDEO
     # ------------------------------------------------
@@ -101,8 +99,9 @@ async def handle_video_request(client, m: Message):
         )
 
         # Auto delete in background
-        asyncio.create_task(auto_delete_message(m, sent))
+        auto_delete.schedule(m.chat.id, [sent.id, m.id])
 
     except Exception as e:
+        await db.release_quota(user_id)
         await m.reply(f"❌ Failed to send video: {str(e)}")
         
@@ -73,23 +73,50 @@ async def index_files(bot, query):
             reply_markup=InlineKeyboardMarkup(buttons)
         )
 
-    # Step 2: Start Indexing
+    # Step 2: Offer resume if an earlier run left a checkpoint
     elif action.startswith('start_'):
         target_db = action.replace('start_', '') # 'main' or 'brazzers'
-        db_name = "Brazzers" if target_db == "brazzers" else "Main Video"
-        
-        await query.message.edit(
-            f"<b>🚀 {db_name} Indexing started...</b>\n"
-            f"🔹 Chat: {chat}\n"
-            f"🔹 Starting from: {skip}"
-        )
-        
-        # Start Indexing Process
-        await index_files_to_db(lst_msg_id, chat, query.message, bot, skip, target_db)
-        
-        # Cleanup Cache after finish
-        if user_id in INDEX_CACHE:
-            del INDEX_CACHE[user_id]
+        kind = "brazzers" if target_db == "brazzers" else "videoz"
+        checkpoint = await db.get_index_checkpoint(chat, kind)
+        if checkpoint and skip < checkpoint < lst_msg_id:
+            buttons = [
+                [InlineKeyboardButton(f'▶️ Resume from {checkpoint}', callback_data=f'index#resume_{target_db}')],
+                [InlineKeyboardButton(f'🔁 Start from {skip}', callback_data=f'index#from_{target_db}')],
+                [InlineKeyboardButton('❌ Cancel', callback_data='index#cancel')]
+            ]
+            await query.message.edit(
+                f"<b>📌 Checkpoint found for this channel:</b> <code>{checkpoint}/{lst_msg_id}</code>",
+                reply_markup=InlineKeyboardMarkup(buttons)
+            )
+            return
+        await start_indexing(bot, query, data, target_db, skip)
+
+    # Step 3: Resume from checkpoint / start from the given skip
+    elif action.startswith('resume_') or action.startswith('from_'):
+        mode, target_db = action.split('_', 1)
+        if mode == 'resume':
+            kind = "brazzers" if target_db == "brazzers" else "videoz"
+            skip = await db.get_index_checkpoint(chat, kind) or skip
+        await start_indexing(bot, query, data, target_db, skip)
+
+async def start_indexing(bot, query, data, target_db, skip):
+    user_id = query.from_user.id
+    chat = data['chat']
+    lst_msg_id = data['lst_msg_id']
+    db_name = "Brazzers" if target_db == "brazzers" else "Main Video"
+    
+    await query.message.edit(
+        f"<b>🚀 {db_name} Indexing started...</b>\n"
+        f"🔹 Chat: {chat}\n"
+        f"🔹 Starting from: {skip}"
+    )
+    
+    # Start Indexing Process
+    await index_files_to_db(lst_msg_id, chat, query.message, bot, skip, target_db)
+    
+    # Cleanup Cache after finish
+    if user_id in INDEX_CACHE:
+        del INDEX_CACHE[user_id]
 
 # =================================================
 # 📥 COMMAND HANDLER (/index)
@@ -174,6 +201,53 @@ async def send_for_index(bot, message):
 # =================================================
 # ⚙️ MAIN INDEXING LOGIC
 # =================================================
+# Fetching and writing overlap: a fetcher pulls 200-ID batches into a small
+# queue while the writer bulk-inserts the previous one and checkpoints the
+# last message id per (channel, target), so a crashed run can resume.
+# A batch that can't be fetched or written after retries stops the run at
+# the last good checkpoint instead of being skipped.
+BATCH_SIZE = 200      # get_messages limit per call
+QUEUE_DEPTH = 3       # fetched batches allowed to wait for the writer
+PROGRESS_EVERY = 10   # seconds between progress edits
+RETRIES = 3           # attempts per batch fetch / write (FloodWaits not counted)
+
+async def fetch_batches(bot, chat, first_id, lst_msg_id, queue):
+    """Queues (ids, messages); messages is None when the batch couldn't be fetched."""
+    current = first_id
+    while current <= lst_msg_id and not temp.CANCEL:
+        ids = list(range(current, min(current + BATCH_SIZE, lst_msg_id + 1)))
+        messages = None
+        attempt = 0
+        while attempt < RETRIES:
+            try:
+                messages = await bot.get_messages(chat, ids)
+                break
+            except FloodWait as e:
+                await asyncio.sleep(e.value)
+            except Exception as e:
+                attempt += 1
+                print(f"Batch Error ({attempt}/{RETRIES}): {e}")
+                await asyncio.sleep(2 ** attempt)
+        await queue.put((ids, messages))
+        if messages is None:
+            return  # the writer stops here
+        current += BATCH_SIZE
+    # Only reached on a normal finish; a writer that stops early cancels us
+    await queue.put(None)
+
+async def write_batch(kind, entries):
+    """Bulk insert with retries. True once nothing but duplicates failed."""
+    for attempt in range(1, RETRIES + 1):
+        try:
+            result = await db.add_videos_bulk(kind, entries)
+            if not result["failed"]:
+                return result
+            print(f"Bulk Insert Error ({attempt}/{RETRIES}): {result['failed']} writes failed")
+        except Exception as e:
+            print(f"Bulk Insert Error ({attempt}/{RETRIES}): {e}")
+        await asyncio.sleep(2 ** attempt)
+    return None
+
 async def index_files_to_db(lst_msg_id, chat, msg, bot, skip, target_db):
     start_time = time.time()
     total_files = 0
@@ -182,40 +256,32 @@ async def index_files_to_db(lst_msg_id, chat, msg, bot, skip, target_db):
     deleted = 0
     no_media = 0
     unsupported = 0
-    current = skip + 1 
-    BATCH_SIZE = 20
+    scanned = skip
+    kind = "brazzers" if target_db == "brazzers" else "videoz"
+    db_label = "🔞 Brazzers" if target_db == "brazzers" else "🎬 Video"
+    fetcher = None
+    stopped = None
 
     async with lock:
         try:
             temp.CANCEL = False
-            
-            while current <= lst_msg_id:
-                
-                if temp.CANCEL:
-                    time_taken = get_readable_time(time.time()-start_time)
-                    await msg.edit(f"🛑 Indexing Cancelled!\n⏱ Time: {time_taken}\n✅ Saved: {total_files}")
-                    return
+            queue = asyncio.Queue(maxsize=QUEUE_DEPTH)
+            # Sequential writer below: checkpoints advance in message order
+            fetcher = asyncio.create_task(fetch_batches(bot, chat, skip + 1, lst_msg_id, queue))
+            last_edit = time.time()
 
-                end_id = min(current + BATCH_SIZE, lst_msg_id + 1)
-                ids = list(range(current, end_id))
-                
-                if not ids:
+            while True:
+                item = await queue.get()
+                if item is None:
                     break
+                ids, messages = item
 
-                try:
-                    messages = await bot.get_messages(chat, ids)
-                except FloodWait as e:
-                    await asyncio.sleep(e.value)
-                    messages = await bot.get_messages(chat, ids)
-                except Exception as e:
-                    print(f"Batch Error: {e}")
-                    errors += len(ids)
-                    current += BATCH_SIZE
-                    continue
+                if messages is None:
+                    stopped = f"could not fetch messages {ids[0]}-{ids[-1]}"
+                    break
 
+                entries = []
                 for message in messages:
-                    if temp.CANCEL: break
-                    
                     try:
                         # 1. Validation Checks
                         if not message or message.empty:
@@ -235,38 +301,38 @@ async def index_files_to_db(lst_msg_id, chat, msg, bot, skip, target_db):
                             unsupported += 1
                             continue
                         
-                        file_id = media.file_id
-                        file_unique_id = media.file_unique_id
-                        
-                        # 2. Database Insertion
-                        if target_db == "brazzers":
-                            # Ensure your DB function supports this
-                            is_new = await db.add_brazzers_video(file_unique_id, file_id)
-                        else:
-                            is_new = await db.add_video(file_unique_id, file_id)
-                        
-                        # Handle case where DB function returns None
-                        if is_new is None: 
-                            is_new = True 
-
-                        if is_new:
-                            total_files += 1
-                        else:
-                            duplicate += 1
+                        entries.append((media.file_unique_id, media.file_id, None))
 
                     except Exception as e:
                         print(f"Message Error: {e}")
                         errors += 1
 
-                # 3. Update Loop & UI
-                current += BATCH_SIZE
-                
-                # Update UI every batch
-                percentage = (min(current, lst_msg_id) / lst_msg_id) * 100
+                # 2. Database Insertion (one bulk write per batch)
+                if entries:
+                    result = await write_batch(kind, entries)
+                    if result is None:
+                        stopped = f"could not save messages {ids[0]}-{ids[-1]}"
+                        break
+                    total_files += result["new"]
+                    duplicate += result["duplicate"]
+
+                # 3. Checkpoint only after this batch is written
+                scanned = ids[-1]
+                try:
+                    await db.set_index_checkpoint(chat, kind, scanned)
+                except Exception as e:
+                    print(f"Checkpoint Error: {e}")
+
+                if temp.CANCEL:
+                    continue  # drain what the fetcher already queued
+
+                # 4. Progress (throttled)
+                if time.time() - last_edit < PROGRESS_EVERY:
+                    continue
+                last_edit = time.time()
+                percentage = (scanned / lst_msg_id) * 100
                 prog_bar = get_progress_bar(percentage)
                 elapsed_time = get_readable_time(time.time() - start_time)
-                
-                db_label = "🔞 Brazzers" if target_db == "brazzers" else "🎬 Video"
                 btn = [[InlineKeyboardButton('CANCEL', callback_data=f'index#cancel')]]
                 
                 try:
@@ -274,7 +340,7 @@ async def index_files_to_db(lst_msg_id, chat, msg, bot, skip, target_db):
                         f"📊 <b>{db_label} Indexing Progress</b>\n"
                         f"{prog_bar} {percentage:.1f}%\n"
                         f"━━━━━━━━━━━━━━━━\n"
-                        f"📥 Scanned: <code>{min(current, lst_msg_id)}/{lst_msg_id}</code>\n"
+                        f"📥 Scanned: <code>{scanned}/{lst_msg_id}</code>\n"
                         f"✅ Saved: <code>{total_files}</code>\n"
                         f"♻️ Duplicates: <code>{duplicate}</code>\n"
                         f"🗑 Deleted/Skip: <code>{deleted + no_media + unsupported}</code>\n"
@@ -287,10 +353,24 @@ async def index_files_to_db(lst_msg_id, chat, msg, bot, skip, target_db):
                 except Exception:
                     pass
 
-            # Final Message
             time_taken = get_readable_time(time.time()-start_time)
-            db_label = "🔞 Brazzers" if target_db == "brazzers" else "🎬 Video"
-            
+            if stopped:
+                fetcher.cancel()
+                await msg.edit(
+                    f"⚠️ Indexing stopped: {stopped}\n⏱ Time: {time_taken}\n✅ Saved: {total_files}\n"
+                    f"📌 Checkpoint: <code>{scanned}</code> (use /index to resume)"
+                )
+                return
+
+            await fetcher
+            if temp.CANCEL:
+                await msg.edit(
+                    f"🛑 Indexing Cancelled!\n⏱ Time: {time_taken}\n✅ Saved: {total_files}\n"
+                    f"📌 Checkpoint: <code>{scanned}</code> (use /index to resume)"
+                )
+                return
+
+            # Final Message
             await msg.edit(
                 f"✅ <b>{db_label} Indexing Completed!</b>\n"
                 f"⏱ Time: {time_taken}\n"
@@ -303,5 +383,8 @@ async def index_files_to_db(lst_msg_id, chat, msg, bot, skip, target_db):
             )
 
         except Exception as e:
-            await msg.edit(f"❌ Critical Error: {e}")
-            
+            await msg.edit(f"❌ Critical Error: {e}\n📌 Checkpoint: <code>{scanned}</code>")
+        finally:
+            # Never leave the fetcher blocked on a queue nobody reads
+            if fetcher and not fetcher.done():
+                fetcher.cancel()
@@ -4,50 +4,75 @@ from Script import script
 from database.users_db import db
 from info import DAILY_LIMIT, PREMIUM_DAILY_LIMIT, ADMINS, LOG_CHANNEL, PREMIUM_LOGS, OWNER_USERNAME, UPI_ID, QR_CODE_IMAGE
 from datetime import timedelta
-import pytz, datetime, time, asyncio
+import pytz, datetime, time, asyncio, os
 from pyrogram.errors.exceptions.bad_request_400 import MessageTooLong
-from utils import temp, get_seconds
+from utils import temp, get_seconds, user_resolver
+from route import premium_scheduler
 
 # -------------------------------------------------------------------------
 # 📋 ADMIN: LIST PREMIUM USERS
 # -------------------------------------------------------------------------
+async def _premium_user_batches(client, cursor, size=200):
+    """Yield (user_id, expiry, mention) in get_users batches of up to 200."""
+    batch = []
+    async for user in cursor:
+        batch.append(user)
+        if len(batch) == size:
+            async for row in _resolve_premium_batch(client, batch):
+                yield row
+            batch = []
+    if batch:
+        async for row in _resolve_premium_batch(client, batch):
+            yield row
+
+async def _resolve_premium_batch(client, batch):
+    tg_users = await user_resolver.get_users(client, [user['id'] for user in batch])
+    mentions = {user_id: tg_user.mention for user_id, tg_user in tg_users.items()}
+    for user in batch:
+        yield user['id'], user['expiry_time'], mentions.get(user['id'], "Unknown")
+
 @Client.on_message(filters.command("premium_user") & filters.user(ADMINS))
 async def premium_user(client, message):
     aa = await message.reply_text("Fetching ...")  
-    users = await db.get_all_users()
-    users_list = []
-    async for user in users:
-        users_list.append(user)    
-    user_data = {user['id']: await db.get_user(user['id']) for user in users_list}    
-    new_users = []
-    for user in users_list:
-        user_id = user['id']
-        data = user_data.get(user_id)
-        expiry = data.get("expiry_time") if data else None        
-        if expiry:
+    cursor = await db.get_active_premium_users()
+    current_time = datetime.datetime.now(pytz.timezone("Asia/Kolkata"))
+    count = 0
+    new = "Paid Users - \n\n"
+    with open('usersplan.txt', 'w+') as outfile:
+        outfile.write(new)
+        async for user_id, expiry, mention in _premium_user_batches(client, cursor):
+            if expiry.tzinfo is None:
+                expiry = expiry.replace(tzinfo=datetime.timezone.utc)
             expiry_ist = expiry.astimezone(pytz.timezone("Asia/Kolkata"))
             expiry_str_in_ist = expiry_ist.strftime("%d-%m-%Y %I:%M:%S %p")          
-            current_time = datetime.datetime.now(pytz.timezone("Asia/Kolkata"))
             time_left = expiry_ist - current_time
             days, remainder = divmod(time_left.total_seconds(), 86400)
             hours, remainder = divmod(remainder, 3600)
             minutes, _ = divmod(remainder, 60)            
             time_left_str = f"{int(days)} days, {int(hours)} hours, {int(minutes)} minutes"            
-            user_info = await client.get_users(user_id)
+            count += 1
             user_str = (
-                f"{len(new_users) + 1}. User ID: {user_id}\n"
-                f"Name: {user_info.mention}\n"
+                f"{count}. User ID: {user_id}\n"
+                f"Name: {mention}\n"
                 f"Expiry Date: {expiry_str_in_ist}\n"
                 f"Expiry Time: {time_left_str}\n\n"
             )
-            new_users.append(user_str)
-    new = "Paid Users - \n\n" + "\n".join(new_users)   
+            outfile.write(user_str + "\n")
+            # Only keep text in memory while it could still fit one message
+            if new is not None:
+                new += user_str + "\n"
+                if len(new) > 4096:
+                    new = None
     try:
-        await aa.edit_text(new)
+        if new is not None:
+            await aa.edit_text(new)
+        else:
+            await message.reply_document('usersplan.txt', caption=f"Paid Users: {count}")
     except MessageTooLong:
-        with open('usersplan.txt', 'w+') as outfile:
-            outfile.write(new)
-        await message.reply_document('usersplan.txt', caption="Paid Users:")
+        await message.reply_document('usersplan.txt', caption=f"Paid Users: {count}")
+    finally:
+        if os.path.exists('usersplan.txt'):
+            os.remove('usersplan.txt')
 
 # -------------------------------------------------------------------------
 # 🛍️ BUY COMMAND (Shows Plan & QR Code)
@@ -130,6 +155,7 @@ async def approve_payment(client, callback_query: CallbackQuery):
     user_id = int(user_id)
     days = int(days)
     new_expiry = await db.add_premium_access(user_id, days)
+    premium_scheduler.schedule(user_id, new_expiry)
     expiry_ist = new_expiry.astimezone(pytz.timezone("Asia/Kolkata"))
     expiry_str = expiry_ist.strftime("%d-%m-%Y %I:%M %p")
     try:
@@ -167,9 +193,9 @@ async def reject_payment(client, callback_query: CallbackQuery):
 async def myplan_handler(_, m: Message):
     user_id = m.from_user.id
     username = m.from_user.first_name
-    used = await db.get_video_count(user_id)
-    is_premium = await db.has_premium_access(user_id)
-    premium_details = await db.get_user(user_id) if is_premium else None
+    state = await db.get_user_state(user_id)
+    used = state.used_today
+    is_premium = state.is_premium
     daily_limit = PREMIUM_DAILY_LIMIT if is_premium else DAILY_LIMIT
     remaining = max(daily_limit - used, 0)
     subscription_type = "𝖯𝖺𝗂𝖽" if is_premium else "𝖥𝗋𝖾𝖾"
@@ -182,8 +208,8 @@ async def myplan_handler(_, m: Message):
 📂 <b>𝖣𝖺𝗂𝗅𝗒 𝖫𝗂𝗆𝗂𝗍:</b> {daily_limit} 𝖥𝗂𝗅𝖾𝗌
 📉 <b>𝖴𝗌𝖾𝖽:</b> {used} | <b>𝖫𝖾𝖿𝗍:</b> {remaining}"""
 
-    if is_premium and premium_details and premium_details.get('expiry_time'):
-        expiry = premium_details['expiry_time']
+    if is_premium and state.expiry_time:
+        expiry = state.expiry_time
         if expiry.tzinfo is None:
             expiry = pytz.utc.localize(expiry)
         expiry_ist = expiry.astimezone(pytz.timezone("Asia/Kolkata"))
@@ -204,9 +230,8 @@ async def give_premium_cmd_handler(client, message):
         time_zone = datetime.datetime.now(pytz.timezone("Asia/Kolkata"))
         current_time = time_zone.strftime("%d-%m-%Y\n⏱️ ᴊᴏɪɴɪɴɢ ᴛɪᴍᴇ : %I:%M:%S %p") 
         user_id = int(message.command[1])  
-        try:
-            user = await client.get_users(user_id)
-        except:
+        user = await user_resolver.get_user(client, user_id)
+        if not user:
             await message.reply_text("Invalid user ID")
             return
         
@@ -216,10 +241,9 @@ async def give_premium_cmd_handler(client, message):
         
         if seconds > 0:
             expiry_time = datetime.datetime.now() + datetime.timedelta(seconds=seconds)
-            user_data = {"id": user_id, "expiry_time": expiry_time}  
-            await db.update_user(user_data) 
-            data = await db.get_user(user_id)
-            expiry = data.get("expiry_time")   
+            await db.set_premium_expiry(user_id, expiry_time)
+            premium_scheduler.schedule(user_id, expiry_time)
+            expiry = expiry_time
             
             # Ensure expiry is timezone aware if necessary, or assume naive from DB
             if expiry.tzinfo is None:
@@ -251,13 +275,13 @@ async def give_premium_cmd_handler(client, message):
 async def remove_premium(client, message):
     if len(message.command) == 2:
         user_id = int(message.command[1])
-        try:
-            user = await client.get_users(user_id)
-        except:
+        user = await user_resolver.get_user(client, user_id)
+        if not user:
             await message.reply_text("Invalid user ID")
             return
             
         if await db.remove_premium_access(user_id):
+            premium_scheduler.cancel(user_id)
             await message.reply_text("ᴜꜱᴇʀ ʀᴇᴍᴏᴠᴇᴅ ꜱᴜᴄᴄᴇꜱꜱꜰᴜʟʟʏ !")
             try:
                 await client.send_message(
@@ -1,10 +1,11 @@
 from pyrogram import Client, filters, enums
 from pyrogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from database.users_db import db
-from utils import temp
+from utils import temp, user_resolver
 from Script import script
 import datetime
 from info import PREMIUM_LOGS
+from route import premium_scheduler
 
 @Client.on_message(filters.command(["invite", "refer"]))
 async def invite_command_handler(client, message):
@@ -41,9 +42,8 @@ async def refer_on_start(client, message):
     if await db.is_user_exist(user_id):
         return await message.reply_text("<b>𝘠𝘰𝘶 𝘢𝘳𝘦 𝘢𝘭𝘳𝘦𝘢𝘥𝘺 𝘢 𝘶𝘴𝘦𝘳!</b>")
 
-    try:
-        inviter = await client.get_users(inviter_id)
-    except:
+    inviter = await user_resolver.get_user(client, inviter_id)
+    if not inviter:
         return await message.reply_text("❌ 𝘐𝘯𝘷𝘢𝘭𝘪𝘥 𝘐𝘯𝘷𝘪𝘵𝘦𝘳 𝘐𝘋!")
 
     await db.add_user(user_id, message.from_user.first_name)
@@ -59,10 +59,8 @@ async def refer_on_start(client, message):
     if new_total >= 10:
         expiry_time = datetime.datetime.now() + datetime.timedelta(hours=1)
 
-        await db.update_user({
-            "id": inviter_id,
-            "expiry_time": expiry_time
-        })
+        await db.set_premium_expiry(inviter_id, expiry_time)
+        premium_scheduler.schedule(inviter_id, expiry_time)
 
         # Reset points
         await db.set_refer_points(inviter_id, 0)
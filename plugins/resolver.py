@@ -0,0 +1,17 @@
+from pyrogram import Client, filters
+from pyrogram.types import Message, CallbackQuery
+from utils import user_resolver
+
+# ==================================================================
+# 👤 USER RESOLVER FEED
+# ==================================================================
+# Runs before every other handler (group -1) and never stops propagation:
+# each incoming from_user refreshes the resolver cache for free.
+@Client.on_message(filters.incoming, group=-1)
+async def remember_message_user(client, message: Message):
+    if message.from_user:
+        user_resolver.remember(message.from_user)
+
+@Client.on_callback_query(group=-1)
+async def remember_callback_user(client, query: CallbackQuery):
+    user_resolver.remember(query.from_user)
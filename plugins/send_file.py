@@ -1,21 +1,48 @@
-import asyncio
 from database.users_db import db
-from utils import temp, auto_delete_message
+from info import DAILY_LIMIT, PREMIUM_DAILY_LIMIT, VERIFICATION_DAILY_LIMIT, IS_VERIFY
+from utils import temp
+from autodelete import auto_delete
+
+async def get_deep_link_limit(user_id):
+    state = await db.get_user_state(user_id)
+    if state.is_premium:
+        return PREMIUM_DAILY_LIMIT
+    if state.used_today >= DAILY_LIMIT and IS_VERIFY and await db.is_user_verified(user_id):
+        return VERIFICATION_DAILY_LIMIT
+    return DAILY_LIMIT
 
 async def send_requested_file(client, message, user_id, search_id):
     try:
-        file_data = await db.videos.find_one({"file_unique_id": search_id})
-        if not file_data:
+        file_id = await db.get_catalog_file("videoz", search_id)
+        if not file_id:
             return await message.reply("❌ File not found.")
 
-        dlt = await message.reply_video(
-            video=file_data['file_id'],
-            caption=(
-                f"<i>𝘗𝘰𝘸𝘦𝘳𝘦𝘥 𝘉𝘺: {temp.U_NAME}</i>\n\n"
-                f"<blockquote>ᴛʜɪꜱ ꜰɪʟᴇ ᴡɪʟʟ ʙᴇ ᴀᴜᴛᴏ ᴅᴇʟᴇᴛᴇ ᴀꜰᴛᴇʀ 10 ᴍɪɴᴜᴛᴇꜱ. ᴘʟᴇᴀꜱᴇ ꜰᴏʀᴡᴀʀᴅ ᴛʜɪꜱ ꜰɪʟᴇ ꜱᴏᴍᴇᴡʜᴇʀᴇ ᴇʟꜱᴇ ᴏʀ ꜱᴀᴠᴇ ɪɴ ꜱᴀᴠᴇᴅ ᴍᴇꜱꜱᴀɢᴇꜱ.</blockquote>"
+        limit = await get_deep_link_limit(user_id)
+        username = message.from_user.username or message.from_user.first_name or "Unknown"
+        reserved = await db.reserve_quota(user_id, limit, username)
+        if reserved is None and limit == DAILY_LIMIT:
+            # Lost the last free slot to a concurrent tap: verified users go on
+            limit = await get_deep_link_limit(user_id)
+            if limit != DAILY_LIMIT:
+                reserved = await db.reserve_quota(user_id, limit, username)
+        if reserved is None:
+            return await message.reply(
+                f"𝖸𝗈𝗎'𝗏𝖾 𝖱𝖾𝖺𝖼𝗁𝖾𝖽 𝖸𝗈𝗎𝗋 𝖣𝖺𝗂𝗅𝗒 𝖫𝗂𝗆𝗂𝗍 𝖮𝖿 {limit} 𝖥𝗂𝗅𝖾𝗌.\n\n"
+                "𝖳𝗋𝗒 𝖠𝗀𝖺𝗂𝗇 𝖳𝗈𝗆𝗈𝗋𝗋𝗈𝗐!"
+            )
+
+        try:
+            dlt = await message.reply_video(
+                video=file_id,
+                caption=(
+                    f"<i>𝘗𝘰𝘸𝘦𝘳𝘦𝘥 𝘉𝘺: {temp.U_NAME}</i>\n\n"
+                    f"<blockquote>ᴛʜɪꜱ ꜰɪʟᴇ ᴡɪʟʟ ʙᴇ ᴀᴜᴛᴏ ᴅᴇʟᴇᴛᴇ ᴀꜰᴛᴇʀ 10 ᴍɪɴᴜᴛᴇꜱ. ᴘʟᴇᴀꜱᴇ ꜰᴏʀᴡᴀʀᴅ ᴛʜɪꜱ ꜰɪʟᴇ ꜱᴏᴍᴇᴡʜᴇʀᴇ ᴇʟꜱᴇ ᴏʀ ꜱᴀᴠᴇ ɪɴ ꜱᴀᴠᴇᴅ ᴍᴇꜱꜱᴀɢᴇꜱ.</blockquote>"
+                )
             )
-        )
-        asyncio.create_task(auto_delete_message(message, dlt))
+        except Exception:
+            await db.release_quota(user_id)
+            raise
+        auto_delete.schedule(message.chat.id, [dlt.id, message.id])
 
     except Exception as e:
         print(f"❌ Error sending file: {e}")
@@ -1,4 +1,3 @@
-import asyncio
 import logging
 import random
 import string
@@ -11,7 +10,8 @@ from info import (
     TUTORIAL_LINK, IS_VERIFY
 )
 from database.users_db import db
-from utils import temp, get_shortlink_av, auto_delete_message
+from utils import temp, get_shortlink_av
+from autodelete import auto_delete
 from Script import script
 
 logger = logging.getLogger(__name__)
@@ -61,7 +61,7 @@ async def av_x_verification(client, message):
         reply_markup=InlineKeyboardMarkup(buttons),
         parse_mode=enums.ParseMode.HTML
     )
-    asyncio.create_task(auto_delete_message(message, dlt))
+    auto_delete.schedule(message.chat.id, [dlt.id, message.id])
     return False
 
 # --- VERIFICATION SUCCESS HANDLER (Run on /start) ---
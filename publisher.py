@@ -0,0 +1,223 @@
+import os
+import time
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from pyrogram.errors import FloodWait
+from pyrogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from info import POST_CHANNEL, POST_SHORTLINK, NO_IMG, POSTS_PER_MINUTE
+from database.users_db import mydb
+from thumbnails import thumbnail_service
+from utils import get_shortlink
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"      # waiting for shortlink/thumbnail
+READY = "ready"          # prerequisites done, waiting for its publish slot
+FAILED = "failed"        # gave up after MAX_ATTEMPTS
+
+
+# -------------------- POST CHANNEL PUBLISHER --------------------
+# post_queue: {file_unique_id (unique), chat_id, message_id, file_name, link,
+# status, shortlink, thumb_file_id, attempts, next_attempt_at, created_at}.
+# Indexing only enqueues. A prep loop resolves shortlinks and thumbnails
+# for whole batches, but only a few minutes' worth of posts ahead; the
+# publish loop sends READY posts at POSTS_PER_MINUTE and backs off on
+# failures. Published jobs are deleted.
+# Prepared thumbnail files are local to this process (self._thumbs); Mongo
+# only ever holds thumb_file_id, and a post without a local file builds
+# its thumbnail at send time.
+class PostPublisher:
+    PREP_BATCH = 20
+    MAX_ATTEMPTS = 5
+    LOOKAHEAD_MINUTES = 5
+
+    def __init__(self, collection, posts_per_minute=POSTS_PER_MINUTE):
+        self.collection = collection
+        self.interval = 60 / max(posts_per_minute, 1)
+        self.lookahead = max(posts_per_minute, 1) * self.LOOKAHEAD_MINUTES
+        self._thumbs = {}  # job _id -> (local thumbnail path, built at)
+        self._wakeup = asyncio.Event()
+        self._tasks = []
+
+    async def enqueue(self, m, file_name, link):
+        # One job per file (unique index); a re-post still waiting isn't queued twice
+        now = datetime.now(timezone.utc)
+        fields = {
+            "chat_id": m.chat.id,
+            "message_id": m.id,
+            "file_name": file_name,
+            "link": link,
+            "status": PENDING,
+            "attempts": 0,
+            "next_attempt_at": now
+        }
+        try:
+            result = await self.collection.update_one(
+                {"file_unique_id": m.video.file_unique_id},
+                {"$setOnInsert": {**fields, "created_at": now}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            return  # a concurrent enqueue of the same file won
+        if result.upserted_id is None:
+            # Gave up on it earlier: a re-post queues it again
+            await self.collection.update_one(
+                {"file_unique_id": m.video.file_unique_id, "status": FAILED},
+                {"$set": fields, "$unset": {"error": ""}}
+            )
+        self._wakeup.set()
+
+    async def start(self, client):
+        loop = asyncio.get_event_loop()
+        self._tasks = [loop.create_task(self._prep_loop(client)), loop.create_task(self._publish_loop(client))]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for path, _ in self._thumbs.values():
+            thumbnail_service.discard(path)
+        self._thumbs = {}
+
+    # ---------- PREREQUISITES ----------
+    async def _shortlink(self, link):
+        if not POST_SHORTLINK:
+            return link
+        try:
+            return await get_shortlink(link)
+        except Exception as e:
+            logger.error(f"Shortlink Error: {e}")
+            return link
+
+    async def _prepare(self, client, jobs):
+        thumbs = await asyncio.gather(*[
+            thumbnail_service.cached(job["file_unique_id"]) for job in jobs
+        ])
+        # Source messages for the jobs that still need a thumbnail, one get_messages per chat
+        messages = {}
+        by_chat = {}
+        for job, thumb in zip(jobs, thumbs):
+            if not thumb:
+                by_chat.setdefault(job["chat_id"], []).append(job["message_id"])
+        for chat_id, message_ids in by_chat.items():
+            try:
+                for msg in await client.get_messages(chat_id, message_ids):
+                    if msg and msg.video:
+                        messages[(chat_id, msg.id)] = msg
+            except Exception as e:
+                logger.error(f"Publisher could not fetch source messages: {e}")
+
+        async def build(job, thumb):
+            msg = messages.get((job["chat_id"], job["message_id"]))
+            path = None if thumb or not msg else await thumbnail_service.build(client, msg)
+            return await self._shortlink(job["link"]), path
+
+        results = await asyncio.gather(*[build(job, thumb) for job, thumb in zip(jobs, thumbs)])
+        for job, thumb, (shortlink, path) in zip(jobs, thumbs, results):
+            if path:
+                self._thumbs[job["_id"]] = (path, time.monotonic())
+            await self.collection.update_one(
+                {"_id": job["_id"]},
+                {"$set": {"status": READY, "shortlink": shortlink, "thumb_file_id": thumb}}
+            )
+
+    def _expire_thumbs(self):
+        # Jobs another replica published never come back to us for cleanup
+        cutoff = time.monotonic() - 2 * self.LOOKAHEAD_MINUTES * 60
+        for job_id, (path, built_at) in list(self._thumbs.items()):
+            if built_at < cutoff:
+                thumbnail_service.discard(path)
+                del self._thumbs[job_id]
+
+    async def _prep_loop(self, client):
+        while True:
+            try:
+                self._expire_thumbs()
+                # Only prepare what can go out in the next few minutes
+                room = self.lookahead - await self.collection.count_documents({"status": READY})
+                jobs = []
+                if room > 0:
+                    jobs = await self.collection.find({"status": PENDING}).sort("created_at", 1).to_list(min(room, self.PREP_BATCH))
+                if jobs:
+                    await self._prepare(client, jobs)
+                    continue
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), 30)
+                except asyncio.TimeoutError:
+                    pass
+            except Exception as e:
+                logger.error(f"Publisher prep error: {e}")
+                await asyncio.sleep(10)
+
+    # ---------- PUBLISHING ----------
+    async def _send(self, client, job):
+        caption = (
+            f"<b>{job['file_name']}</b>\n\n"
+            f"<i>Click the button below to watch the video.</i>"
+        )
+        btn = InlineKeyboardMarkup([
+            [InlineKeyboardButton("📂 ɢᴇᴛ ᴠɪᴅᴇᴏ 📂", url=job.get("shortlink") or job["link"])]
+        ])
+
+        if job.get("thumb_file_id"):
+            try:
+                return await client.send_photo(POST_CHANNEL, job["thumb_file_id"], caption=caption, reply_markup=btn)
+            except FloodWait:
+                raise
+            except Exception as e:
+                logger.warning(f"Cached thumb failed, rebuilding: {e}")
+
+        path, _ = self._thumbs.pop(job["_id"], (None, None))
+        if not path or not os.path.exists(path):
+            # Prepared before a restart or on another replica: build it now
+            msg = await client.get_messages(job["chat_id"], job["message_id"])
+            path = await thumbnail_service.build(client, msg) if msg and msg.video else None
+        try:
+            sent = await client.send_photo(POST_CHANNEL, path or NO_IMG, caption=caption, reply_markup=btn)
+            if path:
+                await thumbnail_service.remember(job["file_unique_id"], sent)
+            return sent
+        finally:
+            thumbnail_service.discard(path)
+
+    async def _publish_loop(self, client):
+        while True:
+            try:
+                now = datetime.now(timezone.utc)
+                job = await self.collection.find_one_and_update(
+                    {"status": READY, "next_attempt_at": {"$lte": now}},
+                    {"$set": {"next_attempt_at": now + timedelta(minutes=10)}},  # lease
+                    sort=[("created_at", 1)],
+                    return_document=ReturnDocument.AFTER
+                )
+                if not job:
+                    await asyncio.sleep(5)
+                    continue
+                try:
+                    await self._send(client, job)
+                    await self.collection.delete_one({"_id": job["_id"]})
+                    print(f"📸 Post sent for {job['file_name']}")
+                    self._wakeup.set()  # a lookahead slot just opened
+                except FloodWait as e:
+                    await self.collection.update_one({"_id": job["_id"]}, {"$set": {"next_attempt_at": now}})
+                    await asyncio.sleep(e.value)
+                    continue
+                except Exception as e:
+                    attempts = job.get("attempts", 0) + 1
+                    backoff = timedelta(seconds=min(30 * 2 ** attempts, 3600))
+                    update = {"attempts": attempts, "next_attempt_at": now + backoff, "error": str(e)}
+                    if attempts >= self.MAX_ATTEMPTS:
+                        update["status"] = FAILED
+                    await self.collection.update_one({"_id": job["_id"]}, {"$set": update})
+                    logger.error(f"Publish failed for {job['file_name']} (attempt {attempts}): {e}")
+                await asyncio.sleep(self.interval)
+            except Exception as e:
+                logger.error(f"Publisher error: {e}")
+                await asyncio.sleep(10)
+
+
+# 🔹 Initialize
+post_publisher = PostPublisher(mydb.post_queue)
@@ -1,20 +1,21 @@
-import os
 import logging
 import traceback
+import heapq
 import asyncio
-import aiohttp
 from aiohttp import web
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import pytz
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from pyrogram.errors import FloodWait
 
 # Import your database and config
-from database.users_db import db
+from database.users_db import db, REMINDER_TIMES
+from database.reports import UsageReport
+from utils import user_resolver
+from httpclient import http_client
 from info import (
     PREMIUM_LOGS, 
     LOG_CHANNEL, 
-    PREMIUM_DAILY_LIMIT, 
-    DAILY_LIMIT,
     WEB_APP_URL
 )
 
@@ -39,162 +40,215 @@ async def ping_server():
     while True:
         await asyncio.sleep(sleep_time)
         try:
-            async with aiohttp.ClientSession(
-                timeout=aiohttp.ClientTimeout(total=10)
-            ) as session:
-                async with session.get(WEB_APP_URL) as resp:
-                    logging.info(f"Pinged server with response: {resp.status}")
+            async with http_client.session.get(WEB_APP_URL) as resp:
+                logging.info(f"Pinged server with response: {resp.status}")
         except Exception as e:
             logging.warning(f"Couldn't connect to the site URL: {e}")
 
-# --- PREMIUM EXPIRY CHECKER ---
-REMINDER_TIMES = [
-    ("1d", timedelta(days=1)),
-    ("5h30m", timedelta(hours=5, minutes=30)),
-    ("10m", timedelta(minutes=10))
-]
+# --- PREMIUM EXPIRY & REMINDER SCHEDULER ---
+class PremiumScheduler:
+    """
+    Min-heap of (fire_time, user_id, event, expiry, attempt). event is
+    "expired", "expired_notice" (a retried expiry message) or a
+    REMINDER_TIMES label. Loaded from the expiry_time index, then kept
+    current by schedule() from every premium grant. Entries whose expiry no
+    longer matches the user's current one are dropped when popped. Every
+    event is claimed in Mongo before it is sent, so replicas don't double up.
+    """
+    RETRY_DELAY = timedelta(minutes=5)
+    MAX_ATTEMPTS = 3
 
-async def check_expired_premium(client):
-    while True:
-        try:
-            now = datetime.utcnow()
-
-            # 1. Handle Expired Users
-            expired_users = await db.get_expired(now)
-            for user in expired_users:
-                user_id = user["id"]
-
-                # Remove premium status
-                await db.remove_premium_access(user_id)
-
-                # Unset reminder flags in DB
-                unset_flags = {f"reminder_{label}_sent": "" for label, _ in REMINDER_TIMES}
-                await db.users.update_one({"id": user_id}, {"$unset": unset_flags})
-
-                # Notify User & Log
-                try:
-                    tg_user = await client.get_users(user_id)
-                    await client.send_message(
-                        user_id,
-                        f"<b>ʜᴇʏ {tg_user.mention},\n\nʏᴏᴜʀ ᴘʀᴇᴍɪᴜᴍ ᴀᴄᴄᴇss ʜᴀs ᴇxᴘɪʀᴇᴅ.\n\nTᴀᴘ /buy ꜰᴏʀ ʀᴇɴᴇᴡᴀʟ ᴏᴘᴛɪᴏɴs.</b>"
-                    )
-                    await client.send_message(
-                        PREMIUM_LOGS,
-                        f"<b>#Premium_Expired\nUser: {tg_user.mention}\nID: <code>{user_id}</code></b>"
-                    )
-                except Exception as e:
-                    print(f"[EXPIRED NOTIFY ERROR] {e}")
-
-                await asyncio.sleep(0.5)
-
-            # 2. Handle Reminders (Expiring Soon)
-            for label, delta in REMINDER_TIMES:
-                reminder_users = await db.get_expiring_soon(label, delta)
-                for user in reminder_users:
-                    user_id = user["id"]
+    def __init__(self):
+        self.heap = []
+        self.expiry = {}
+        self._wakeup = asyncio.Event()
+
+    @staticmethod
+    def _as_utc(expiry):
+        if expiry.tzinfo is None:
+            return expiry.replace(tzinfo=timezone.utc)
+        return expiry
+
+    def schedule(self, user_id, expiry, sent=(), catch_up=False):
+        """
+        catch_up: after a restart, send the latest reminder whose time passed
+        while the bot was down, if it's still unsent. Older missed ones are
+        stale by then and dropped. Off for fresh grants, which never owed any.
+        """
+        if not isinstance(expiry, datetime):
+            return self.cancel(user_id)
+        expiry = self._as_utc(expiry)
+        now = datetime.now(timezone.utc)
+        self.expiry[user_id] = expiry
+        heapq.heappush(self.heap, (expiry, user_id, "expired", expiry, 0))
+        self._wakeup.set()
+        if expiry <= now:
+            return
+        missed = None
+        for label, delta in REMINDER_TIMES:
+            fire_at = expiry - delta
+            if fire_at <= now:
+                missed = label  # REMINDER_TIMES runs longest first
+            elif label not in sent:
+                heapq.heappush(self.heap, (fire_at, user_id, label, expiry, 0))
+        if catch_up and missed is not None and missed not in sent:
+            heapq.heappush(self.heap, (now, user_id, missed, expiry, 0))
+
+    def cancel(self, user_id):
+        self.expiry.pop(user_id, None)
+
+    async def load(self):
+        cursor = await db.get_premium_schedule()
+        async for user in cursor:
+            sent = {label for label, _ in REMINDER_TIMES if user.get(f"reminder_{label}_sent")}
+            self.schedule(user["id"], user["expiry_time"], sent, catch_up=True)
+
+    def _retry(self, user_ids, event, expiry_of, attempt, now):
+        if attempt + 1 >= self.MAX_ATTEMPTS:
+            return
+        for user_id in user_ids:
+            heapq.heappush(self.heap, (now + self.RETRY_DELAY, user_id, event, expiry_of(user_id), attempt + 1))
+
+    def _pop_due(self, now):
+        """{(event, attempt): {user_id: expiry}}"""
+        due = {}
+        while self.heap and self.heap[0][0] <= now:
+            _, user_id, event, expiry, attempt = heapq.heappop(self.heap)
+            if event == "expired_notice":
+                if user_id in self.expiry:
+                    continue  # renewed before we managed to tell them
+            elif self.expiry.get(user_id) != expiry:
+                continue  # renewed or removed since this was pushed
+            due.setdefault((event, attempt), {})[user_id] = expiry
+            if event == "expired":
+                self.expiry.pop(user_id, None)
+        return due
+
+    async def _fire(self, client, event, attempt, users, now):
+        if event == "expired":
+            expired = await db.expire_premium_users(list(users), now)
+            failed = await notify_premium_users(client, expired, None)
+            self._retry(failed, "expired_notice", users.get, attempt, now)
+        elif event == "expired_notice":
+            failed = await notify_premium_users(client, list(users), None)
+            self._retry(failed, event, users.get, attempt, now)
+        else:
+            claimed = await db.claim_reminders(list(users), event, now)
+            failed = await notify_premium_users(client, claimed, event)
+            # Out of attempts: leave it claimed rather than retry it forever
+            if failed and attempt + 1 < self.MAX_ATTEMPTS:
+                await db.release_reminders(failed, event)
+                self._retry(failed, event, users.get, attempt, now)
+
+    async def run(self, client):
+        loaded = False
+        while True:
+            try:
+                if not loaded:
+                    await self.load()
+                    loaded = True
+
+                now = datetime.now(timezone.utc)
+                timeout = (self.heap[0][0] - now).total_seconds() if self.heap else None
+                if timeout is None or timeout > 0:
+                    self._wakeup.clear()
                     try:
-                        tg_user = await client.get_users(user_id)
-                        await client.send_message(
-                            user_id,
-                            f"<b>ʜᴇʏ {tg_user.mention},\n\nʏᴏᴜʀ ᴘʀᴇᴍɪᴜᴍ ᴡɪʟʟ ᴇxᴘɪʀᴇ ɪɴ {label}.\nTᴀᴘ /buy ᴛᴏ ʀᴇɴᴇᴡ ɴᴏᴡ!</b>"
-                        )
-                        await client.send_message(
-                            PREMIUM_LOGS,
-                            f"<b>#Reminder ({label})\nUser: {tg_user.mention}\nID: <code>{user_id}</code></b>"
-                        )
-                    except Exception as e:
-                        print(f"[REMINDER NOTIFY ERROR] {e}")
-
-                    await asyncio.sleep(0.5)
+                        await asyncio.wait_for(self._wakeup.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
 
-        except Exception as e:
-            print(f"[PREMIUM CHECK LOOP ERROR] {e}")
-        
-        # Check every minute
-        await asyncio.sleep(60)
+                for (event, attempt), users in self._pop_due(now).items():
+                    await self._fire(client, event, attempt, users, now)
+            except Exception as e:
+                print(f"[PREMIUM SCHEDULER ERROR] {e}")
+                await asyncio.sleep(5)
+
+premium_scheduler = PremiumScheduler()
+
+async def notify_premium_users(client, user_ids, label):
+    """Expiry notice (label=None) or reminder. Returns the ids that didn't get it."""
+    failed = []
+    for i in range(0, len(user_ids), 200):
+        batch = user_ids[i:i + 200]
+        tg_users = await user_resolver.get_users(client, batch)
+        for user_id in batch:
+            tg_user = tg_users.get(user_id)
+            if tg_user is None:
+                failed.append(user_id)
+                continue
+            if label is None:
+                text = f"<b>ʜᴇʏ {tg_user.mention},\n\nʏᴏᴜʀ ᴘʀᴇᴍɪᴜᴍ ᴀᴄᴄᴇss ʜᴀs ᴇxᴘɪʀᴇᴅ.\n\nTᴀᴘ /buy ꜰᴏʀ ʀᴇɴᴇᴡᴀʟ ᴏᴘᴛɪᴏɴs.</b>"
+                log = f"<b>#Premium_Expired\nUser: {tg_user.mention}\nID: <code>{user_id}</code></b>"
+            else:
+                text = f"<b>ʜᴇʏ {tg_user.mention},\n\nʏᴏᴜʀ ᴘʀᴇᴍɪᴜᴍ ᴡɪʟʟ ᴇxᴘɪʀᴇ ɪɴ {label}.\nTᴀᴘ /buy ᴛᴏ ʀᴇɴᴇᴡ ɴᴏᴡ!</b>"
+                log = f"<b>#Reminder ({label})\nUser: {tg_user.mention}\nID: <code>{user_id}</code></b>"
+            try:
+                await client.send_message(user_id, text)
+            except FloodWait as e:
+                await asyncio.sleep(e.value)
+                failed.append(user_id)
+                continue
+            except Exception as e:
+                print(f"[PREMIUM NOTIFY ERROR] {e}")
+                failed.append(user_id)
+                continue
+            try:
+                await client.send_message(PREMIUM_LOGS, log)
+            except Exception as e:
+                print(f"[PREMIUM NOTIFY ERROR] {e}")
+
+            await asyncio.sleep(0.5)
+    return failed
 
 # --- AUTOMATIC DAILY REPORT ---
+def format_daily_entry(row):
+    username = row.get("username")
+    username_display = f"@{username}" if username else "N/A"
+    subscription_type = "Paid" if row["is_premium"] else "Free"
+    return (
+        f"👤 User: {username_display} ({row.get('id', 'N/A')})\n"
+        f"╰ 💠 Plan: {subscription_type}\n"
+        f"╰ 📁 Limit: {row['daily_limit']} | Used: {row['used']} | Left: {row['remaining']}"
+    )
+
 async def auto_daily_report(client):
     print("⏰ Sending Daily Auto Report...")
 
-    # Fetch users
-    users_cursor = db.users.find({})
-    report_list = [] 
-    total_files_used = 0
-    active_users_count = 0 
-
-    async for user in users_cursor:
-        user_id = user.get("id", "N/A")
-        username = user.get("username")
-        username_display = f"@{username}" if username else "N/A"
-        
-        # Check usage
-        used = await db.get_video_count(user_id) or 0
-        
-        # Skip inactive users
-        if used == 0:
-            continue
-            
-        is_premium = await db.has_premium_access(user_id)
-        daily_limit = PREMIUM_DAILY_LIMIT if is_premium else DAILY_LIMIT
-        remaining = max(daily_limit - used, 0)
-        
-        total_files_used += used
-        subscription_type = "Paid" if is_premium else "Free"
-
-        # Format Entry
-        user_entry = (
-            f"👤 User: {username_display} ({user_id})\n"
-            f"╰ 💠 Plan: {subscription_type}\n"
-            f"╰ 📁 Limit: {daily_limit} | Used: {used} | Left: {remaining}"
-        )
-        report_list.append(user_entry)
-        active_users_count += 1
-
-    # --- Generate Report ---
+    # --- Generate Report (single aggregation, streamed to file) ---
     today_date = datetime.now(pytz.timezone("Asia/Kolkata")).strftime("%d-%m-%Y")
+    report = await UsageReport(
+        f"Daily_Report_{today_date}.txt",
+        f"📊 DAILY USAGE REPORT - {today_date}",
+        format_daily_entry
+    ).build(db.usage_report())
     
     summary_text = (
         f"📅 **Date:** {today_date}\n"
-        f"🧾 **Active Users:** `{active_users_count}`\n"
-        f"📊 **Total Files Sent:** `{total_files_used}`"
+        f"🧾 **Active Users:** `{report.active_users}`\n"
+        f"📊 **Total Files Sent:** `{report.total_files}`"
     )
 
     # --- Send to Log Channel ---
     chat_id = LOG_CHANNEL 
 
-    if active_users_count > 10:
-        # Save to .txt if list is long
-        file_path = f"Daily_Report_{today_date}.txt"
-        
-        with open(file_path, "w", encoding="utf-8") as f:
-            f.write(f"📊 DAILY USAGE REPORT - {today_date}\n")
-            f.write("=================================\n\n")
-            f.write("\n\n---------------------------------\n\n".join(report_list))
-            f.write("\n\n=================================\n")
-            f.write(f"Total Active Users: {active_users_count}\n")
-            f.write(f"Total Files Used: {total_files_used}")
-
+    if report.is_long:
         try:
             await client.send_document(
                 chat_id=chat_id,
-                document=file_path,
+                document=report.file_path,
                 caption=f"📊 **Daily Auto Report** 🌙\n\n{summary_text}\n\nℹ️ _Full details in file._"
             )
         except Exception as e:
             print(f"Failed to send auto report document: {e}")
-        
-        # Cleanup
-        if os.path.exists(file_path):
-            os.remove(file_path)
 
     else:
         # Send as text message if short
-        if active_users_count == 0:
+        if report.active_users == 0:
             final_msg = f"📊 **Daily Report ({today_date})**\n\n❌ No active usage today."
         else:
             formatted_entries = []
-            for entry in report_list:
+            for entry in report.entries:
                 # Beautify for Telegram markdown
                 entry = entry.replace("User:", "**User:**").replace("Plan:", "`Plan:`")
                 formatted_entries.append(entry)
@@ -206,6 +260,9 @@ async def auto_daily_report(client):
         except Exception as e:
             print(f"Failed to send auto report message: {e}")
 
+    # Cleanup
+    report.cleanup()
+
 # --- START SCHEDULER ---
 async def start_scheduler(client):
     scheduler = AsyncIOScheduler()
@@ -0,0 +1,171 @@
+import time
+import asyncio
+import logging
+from datetime import datetime, timezone
+from shortzy import Shortzy  # Ensure pip install shortzy
+from info import (
+    SHORTLINK_API, SHORTLINK_URL, POST_SHORTLINK_API, POST_SHORTLINK_URL,
+    SHORTLINK_TIMEOUT, SHORTLINK_CACHE_TTL
+)
+from database.users_db import mydb
+from httpclient import http_client
+
+logger = logging.getLogger(__name__)
+
+
+# -------------------- CIRCUIT BREAKER --------------------
+class CircuitBreaker:
+    """
+    Open after `threshold` straight failures. After `cooldown` one caller
+    goes through as the probe; everyone else fails fast until it succeeds.
+    """
+    def __init__(self, threshold=3, cooldown=60):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def allow(self):
+        """True if this call may go to the provider."""
+        if self.opened_at is None:
+            return True
+        if self.probing or time.monotonic() - self.opened_at < self.cooldown:
+            return False
+        self.probing = True  # half-open: this caller is the probe
+        return True
+
+    def success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def failure(self):
+        if self.probing:
+            # Probe failed: straight back to open for another cooldown
+            self.probing = False
+            self.opened_at = time.monotonic()
+            return
+        self.failures += 1
+        if self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+
+
+# -------------------- SHORTLINK CACHE --------------------
+# shortlinks: {_id: "<provider>|<long url>", short, created_at}; a TTL
+# index on created_at expires entries server-side.
+class ShortlinkCache:
+    def __init__(self, collection, ttl=SHORTLINK_CACHE_TTL):
+        self.collection = collection
+        self.ttl = ttl
+        self._ready = False
+
+    async def _ensure_index(self):
+        if self._ready:
+            return
+        self._ready = True
+        try:
+            await self.collection.create_index(
+                "created_at", name="created_at_ttl", expireAfterSeconds=self.ttl
+            )
+        except Exception as e:
+            logger.warning(f"Shortlink TTL index failed: {e}")
+
+    async def get(self, provider, url):
+        doc = await self.collection.find_one({"_id": f"{provider}|{url}"}, {"_id": 0, "short": 1})
+        return doc["short"] if doc else None
+
+    async def put(self, provider, url, short):
+        await self._ensure_index()
+        await self.collection.update_one(
+            {"_id": f"{provider}|{url}"},
+            {"$set": {"short": short, "created_at": datetime.now(timezone.utc)}},
+            upsert=True
+        )
+
+
+# -------------------- SHORTENER SERVICE --------------------
+class Shortener:
+    """
+    cache -> breaker -> provider call under a hard timeout. Any failure,
+    or an open breaker, hands back the long link so callers never stall.
+    """
+    def __init__(self, name, resolve, cache, timeout=SHORTLINK_TIMEOUT):
+        self.name = name
+        self.resolve = resolve
+        self.cache = cache
+        self.timeout = timeout
+        self.breaker = CircuitBreaker()
+
+    async def shorten(self, url):
+        try:
+            cached = await self.cache.get(self.name, url)
+            if cached:
+                return cached
+        except Exception as e:
+            logger.warning(f"Shortlink cache read failed: {e}")
+
+        if not self.breaker.allow():
+            return url
+        try:
+            short = await asyncio.wait_for(self.resolve(url), self.timeout)
+            if not short:
+                raise ValueError("empty shortlink")
+        except asyncio.CancelledError:
+            self.breaker.failure()  # don't leave a half-open probe hanging
+            raise
+        except Exception as e:
+            self.breaker.failure()
+            logger.error(f"{self.name} shortener failed ({type(e).__name__}: {e})")
+            return url
+        self.breaker.success()
+
+        try:
+            await self.cache.put(self.name, url, short)
+        except Exception as e:
+            logger.warning(f"Shortlink cache write failed: {e}")
+        return short
+
+
+async def _api_shortlink(site, api, link, scheme="https"):
+    """shareus or a standard /api shortener, over the shared HTTP session."""
+    if "shareus.in" in site:
+        req_url = f"{scheme}://{site}/shortLink"
+        params = {"token": api, "format": "json", "link": link}
+    else:
+        req_url = f"{scheme}://{site}/api"
+        params = {"api": api, "url": link}
+
+    async with http_client.session.get(req_url, params=params, ssl=False) as response:
+        response.raise_for_status()
+        data = await response.json(content_type=None)
+
+    if data.get("status") == "success" or "shortenedUrl" in data:
+        return data.get("shortlink") or data.get("shortenedUrl")
+    if "short_url" in data:
+        return data["short_url"]
+    raise ValueError(f"unexpected response: {data}")
+
+
+async def _post_shortlink(link):
+    return await _api_shortlink(POST_SHORTLINK_URL, POST_SHORTLINK_API, link)
+
+
+_shortzy = None
+
+async def _verify_shortlink(url):
+    """SHORTLINK_* provider; Shortzy only for sites without the standard API."""
+    global _shortzy
+    try:
+        return await _api_shortlink(SHORTLINK_URL, SHORTLINK_API, url)
+    except Exception as e:
+        logger.warning(f"Standard shortener API failed, trying Shortzy: {e}")
+    if _shortzy is None:
+        _shortzy = Shortzy(SHORTLINK_API, SHORTLINK_URL)
+    return await _shortzy.convert(url)
+
+
+# 🔹 Initialize
+shortlink_cache = ShortlinkCache(mydb.shortlinks)
+post_shortener = Shortener("post", _post_shortlink, shortlink_cache)
+verify_shortener = Shortener("verify", _verify_shortlink, shortlink_cache)
@@ -0,0 +1,5 @@
+import os
+
+# Importing the bot's modules builds a Mongo client from DATABASE_URI.
+# Point it at a local address so tests never resolve the production SRV record.
+os.environ.setdefault("DATABASE_URI", "mongodb://127.0.0.1:27017")
@@ -0,0 +1,120 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import plugins.ban_manager as ban_manager_module
+from database.bans import BanRegistry
+from database.users_db import db
+from plugins.ban_manager import BanManager, FloodTracker
+
+USER = 7
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+class Chat:
+    """Records what the bot said, in place of the client and the Message."""
+    def __init__(self):
+        self.replies = []
+        self.logs = []
+        self.from_user = SimpleNamespace(id=USER, mention="user")
+
+    async def reply(self, text):
+        self.replies.append(text)
+
+    async def delete(self):
+        pass
+
+    async def send_message(self, chat_id, text):
+        self.logs.append(text)
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    clock = Clock()
+    bans = BanRegistry()
+    bans.loaded = True
+
+    async def add_temp_ban(user_id, duration_seconds):
+        bans.add_temp_ban(user_id, clock() + duration_seconds)
+
+    async def block_user(user_id, reason="Spam"):
+        bans.block(user_id)
+
+    monkeypatch.setattr(ban_manager_module.time, "time", clock)
+    monkeypatch.setattr(db, "bans", bans)
+    monkeypatch.setattr(db, "add_temp_ban", add_temp_ban)
+    monkeypatch.setattr(db, "block_user", block_user)
+    manager = BanManager()
+    return manager, clock, bans
+
+
+def flood(manager, clock, chat):
+    """FLOOD_LIMIT messages a second apart; True if the last one was punished."""
+    punished = False
+    for _ in range(manager.FLOOD_LIMIT):
+        punished = asyncio.run(manager.check_ban(chat, chat))
+        clock.now += 1
+    return punished
+
+
+def test_ring_detects_flood_only_inside_window():
+    tracker = FloodTracker(size=3, window=5)
+    state = tracker.get(USER, 0)
+    assert not state.hit(0, 5)
+    assert not state.hit(1, 5)
+    assert state.hit(2, 5)
+    state.reset()
+    assert not state.hit(10, 5) and not state.hit(20, 5) and not state.hit(30, 5)
+
+
+def test_idle_states_are_evicted_on_insert():
+    tracker = FloodTracker(size=3, window=5, idle_ttl=100)
+    tracker.get(1, 0)
+    tracker.get(2, 50)
+    tracker.get(3, 120)
+    assert len(tracker) == 2
+    tracker.get(4, 500)
+    assert len(tracker) == 1
+
+
+def test_warnings_outlive_the_idle_ring():
+    tracker = FloodTracker(size=3, window=5, idle_ttl=100, warn_ttl=1000)
+    tracker.get(USER, 0)
+    assert tracker.warn(USER, 0) == 1
+    tracker.get(USER + 1, 500)  # evicts USER's ring
+    assert len(tracker) == 1
+    assert tracker.warn(USER, 500) == 2
+    # A warning older than warn_ttl starts the count over
+    assert tracker.warn(USER, 2000) == 1
+
+
+def test_escalation_reaches_permanent_ban(manager):
+    manager, clock, bans = manager
+    chat = Chat()
+
+    # Warnings 1 and 2
+    for _ in range(2):
+        assert flood(manager, clock, chat)
+        clock.now += 60
+    # 3: ten minute ban, and messages during it are turned away
+    assert flood(manager, clock, chat)
+    assert bans.temp_ban_remaining(USER, clock()) > 0
+    clock.now += 600
+    # 4: one hour ban, well past the ring's idle_ttl by the time it ends
+    assert flood(manager, clock, chat)
+    assert bans.temp_ban_remaining(USER, clock()) > 3500
+    clock.now += 3600 + 60
+    # Another user arriving evicts the idle ring...
+    manager.flood.get(USER + 1, clock())
+    # ...but the warning count survives, so the next flood is the fifth
+    assert flood(manager, clock, chat)
+    assert bans.is_blocked(USER)
+    assert "Permanent Ban" in chat.replies[-1]
@@ -0,0 +1,88 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+from database.bans import BanRegistry
+
+NOW = 1_000_000.0
+
+
+class Cursor:
+    def __init__(self, docs, gate=None):
+        self.docs = docs
+        self.gate = gate
+
+    def __aiter__(self):
+        return self._iter()
+
+    async def _iter(self):
+        if self.gate:
+            await self.gate.wait()
+        for doc in self.docs:
+            yield doc
+
+
+class Collection:
+    """find() returns every doc; with a gate it waits until the gate opens."""
+    def __init__(self, docs, gate=None):
+        self.docs = docs
+        self.gate = gate
+
+    def find(self, *args, **kwargs):
+        return Cursor(self.docs, self.gate)
+
+
+def snapshot(blocked=(), temp=(), gate=None):
+    expiry = datetime.now(timezone.utc) + timedelta(hours=1)
+    return (
+        Collection([{"user_id": user_id} for user_id in blocked], gate),
+        Collection([{"id": user_id, "temp_ban_expiry": expiry} for user_id in temp]),
+    )
+
+
+def test_temp_bans_run_out_and_are_pruned_on_read():
+    bans = BanRegistry()
+    bans.add_temp_ban(1, NOW + 10)
+    bans.add_temp_ban(2, NOW + 100)
+    assert bans.temp_ban_remaining(1, NOW) == 10
+    assert bans.temp_ban_remaining(1, NOW + 10) == 0
+    assert 1 not in bans.temp_bans and 2 in bans.temp_bans
+    assert bans.temp_ban_remaining(2, NOW + 50) == 50
+
+
+def test_rebanning_extends_instead_of_expiring_early():
+    bans = BanRegistry()
+    bans.add_temp_ban(1, NOW + 10)
+    bans.add_temp_ban(1, NOW + 600)
+    # The first entry runs out, the second ban stands
+    assert bans.temp_ban_remaining(1, NOW + 20) == 580
+
+
+def test_reconcile_replaces_state_from_mongo():
+    bans = BanRegistry()
+    bans.block(99)
+    bans.add_temp_ban(98, NOW + 10)
+    assert asyncio.run(bans.reconcile(*snapshot(blocked=[1, 2], temp=[3]))) == (2, 1)
+    assert bans.loaded
+    assert bans.is_blocked(1) and not bans.is_blocked(99)
+    assert bans.temp_ban_remaining(3) > 3500
+    assert 98 not in bans.temp_bans
+
+
+def test_changes_made_during_reconcile_survive_it():
+    async def scenario():
+        bans = BanRegistry()
+        bans.block(1)
+        gate = asyncio.Event()
+        # Mongo still has user 1 blocked and doesn't know about user 2 yet
+        task = asyncio.ensure_future(bans.reconcile(*snapshot(blocked=[1], gate=gate)))
+        await asyncio.sleep(0)
+        bans.unblock(1)
+        bans.block(2)
+        bans.add_temp_ban(3, time.time() + 600)
+        gate.set()
+        await task
+        assert not bans.is_blocked(1)
+        assert bans.is_blocked(2)
+        assert bans.temp_ban_remaining(3) > 0
+    asyncio.run(scenario())
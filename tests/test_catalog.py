@@ -0,0 +1,98 @@
+import asyncio
+
+from database import catalog as catalog_module
+from database.catalog import Catalog
+
+FILE_ID = "BAACAgUAAxkBAAIBQ2Vxyz_abc-DEF0123456789AAHQEAAm2T4VV"
+
+
+class Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def batch_size(self, size):
+        return self
+
+    def __aiter__(self):
+        return self._iter()
+
+    async def _iter(self):
+        for doc in self.docs:
+            yield doc
+
+
+class Collection:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query, projection):
+        return Cursor([doc for doc in self.docs if "ordinal" in doc])
+
+
+def test_add_and_get_round_trip_ids():
+    catalog = Catalog("videoz")
+    # Canonical base64url ids are stored decoded, anything else as-is
+    assert catalog.add(0, "AgADxQ8AAm2T4VU", FILE_ID)
+    assert catalog.add(1, "not base64!", "plain file id")
+    assert catalog.get(0) == FILE_ID
+    assert catalog.get(1) == "plain file id"
+    assert catalog.get_by_unique("AgADxQ8AAm2T4VU") == FILE_ID
+    assert catalog.get_by_unique("not base64!") == "plain file id"
+    assert catalog.get_by_unique("missing") is None
+    assert len(catalog) == 2 and catalog.end == 2
+
+
+def test_duplicates_and_taken_ordinals_are_rejected():
+    catalog = Catalog("videoz")
+    assert catalog.add(0, "uid-a", "file-a")
+    assert not catalog.add(1, "uid-a", "file-b")
+    assert not catalog.add(0, "uid-b", "file-b")
+    assert len(catalog) == 1
+
+
+def test_holes_stay_empty():
+    catalog = Catalog("videoz")
+    catalog.add(5, "uid-5", "file-5")
+    assert catalog.end == 6
+    assert [catalog.get(ordinal) for ordinal in range(7)] == [None] * 5 + ["file-5", None]
+    assert catalog.random_file_id() == "file-5"
+
+
+def test_lookups_survive_merges(monkeypatch):
+    monkeypatch.setattr(Catalog, "MERGE_AT", 4)
+    catalog = Catalog("videoz")
+    catalog.loaded = True
+    for ordinal in range(10):
+        catalog.add(ordinal, f"uid-{ordinal}", f"file-{ordinal}")
+    # Two batches merged into the sorted index, the rest still recent
+    assert len(catalog._hashes) == 8 and len(catalog._recent) == 2
+    assert list(catalog._hashes) == sorted(catalog._hashes)
+    for ordinal in range(10):
+        assert catalog.ordinal_of(f"uid-{ordinal}") == ordinal
+
+
+def test_hash_collisions_are_told_apart(monkeypatch):
+    monkeypatch.setattr(catalog_module, "_hash", lambda file_unique_id: 7)
+    catalog = Catalog("videoz")
+    catalog.add(0, "uid-a", "file-a")
+    catalog.add(1, "uid-b", "file-b")
+    catalog._merge()
+    catalog.add(2, "uid-c", "file-c")
+    assert catalog.get_by_unique("uid-b") == "file-b"
+    assert catalog.get_by_unique("uid-c") == "file-c"
+    assert catalog.get_by_unique("uid-d") is None
+
+
+def test_load_replaces_contents():
+    catalog = Catalog("videoz")
+    catalog.add(0, "stale", "stale-file")
+    docs = [
+        {"ordinal": 1, "file_unique_id": "uid-1", "file_id": "file-1"},
+        {"file_unique_id": "legacy", "file_id": "no ordinal yet"},
+        {"ordinal": 0, "file_unique_id": "uid-0", "file_id": "file-0"},
+    ]
+    assert asyncio.run(catalog.load(Collection(docs))) == 2
+    assert catalog.loaded
+    assert catalog.get_by_unique("stale") is None
+    assert catalog.get_by_unique("uid-0") == "file-0"
+    assert catalog.get(1) == "file-1"
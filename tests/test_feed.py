@@ -0,0 +1,235 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from bson import ObjectId
+
+from database.feed import LocalFeed, MongoFeed
+from database.user_state import UserState
+from database.users_db import Database
+
+USER = 11
+
+
+# -------------------- two replicas over a LocalFeed --------------------
+class Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def __aiter__(self):
+        return self._iter()
+
+    async def _iter(self):
+        for doc in self.docs:
+            yield doc
+
+
+class Collection:
+    """Just the calls the publishing paths make; queries match nothing."""
+    def __init__(self):
+        self.seq = 0
+
+    async def update_one(self, *args, **kwargs):
+        pass
+
+    async def delete_one(self, *args, **kwargs):
+        pass
+
+    async def delete_many(self, *args, **kwargs):
+        pass
+
+    def find(self, *args, **kwargs):
+        return Cursor([])
+
+    async def insert_many(self, docs, ordered=True):
+        return SimpleNamespace(inserted_ids=[ObjectId() for _ in docs])
+
+    async def find_one_and_update(self, query, update, **kwargs):
+        self.seq += update["$inc"]["seq"]
+        return {"_id": query["_id"], "seq": self.seq}
+
+
+def replicas():
+    hub = []
+    out = []
+    for _ in range(2):
+        db = Database(feed=LocalFeed(hub))
+        db.users = db.blocked_users = db.counters = Collection()
+        db.videos = db.historys = Collection()
+        db.catalogs = {kind: Collection() for kind in db.catalogs}
+        db.bans.loaded = True
+        out.append(db)
+    return out
+
+
+def test_user_write_drops_other_replicas_snapshot():
+    a, b = replicas()
+    b.user_cache.put(UserState(USER, {"id": USER, "video_count": 3}))
+    a.invalidate_user(USER)
+    assert b.user_cache.get(USER) is None
+
+
+def test_bans_reach_other_replicas():
+    a, b = replicas()
+    asyncio.run(a.block_user(USER))
+    assert b.bans.is_blocked(USER)
+    asyncio.run(a.unblock_user(USER))
+    assert not b.bans.is_blocked(USER)
+
+    asyncio.run(a.add_temp_ban(USER, 600))
+    assert 590 < b.bans.temp_ban_remaining(USER) <= 600
+
+
+def test_catalog_changes_reach_other_replicas():
+    a, b = replicas()
+    result = asyncio.run(a.add_videos_bulk("videoz", [("uid1", "file1", None), ("uid2", "file2", None)]))
+    assert result["new"] == 2
+    assert len(b.memory["videoz"]) == 2
+    assert b.memory["videoz"].get_by_unique("uid2") == "file2"
+
+    asyncio.run(a.delete_main_data())
+    assert len(b.memory["videoz"]) == 0
+
+
+def test_replica_ignores_its_own_events():
+    a, b = replicas()
+    seen = []
+    a.feed.subscribe("user", lambda key, data: seen.append("a"))
+    b.feed.subscribe("user", lambda key, data: seen.append("b"))
+    a.feed.publish("user", USER)
+    assert seen == ["b"]
+
+
+# -------------------- MongoFeed tailing --------------------
+class Capped:
+    """Capped collection in natural order; the oldest roll off past max_docs."""
+    def __init__(self, max_docs=100):
+        self.docs = []
+        self.max_docs = max_docs
+        self.dropped = 0
+        self.broken = False
+
+    def append(self, _id, key):
+        self.docs.append({"_id": _id, "kind": "user", "key": key, "data": None, "origin": "other"})
+        if len(self.docs) > self.max_docs:
+            del self.docs[0]
+            self.dropped += 1
+
+    async def find_one(self, query, projection=None, sort=None):
+        if "_id" in query:
+            return next((doc for doc in self.docs if doc["_id"] == query["_id"]), None)
+        return self.docs[-1] if self.docs else None
+
+    def find(self, query, cursor_type=None):
+        assert query == {}, "the live tail must not filter on _id"
+        return Tail(self)
+
+
+class Tail:
+    """Tailable-await cursor: ends an iteration when caught up, dies if broken."""
+    def __init__(self, capped):
+        self.capped = capped
+        self.pos = capped.dropped  # counts every event ever appended
+        self.alive = True
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        await asyncio.sleep(0.01)
+        if self.capped.broken:
+            self.alive = False
+            raise ConnectionError("connection reset")
+        index = self.pos - self.capped.dropped
+        if index >= len(self.capped.docs):
+            raise StopAsyncIteration
+        self.pos += 1
+        return self.capped.docs[index]
+
+
+def tail(capped):
+    feed = MongoFeed(capped, resync_interval=0)
+    got, resyncs = [], []
+    feed.subscribe("user", lambda key, data: got.append(key))
+
+    async def resync():
+        resyncs.append(len(got))
+
+    feed.on_resync(resync)
+    feed._running = True
+    return asyncio.ensure_future(feed._tail_loop()), got, resyncs
+
+
+async def reconnect(capped, *changes):
+    capped.broken = True
+    await asyncio.sleep(0.05)
+    for _id, key in changes:
+        capped.append(_id, key)
+    capped.broken = False
+    await asyncio.sleep(1.1)
+
+
+def test_tail_applies_out_of_order_ids_and_skips_history():
+    async def scenario():
+        capped = Capped()
+        capped.append(50, "before start")
+        task, got, resyncs = tail(capped)
+        await asyncio.sleep(0.05)
+        # A lagging replica's id sorts below the last one applied
+        capped.append(60, "a")
+        capped.append(10, "late")
+        capped.append(70, "b")
+        await asyncio.sleep(0.1)
+        task.cancel()
+        assert got == ["a", "late", "b"]
+        assert resyncs == []
+    asyncio.run(scenario())
+
+
+def test_reconnect_resumes_where_it_left_off_without_reloading():
+    async def scenario():
+        capped = Capped()
+        capped.append(1, "before start")
+        task, got, resyncs = tail(capped)
+        await asyncio.sleep(0.05)
+        capped.append(2, "a")
+        await asyncio.sleep(0.05)
+        await reconnect(capped, (0, "during outage"))
+        task.cancel()
+        assert got == ["a", "during outage"]
+        assert resyncs == []
+    asyncio.run(scenario())
+
+
+def test_reconnect_after_rollover_reloads_once():
+    async def scenario():
+        capped = Capped(max_docs=3)
+        capped.append(1, "before start")
+        task, got, resyncs = tail(capped)
+        await asyncio.sleep(0.05)
+        capped.append(2, "a")
+        await asyncio.sleep(0.05)
+        # Event 2 rolls off while we're disconnected, so there's no position
+        # to resume from: reload once instead of replaying
+        await reconnect(capped, (3, "reloaded"), (4, "reloaded"), (5, "reloaded"))
+        capped.append(6, "after reload")
+        await asyncio.sleep(0.1)
+        task.cancel()
+        assert resyncs == [1]
+        assert got == ["a", "after reload"]
+    asyncio.run(scenario())
+
+
+def test_resyncs_are_rate_limited():
+    async def scenario():
+        feed = MongoFeed(None, resync_interval=0.2)
+        calls = []
+
+        async def resync():
+            calls.append(time.monotonic())
+
+        feed.on_resync(resync)
+        await feed._resync()
+        await feed._resync()
+        assert calls[1] - calls[0] >= 0.19
+    asyncio.run(scenario())
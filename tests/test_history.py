@@ -0,0 +1,131 @@
+import asyncio
+import copy
+from types import SimpleNamespace
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+from database import bitmap
+from database.feed import LocalFeed
+from database.shuffle import permute
+from database.users_db import Database
+
+USER = 5
+
+
+class Histories:
+    """historyz with its unique user_id index and the rev compare-and-set."""
+    def __init__(self):
+        self.docs = {}
+
+    async def find_one(self, query, projection=None):
+        await asyncio.sleep(0)
+        doc = self.docs.get(query["user_id"])
+        return copy.deepcopy(doc)
+
+    async def update_one(self, query, update, upsert=False):
+        await asyncio.sleep(0)
+        doc = self.docs.get(query["user_id"])
+        rev = query.get("rev")
+        if doc is None:
+            matched = False
+        elif isinstance(rev, dict):
+            matched = "rev" not in doc
+        else:
+            matched = rev is None or doc.get("rev") == rev
+        if not matched:
+            if not upsert:
+                return SimpleNamespace(matched_count=0)
+            if doc is not None:
+                raise DuplicateKeyError("user_id")
+            doc = self.docs[query["user_id"]] = {"user_id": query["user_id"]}
+        doc.update(copy.deepcopy(update.get("$set", {})))
+        for field, step in update.get("$inc", {}).items():
+            doc[field] = doc.get(field, 0) + step
+        return SimpleNamespace(matched_count=1)
+
+
+def database(ordinals):
+    db = Database(feed=LocalFeed())
+    db.histories = {"videoz": Histories()}
+    memory = db.memory["videoz"]
+    for ordinal in ordinals:
+        memory.add(ordinal, f"uid-{ordinal}", f"file-{ordinal}")
+    memory.loaded = True
+    return db
+
+
+def serve(db, times):
+    async def run():
+        return [await db.next_from_cursor(USER, "videoz") for _ in range(times)]
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 16, 17, 100, 1000])
+def test_permute_is_a_bijection(size):
+    for seed in (0, 1, 0xDEADBEEF):
+        assert sorted(permute(i, size, seed) for i in range(size)) == list(range(size))
+
+
+def test_permute_depends_on_seed():
+    orders = {tuple(permute(i, 50, seed) for i in range(50)) for seed in range(5)}
+    assert len(orders) == 5
+
+
+def test_bitmap_helpers():
+    bits = bytearray()
+    assert bitmap.add(bits, 3) and bitmap.add(bits, 17)
+    assert not bitmap.add(bits, 3)
+    assert bitmap.contains(bits, 17) and not bitmap.contains(bits, 4)
+    assert not bitmap.contains(bits, 10_000)
+    assert bitmap.popcount(bits) == 2
+    # Trailing zero bytes are dropped, the set bits survive
+    padded = bits + bytes(100)
+    assert bitmap.decode(bitmap.encode(padded)) == bits
+    assert bitmap.decode(None) == bytearray()
+
+
+def test_cursor_serves_each_video_once_per_cycle():
+    # Holes at 2 and 5: deleted or never-inserted entries
+    db = database([0, 1, 3, 4, 6, 7])
+    first = serve(db, 6)
+    assert sorted(first) == [f"file-{o}" for o in (0, 1, 3, 4, 6, 7)]
+    history = db.histories["videoz"].docs[USER]
+    assert history["cursor"]["cycle"] == 1
+    assert history["seen_count"] == 6
+
+    # Everything seen: a new cycle starts over the whole catalog
+    second = serve(db, 6)
+    assert sorted(second) == sorted(first)
+    assert db.histories["videoz"].docs[USER]["cursor"]["cycle"] == 2
+
+
+def test_videos_added_mid_cycle_are_served_before_a_new_cycle():
+    db = database(range(4))
+    served = serve(db, 2)
+    db.memory["videoz"].add(4, "uid-4", "file-4")
+    served += serve(db, 3)
+    assert sorted(served) == [f"file-{o}" for o in range(5)]
+    assert db.histories["videoz"].docs[USER]["cursor"]["cycle"] == 1
+
+
+def test_first_cursor_keeps_migrated_history():
+    db = database(range(10))
+    migrated = bytearray()
+    for ordinal in range(8):
+        bitmap.add(migrated, ordinal)
+    db.histories["videoz"].docs[USER] = {"user_id": USER, "bitmap": bitmap.encode(migrated), "rev": 1}
+    assert sorted(serve(db, 2)) == ["file-8", "file-9"]
+
+
+def test_concurrent_requests_never_serve_the_same_video():
+    db = database(range(6))
+
+    async def run():
+        return await asyncio.gather(*[db.next_from_cursor(USER, "videoz") for _ in range(3)])
+
+    served = asyncio.run(run())
+    assert len(set(served)) == 3
+    history = db.histories["videoz"].docs[USER]
+    assert history["seen_count"] == 3
+    assert history["rev"] == 3
@@ -0,0 +1,91 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import route
+from database.users_db import REMINDER_TIMES, skipped_reminders
+from route import PremiumScheduler
+
+USER = 42
+
+
+def granted(duration):
+    """The user doc set_premium_expiry writes for a grant made just now."""
+    expiry = datetime.now(timezone.utc) + duration
+    doc = {"id": USER, "expiry_time": expiry}
+    for label in skipped_reminders(expiry, datetime.now(timezone.utc)):
+        doc[f"reminder_{label}_sent"] = True
+    return doc
+
+
+def restart(monkeypatch, *docs):
+    """A fresh scheduler loaded from these docs, as on bot start."""
+    async def get_premium_schedule():
+        async def cursor():
+            for doc in docs:
+                yield doc
+        return cursor()
+
+    monkeypatch.setattr(route.db, "get_premium_schedule", get_premium_schedule)
+    scheduler = PremiumScheduler()
+    asyncio.run(scheduler.load())
+    return scheduler
+
+
+def due_now(scheduler):
+    return {event for event, _ in scheduler._pop_due(datetime.now(timezone.utc))}
+
+
+def pending(scheduler):
+    return sorted(event for _, _, event, _, _ in scheduler.heap)
+
+
+def test_skipped_reminders_covers_windows_longer_than_the_grant():
+    now = datetime.now(timezone.utc)
+    assert skipped_reminders(now + timedelta(hours=1), now) == ["1d", "5h30m"]
+    assert skipped_reminders(now + timedelta(days=3), now) == []
+    # Naive expiries (refer.py) are read as UTC
+    naive = (now + timedelta(hours=2)).replace(tzinfo=None)
+    assert skipped_reminders(naive, now) == ["1d", "5h30m"]
+
+
+def test_short_grant_gets_no_reminders_after_restart(monkeypatch):
+    scheduler = restart(monkeypatch, granted(timedelta(hours=1)))
+    assert due_now(scheduler) == set()
+    assert pending(scheduler) == ["10m", "expired"]
+
+
+def test_restart_sends_only_the_latest_missed_reminder(monkeypatch):
+    # Granted for 3 days, bot down across the 1d and 5h30m marks
+    doc = {"id": USER, "expiry_time": datetime.now(timezone.utc) + timedelta(hours=1)}
+    scheduler = restart(monkeypatch, doc)
+    assert due_now(scheduler) == {"5h30m"}
+    assert pending(scheduler) == ["10m", "expired"]
+
+
+def test_restart_does_not_resend_a_delivered_reminder(monkeypatch):
+    doc = {
+        "id": USER,
+        "expiry_time": datetime.now(timezone.utc) + timedelta(hours=1),
+        "reminder_5h30m_sent": True,
+    }
+    scheduler = restart(monkeypatch, doc)
+    assert due_now(scheduler) == set()
+    assert pending(scheduler) == ["10m", "expired"]
+
+
+def test_fresh_grant_never_catches_up():
+    scheduler = PremiumScheduler()
+    scheduler.schedule(USER, datetime.now(timezone.utc) + timedelta(hours=1))
+    assert due_now(scheduler) == set()
+    assert pending(scheduler) == ["10m", "expired"]
+
+
+def test_renewal_drops_the_old_schedule():
+    scheduler = PremiumScheduler()
+    first = datetime.now(timezone.utc) + timedelta(days=3)
+    scheduler.schedule(USER, first)
+    scheduler.schedule(USER, first + timedelta(days=30))
+    later = first + timedelta(minutes=1)
+    # Only entries for the new expiry survive a pop past the old one
+    assert scheduler._pop_due(later) == {}
+    assert len(scheduler.heap) == len(REMINDER_TIMES) + 1
@@ -0,0 +1,152 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+from aiohttp import web
+
+from httpclient import http_client
+from shortener import CircuitBreaker, Shortener, _api_shortlink
+
+LONG = "https://t.me/bot?start=file_1"
+SHORT = "https://sho.rt/abc"
+
+
+class MemoryCache:
+    """In-process stand-in for the Mongo-backed ShortlinkCache."""
+    def __init__(self):
+        self.items = {}
+
+    async def get(self, provider, url):
+        return self.items.get((provider, url))
+
+    async def put(self, provider, url, short):
+        self.items[(provider, url)] = short
+
+
+class Provider:
+    """Stub /api shortener. mode: "ok", "slow" or "error" (HTTP 500)."""
+    def __init__(self):
+        self.mode = "ok"
+        self.delay = 1.0
+        self.hits = 0
+
+    async def handle(self, request):
+        self.hits += 1
+        if self.mode == "error":
+            return web.Response(status=500, text="upstream exploded")
+        if self.mode == "slow":
+            await asyncio.sleep(self.delay)
+        return web.json_response({"status": "success", "shortenedUrl": SHORT})
+
+
+@asynccontextmanager
+async def stub_shortener(timeout=0.3, threshold=2, cooldown=0.2):
+    provider = Provider()
+    app = web.Application()
+    app.router.add_get("/api", provider.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    host, port = runner.addresses[0][:2]
+
+    async def resolve(url):
+        return await _api_shortlink(f"{host}:{port}", "key", url, scheme="http")
+
+    shortener = Shortener("test", resolve, MemoryCache(), timeout=timeout)
+    shortener.breaker = CircuitBreaker(threshold=threshold, cooldown=cooldown)
+    try:
+        yield shortener, provider
+    finally:
+        await http_client.close()
+        await runner.cleanup()
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_success_is_cached():
+    async def scenario():
+        async with stub_shortener() as (shortener, provider):
+            assert await shortener.shorten(LONG) == SHORT
+            assert await shortener.shorten(LONG) == SHORT
+            assert provider.hits == 1
+    run(scenario())
+
+
+def test_timeout_falls_back_to_long_link():
+    async def scenario():
+        async with stub_shortener(timeout=0.1) as (shortener, provider):
+            provider.mode = "slow"
+            started = time.monotonic()
+            assert await shortener.shorten(LONG) == LONG
+            assert time.monotonic() - started < 0.5
+            assert shortener.breaker.failures == 1
+    run(scenario())
+
+
+def test_5xx_falls_back_to_long_link():
+    async def scenario():
+        async with stub_shortener() as (shortener, provider):
+            provider.mode = "error"
+            assert await shortener.shorten(LONG) == LONG
+            assert provider.hits == 1
+            assert shortener.breaker.failures == 1
+            # Failures are not cached
+            provider.mode = "ok"
+            assert await shortener.shorten(LONG) == SHORT
+    run(scenario())
+
+
+def test_open_breaker_skips_provider():
+    async def scenario():
+        async with stub_shortener(threshold=2, cooldown=60) as (shortener, provider):
+            provider.mode = "error"
+            for _ in range(2):
+                assert await shortener.shorten(LONG) == LONG
+            assert provider.hits == 2
+            assert not shortener.breaker.allow()
+
+            provider.mode = "ok"
+            assert await shortener.shorten(LONG) == LONG
+            assert provider.hits == 2
+    run(scenario())
+
+
+def test_half_open_lets_a_single_probe_through():
+    async def scenario():
+        async with stub_shortener(threshold=2, cooldown=0.2) as (shortener, provider):
+            provider.mode = "error"
+            for _ in range(2):
+                await shortener.shorten(LONG)
+            await asyncio.sleep(0.25)
+
+            provider.mode, provider.delay = "slow", 0.1
+            results = await asyncio.gather(*[
+                shortener.shorten(f"{LONG}{i}") for i in range(5)
+            ])
+            # First caller is the probe; the rest get their long link back at once
+            assert provider.hits == 3
+            assert results == [SHORT] + [f"{LONG}{i}" for i in range(1, 5)]
+            # The probe succeeded, so the breaker is closed again
+            assert shortener.breaker.allow() and shortener.breaker.opened_at is None
+            assert await shortener.shorten(LONG + "x") == SHORT
+    run(scenario())
+
+
+def test_failed_probe_reopens_breaker():
+    async def scenario():
+        async with stub_shortener(threshold=2, cooldown=0.2) as (shortener, provider):
+            provider.mode = "error"
+            for _ in range(2):
+                await shortener.shorten(LONG)
+            await asyncio.sleep(0.25)
+
+            assert await shortener.shorten(LONG) == LONG
+            assert provider.hits == 3
+            assert not shortener.breaker.probing
+            # Open for another full cooldown, not another threshold's worth of calls
+            assert await shortener.shorten(LONG) == LONG
+            assert provider.hits == 3
+    run(scenario())
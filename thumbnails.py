@@ -0,0 +1,104 @@
+import os
+import uuid
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from info import THUMB_WORKERS, THUMB_PREFIX_MB
+from utils import generate_thumbnail
+from database.users_db import db
+
+logger = logging.getLogger(__name__)
+
+
+# -------------------- THUMBNAIL WORKERS --------------------
+# Thumbnails for channel posts: Telegram's own thumb when the video has one,
+# otherwise a frame cut by ffmpeg from the first few MB of the file (never
+# the whole video). A semaphore bounds parallel jobs, and every temp file
+# is removed when the caller's `async with` block ends. Once a thumbnail
+# has been uploaded, its photo file_id is kept on the video's catalog doc
+# (thumb_file_id) and reused instead of building it again.
+class ThumbnailService:
+    def __init__(self, workers=THUMB_WORKERS, prefix_mb=THUMB_PREFIX_MB):
+        self.prefix_mb = prefix_mb
+        self._slots = asyncio.Semaphore(workers)
+
+    async def _download_prefix(self, client, message, temp_files):
+        """First prefix_mb of the video (stream_media yields 1MB chunks)."""
+        path = f"/tmp/prefix_{uuid.uuid4().hex}.mp4"
+        # Tracked before streaming, so a download that dies midway is still cleaned up
+        temp_files.append(path)
+        with open(path, "wb") as f:
+            async for chunk in client.stream_media(message, limit=self.prefix_mb):
+                f.write(chunk)
+        return path
+
+    async def _make(self, client, message, temp_files):
+        video = message.video
+        if video.thumbs:
+            path = await client.download_media(video.thumbs[0].file_id)
+            if path:
+                temp_files.append(path)
+                return path
+
+        async with self._slots:
+            prefix = await self._download_prefix(client, message, temp_files)
+            # 1s in usually skips a black first frame; very short clips fall back to 0
+            for seek in (1, 0):
+                thumb = await generate_thumbnail(prefix, seek=seek)
+                if thumb:
+                    temp_files.append(thumb)
+                    return thumb
+        return None
+
+    async def cached(self, file_unique_id, kind="videoz"):
+        try:
+            return await db.get_thumb_file_id(file_unique_id, kind)
+        except Exception as e:
+            logger.warning(f"Thumbnail cache read failed: {e}")
+            return None
+
+    async def remember(self, file_unique_id, sent, kind="videoz"):
+        """Store the photo file_id of a message sent with a generated thumbnail."""
+        if not sent or not sent.photo:
+            return
+        try:
+            await db.set_thumb_file_id(file_unique_id, sent.photo.file_id, kind)
+        except Exception as e:
+            logger.warning(f"Thumbnail cache write failed: {e}")
+
+    async def build(self, client, message):
+        """Thumbnail file that outlives the call (intermediates removed); caller deletes it."""
+        temp_files = []
+        path = None
+        try:
+            path = await self._make(client, message, temp_files)
+        except Exception as e:
+            logger.error(f"Thumbnail generation failed: {e}")
+        finally:
+            # Also runs on cancellation
+            for temp_file in temp_files:
+                if temp_file != path:
+                    self.discard(temp_file)
+        return path
+
+    @staticmethod
+    def discard(path):
+        if not path:
+            return
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    @asynccontextmanager
+    async def thumbnail(self, client, message):
+        """async with thumbnails.thumbnail(client, m) as path: ... (path may be None)"""
+        path = await self.build(client, message)
+        try:
+            yield path
+        finally:
+            self.discard(path)
+
+
+# 🔹 Initialize
+thumbnail_service = ThumbnailService()
@@ -2,13 +2,12 @@ import asyncio
 import time
 import math
 import logging
-import aiohttp
-from shortzy import Shortzy  # Ensure pip install shortzy
-import os, uuid, subprocess
+from collections import OrderedDict
+import os, uuid
 import random, string
 # --- FIX: Added AUTH_CHANNEL, AUTH_PICS to imports ---
-from info import SHORTLINK_API, SHORTLINK_URL, POST_SHORTLINK_API, POST_SHORTLINK_URL, AUTH_CHANNEL, AUTH_PICS
-from database.users_db import db
+from info import AUTH_CHANNEL, AUTH_PICS, FSUB_MEMBER_TTL, FSUB_NON_MEMBER_TTL
+from shortener import post_shortener, verify_shortener
 from pyrogram.enums import ParseMode
 from Script import script
 
@@ -16,9 +15,7 @@ from Script import script
 from pyrogram.types import Message, InlineKeyboardButton, InlineKeyboardMarkup
 from pyrogram.errors import (
     FloodWait, 
-    InputUserDeactivated, 
-    UserIsBlocked, 
-    PeerIdInvalid, 
+    BadRequest,
     UserNotParticipant,  # Required for Force Sub
     ChatAdminRequired    # Required for Force Sub
 )
@@ -34,7 +31,6 @@ class temp(object):
     B_NAME = None
     B_LINK = None
     BOT = None
-    USERS_CANCEL = False
     CANCEL = False  
     START_TIME = 0  
     CURRENT = 0    
@@ -42,45 +38,103 @@ class temp(object):
 # =================================================
 # 📢 FORCE SUBSCRIBE CHECK (Updated)
 # =================================================
+class MembershipCache:
+    """
+    (channel_id, user_id) -> joined, with a long TTL for members and a short
+    one for non-members. Kept accurate by ChatMemberUpdated events from the
+    auth channels (plugins/fsub.py). Also holds each channel's title and its
+    one exported invite link, since every export mints a new link.
+    """
+    def __init__(self, member_ttl=FSUB_MEMBER_TTL, non_member_ttl=FSUB_NON_MEMBER_TTL, max_size=100000):
+        self.member_ttl = member_ttl
+        self.non_member_ttl = non_member_ttl
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self.chats = {}  # channel_id -> (title, invite_link)
+
+    def get(self, channel_id, user_id):
+        key = (channel_id, user_id)
+        item = self._items.get(key)
+        if not item:
+            return None
+        joined, expires_at = item
+        if time.monotonic() > expires_at:
+            del self._items[key]
+            return None
+        self._items.move_to_end(key)
+        return joined
+
+    def put(self, channel_id, user_id, joined):
+        key = (channel_id, user_id)
+        ttl = self.member_ttl if joined else self.non_member_ttl
+        self._items[key] = (joined, time.monotonic() + ttl)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    async def get_chat_link(self, bot, channel_id):
+        """(title, invite_link) exported once per channel. ChatAdminRequired propagates."""
+        if channel_id not in self.chats:
+            chat = await bot.get_chat(channel_id)
+            invite_link = chat.invite_link or await bot.export_chat_invite_link(channel_id)
+            self.chats[channel_id] = (chat.title, invite_link)
+        return self.chats[channel_id]
+
+membership_cache = MembershipCache()
+
+async def _check_member(bot, channel_id, user_id):
+    try:
+        await bot.get_chat_member(channel_id, user_id)
+        membership_cache.put(channel_id, user_id, True)
+        return True
+    except UserNotParticipant:
+        membership_cache.put(channel_id, user_id, False)
+        return False
+    except Exception as e:
+        # Agar koi aur error aaye (jaise bot kicked), to ignore karo (not cached)
+        # logger.error(f"[ERROR] get_chat_member failed: {e}")
+        return True
+
 async def is_user_joined(bot, message: Message) -> bool:
     # Agar AUTH_CHANNEL khali hai to check skip karo
     if not AUTH_CHANNEL:
         return True
 
     user_id = message.from_user.id    
+    missing = []
+    unknown = []
+    for channel_id in AUTH_CHANNEL:
+        joined = membership_cache.get(channel_id, user_id)
+        if joined is None:
+            unknown.append(channel_id)
+        elif not joined:
+            missing.append(channel_id)
+
+    # Only cache misses reach Telegram, all channels at once
+    if unknown:
+        results = await asyncio.gather(*[_check_member(bot, channel_id, user_id) for channel_id in unknown])
+        missing += [channel_id for channel_id, joined in zip(unknown, results) if not joined]
+
     not_joined_channels = []
-    
     for channel_id in AUTH_CHANNEL:
+        if channel_id not in missing:
+            continue
         try:
-            await bot.get_chat_member(channel_id, user_id)
-        except UserNotParticipant:
-            try:
-                chat = await bot.get_chat(channel_id)
-                try:
-                    invite_link = await bot.export_chat_invite_link(channel_id)
-                except ChatAdminRequired:
-                    # Agar bot admin nahi hai to user ko batao
-                    await message.reply_text(
-                        text = (
-                            "<i>🔒 Bᴏᴛ ɪs ɴᴏᴛ ᴀɴ ᴀᴅᴍɪɴ ɪɴ ᴛʜɪs ᴄʜᴀɴɴᴇʟ.\n"
-                            "Pʟᴇᴀsᴇ ᴄᴏɴᴛᴀᴄᴛ ᴛʜᴇ ᴅᴇᴠᴇʟᴏᴘᴇʀ:</i> "
-                            "<b><a href='https://t.me/The_Shadow_Monarch_69'>[ ᴄʟɪᴄᴋ ʜᴇʀᴇ ]</a></b>"
-                        ),
-                        parse_mode=ParseMode.HTML,
-                        disable_web_page_preview=True
-                    )
-                    return False
-                except Exception as e:
-                    logger.error(f"Failed to export link: {e}")
-                    continue
-
-                not_joined_channels.append((chat.title, invite_link))
-            except Exception as e:
-                logger.error(f"[ERROR] Chat fetch failed: {e}")
-                continue
+            not_joined_channels.append(await membership_cache.get_chat_link(bot, channel_id))
+        except ChatAdminRequired:
+            # Agar bot admin nahi hai to user ko batao
+            await message.reply_text(
+                text = (
+                    "<i>🔒 Bᴏᴛ ɪs ɴᴏᴛ ᴀɴ ᴀᴅᴍɪɴ ɪɴ ᴛʜɪs ᴄʜᴀɴɴᴇʟ.\n"
+                    "Pʟᴇᴀsᴇ ᴄᴏɴᴛᴀᴄᴛ ᴛʜᴇ ᴅᴇᴠᴇʟᴏᴘᴇʀ:</i> "
+                    "<b><a href='https://t.me/The_Shadow_Monarch_69'>[ ᴄʟɪᴄᴋ ʜᴇʀᴇ ]</a></b>"
+                ),
+                parse_mode=ParseMode.HTML,
+                disable_web_page_preview=True
+            )
+            return False
         except Exception as e:
-            # Agar koi aur error aaye (jaise bot kicked), to ignore karo ya log karo
-            # logger.error(f"[ERROR] get_chat_member failed: {e}")
+            logger.error(f"[ERROR] Chat fetch failed: {e}")
             continue
 
     if not_joined_channels:
@@ -116,18 +170,138 @@ async def is_user_joined(bot, message: Message) -> bool:
 
     return True
 
-async def generate_thumbnail(video_path):
+# =================================================
+# 👤 TELEGRAM USER RESOLVER
+# =================================================
+class UserResolver:
+    """
+    LRU+TTL cache of pyrogram User objects, fed for free from the from_user
+    of incoming updates (plugins/resolver.py). Misses from concurrent callers
+    are queued and resolved together, 200 ids per get_users call.
+    """
+    BATCH = 200
+
+    def __init__(self, max_size=20000, ttl=3600, batch_delay=0.05):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.batch_delay = batch_delay
+        self._items = OrderedDict()
+        self._waiting = {}  # user_id -> future shared by every caller
+        self._flush_task = None
+
+    def get_cached(self, user_id):
+        item = self._items.get(user_id)
+        if not item:
+            return None
+        user, stored_at = item
+        if time.monotonic() - stored_at > self.ttl:
+            del self._items[user_id]
+            return None
+        self._items.move_to_end(user_id)
+        return user
+
+    def remember(self, user):
+        if user is None or getattr(user, "id", None) is None:
+            return
+        self._items[user.id] = (user, time.monotonic())
+        self._items.move_to_end(user.id)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    async def get_users(self, client, user_ids):
+        """{user_id: User} for every id Telegram could resolve."""
+        found = {}
+        futures = {}
+        loop = asyncio.get_event_loop()
+        for user_id in user_ids:
+            user = self.get_cached(user_id)
+            if user:
+                found[user_id] = user
+                continue
+            future = self._waiting.get(user_id)
+            if future is None:
+                future = self._waiting[user_id] = loop.create_future()
+            futures[user_id] = future
+        if futures and self._flush_task is None:
+            self._flush_task = loop.create_task(self._flush(client))
+        for user_id, future in futures.items():
+            user = await future
+            if user:
+                found[user_id] = user
+        return found
+
+    async def get_user(self, client, user_id):
+        return (await self.get_users(client, [user_id])).get(user_id)
+
+    async def _flush(self, client):
+        # Let concurrent callers pile their misses into the same batch
+        await asyncio.sleep(self.batch_delay)
+        try:
+            while self._waiting:
+                batch = list(self._waiting)[:self.BATCH]
+                futures = {user_id: self._waiting.pop(user_id) for user_id in batch}
+                try:
+                    users = await self._fetch(client, batch)
+                except FloodWait as e:
+                    await asyncio.sleep(e.value)
+                    self._waiting.update(futures)
+                    continue
+                by_id = {}
+                for user in users:
+                    self.remember(user)
+                    by_id[user.id] = user
+                for user_id, future in futures.items():
+                    if not future.done():
+                        future.set_result(by_id.get(user_id))
+        finally:
+            self._flush_task = None
+
+    async def _fetch(self, client, batch):
+        """
+        One get_users call for the batch. A single bad id (PeerIdInvalid,
+        deleted account) fails the whole call, so halve until it's isolated.
+        """
+        try:
+            return await client.get_users(batch)
+        except BadRequest as e:
+            if len(batch) == 1:
+                logger.warning(f"get_users failed for {batch[0]}: {e}")
+                return []
+        except FloodWait:
+            raise
+        except Exception as e:
+            # Network/server trouble isn't about any one id
+            logger.error(f"get_users failed for {len(batch)} ids: {e}")
+            return []
+        mid = len(batch) // 2
+        return [*await self._fetch(client, batch[:mid]), *await self._fetch(client, batch[mid:])]
+
+user_resolver = UserResolver()
+
+async def generate_thumbnail(video_path, seek=1, timeout=30):
+    """One frame via non-blocking ffmpeg; -ss before -i seeks on the input side."""
     thumb_path = f"/tmp/thumb_{uuid.uuid4().hex}.jpg"
 
     cmd = [
-        "ffmpeg", "-i", video_path,
-        "-ss", "00:00:01",
-        "-vframes", "1",
+        "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+        "-ss", str(seek), "-i", video_path,
+        "-frames:v", "1", "-q:v", "3",
         thumb_path
     ]
 
-    subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-    return thumb_path if os.path.exists(thumb_path) else None
+    process = await asyncio.create_subprocess_exec(
+        *cmd, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL
+    )
+    try:
+        await asyncio.wait_for(process.wait(), timeout)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+    if os.path.exists(thumb_path) and os.path.getsize(thumb_path) > 0:
+        return thumb_path
+    if os.path.exists(thumb_path):
+        os.remove(thumb_path)
+    return None
 
 def generate_weird_name(length=8):
     chars = string.ascii_letters + string.digits + "@$#%&()-_"
@@ -212,93 +386,12 @@ def get_progress_bar(percent, length=10):
     except:
         return '🟩' * 0 + '⬜️' * length
 
-# =================================================
-# 📢 BROADCAST FUNCTION
-# =================================================
-async def users_broadcast(user_id, message, is_pin):
-    try:
-        m = await message.copy(chat_id=user_id)
-        if is_pin:
-            try:
-                await m.pin(both_sides=True)
-            except Exception:
-                pass 
-        return True, "Success"
-    except FloodWait as e:
-        await asyncio.sleep(e.value)
-        return await users_broadcast(user_id, message, is_pin)
-    except InputUserDeactivated:
-        await db.delete_user(int(user_id))
-        logging.info(f"{user_id} - Removed from Database, since deleted account.")
-        return False, "Deleted"
-    except UserIsBlocked:
-        logging.info(f"{user_id} - Blocked the bot.")
-        await db.delete_user(user_id)
-        return False, "Blocked"
-    except PeerIdInvalid:
-        await db.delete_user(int(user_id))
-        logging.info(f"{user_id} - PeerIdInvalid")
-        return False, "Error"
-    except Exception as e:
-        logging.error(f"Error broadcasting to {user_id}: {e}")
-        return False, "Error"
-        
 # -------------------------- SHORT LINK GENERATOR (Manual) -------------------------- #
 async def get_shortlink(link):
-    API = POST_SHORTLINK_API
-    URL_DOMAIN = POST_SHORTLINK_URL
-    
     if not link.startswith("https"):
         link = link.replace("http", "https", 1)
-
-    if "shareus.in" in URL_DOMAIN:
-        req_url = f"https://{URL_DOMAIN}/shortLink"
-        params = {"token": API, "format": "json", "link": link}
-    else:
-        req_url = f"https://{URL_DOMAIN}/api"
-        params = {"api": API, "url": link}
-
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(req_url, params=params, ssl=False) as response:
-                data = await response.json(content_type=None)
-                
-                if data.get("status") == "success" or "shortenedUrl" in data:
-                    return data.get("shortlink") or data.get("shortenedUrl")
-                elif "short_url" in data: 
-                    return data["short_url"]
-                else:
-                    logger.error(f"Manual Shorten Error: {data}")
-                    
-    except Exception as e:
-        logger.error(f"Manual Shorten Exception: {e}")
-
-    return f"https://{URL_DOMAIN}/api?api={API}&url={link}"
+    return await post_shortener.shorten(link)
 
 # -------------------------- SHORTENER HELPER (Shortzy Lib) -------------------------- #
 async def get_shortlink_av(url):
-    api = SHORTLINK_API
-    site = SHORTLINK_URL
-
-    try:
-        shortzy = Shortzy(api, site)
-        url = await shortzy.convert(url)
-    except Exception as e:
-        logger.error(f"Shortzy Error: {e}")
-        try:
-            shortzy = Shortzy(api, site)
-            url = await shortzy.get_quick_link(url)
-        except Exception:
-            logger.error("Failed to generate shortlink via Shortzy")
-            
-    return url
-
-# --- BACKGROUND DELETE HELPER ---
-async def auto_delete_message(message, dlt_msg):
-    await asyncio.sleep(600)
-    try:
-        await dlt_msg.delete()
-        await message.delete()
-    except Exception:
-        pass
-        
+    return await verify_shortener.shorten(url)